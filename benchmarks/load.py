@@ -0,0 +1,270 @@
+"""
+Closed-loop HTTP load generator for the Flask app.
+
+Starts a local server (src/app.py with its ticker) in a temporary
+directory, then runs encrypt -> wait -> verify -> decrypt flows from
+several worker processes at a target rate, with a cap on flows in flight
+per worker (the closed loop). Reports per-endpoint latency histograms,
+throughput, and the release-success rate: the share of verifies that
+landed in their window versus "Too early" / "Window expired".
+
+Usage:
+    python -m benchmarks.load --rate 5 --duration 30 --workers 2
+    python -m benchmarks.load --url http://localhost:5001 --rate 1   # existing server
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.async_client import AsyncTimeLockClient
+from src.alice import alice_derive_final_key, alice_decrypt
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Latency histogram bucket upper bounds, in milliseconds
+BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, float("inf")]
+
+OUTCOMES = ("released", "too_early", "window_expired", "invalid_checksum", "replay", "decrypt_failed", "encrypt_failed", "shed", "error")
+
+
+def classify_verify_error(message: str) -> str:
+    if "Too early" in message:
+        return "too_early"
+    if "Window expired" in message:
+        return "window_expired"
+    if "Invalid checksum" in message:
+        return "invalid_checksum"
+    if "Replay" in message:
+        return "replay"
+    if "Too many requests" in message:
+        return "shed"
+    return "error"
+
+
+async def _flow(client, lookahead, outcomes):
+    """One encrypt -> wait -> verify -> decrypt flow. No retries: first verify counts."""
+    plaintext = os.urandom(32)
+    t_start = client.estimate_tick()
+    t_end = t_start + lookahead
+    try:
+        data = await client.encrypt(plaintext, t_start, t_end)
+    except Exception:
+        outcomes["encrypt_failed"] += 1
+        return
+
+    checksum = await client.compute_checksum(data)
+    await client.wait_for_tick(t_end)
+    try:
+        k_public, k_private = await client.verify(checksum, t_start, t_end)
+    except ValueError as e:
+        outcomes[classify_verify_error(str(e))] += 1
+        return
+    except Exception:
+        outcomes["error"] += 1
+        return
+
+    try:
+        k_final = alice_derive_final_key(k_public, k_private)
+        decrypted = alice_decrypt(bytes.fromhex(data["ciphertext"]), k_final, bytes.fromhex(data["nonce"]))
+        outcomes["released" if decrypted == plaintext else "decrypt_failed"] += 1
+    except Exception:
+        outcomes["decrypt_failed"] += 1
+
+
+async def _resync_loop(client, interval):
+    """Re-anchors the tick estimate; every release burns a tick and moves the server ahead."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await client.sync()
+        except Exception:
+            pass
+
+
+async def _worker_main(url, rate, duration, max_inflight, lookahead_min, lookahead_max, resync_interval, seed):
+    random.seed(seed)
+    latencies = {}
+    outcomes = {name: 0 for name in OUTCOMES}
+
+    def record(method, path, status, seconds):
+        latencies.setdefault(f"{method} {path}", []).append(seconds)
+
+    client = AsyncTimeLockClient(url, max_concurrency=max_inflight * 2, on_response=record)
+    await client.sync()
+    resync = asyncio.ensure_future(_resync_loop(client, resync_interval))
+
+    inflight = asyncio.Semaphore(max_inflight)
+    tasks = []
+    interval = 1.0 / rate if rate > 0 else 0
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    next_start = start
+
+    async def run_one():
+        try:
+            await _flow(client, random.randint(lookahead_min, lookahead_max), outcomes)
+        finally:
+            inflight.release()
+
+    while loop.time() - start < duration:
+        # Closed loop: never more than max_inflight flows per worker
+        await inflight.acquire()
+        delay = next_start - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        next_start += interval
+        tasks.append(asyncio.ensure_future(run_one()))
+
+    await asyncio.gather(*tasks)
+    resync.cancel()
+    return {"latencies": latencies, "outcomes": outcomes, "flows": len(tasks)}
+
+
+def _worker(args):
+    return asyncio.run(_worker_main(*args))
+
+
+def histogram(samples):
+    """Returns {"counts": [...], "p50_ms", "p90_ms", "p99_ms", "max_ms", "count"}."""
+    ms = sorted(s * 1000 for s in samples)
+    counts = [0] * len(BUCKETS_MS)
+    for value in ms:
+        for i, bound in enumerate(BUCKETS_MS):
+            if value <= bound:
+                counts[i] += 1
+                break
+
+    def pct(p):
+        return ms[min(len(ms) - 1, int(p * len(ms)))] if ms else 0.0
+
+    return {
+        "count": len(ms),
+        "buckets_ms": [b if b != float("inf") else "inf" for b in BUCKETS_MS],
+        "counts": counts,
+        "p50_ms": pct(0.50),
+        "p90_ms": pct(0.90),
+        "p99_ms": pct(0.99),
+        "max_ms": ms[-1] if ms else 0.0,
+    }
+
+
+def merge(results, elapsed):
+    latencies = {}
+    outcomes = {name: 0 for name in OUTCOMES}
+    flows = 0
+    for r in results:
+        flows += r["flows"]
+        for endpoint, samples in r["latencies"].items():
+            latencies.setdefault(endpoint, []).extend(samples)
+        for name, count in r["outcomes"].items():
+            outcomes[name] += count
+
+    verifies = sum(outcomes[name] for name in ("released", "too_early", "window_expired", "invalid_checksum", "replay", "decrypt_failed"))
+    requests_total = sum(len(s) for s in latencies.values())
+    return {
+        "elapsed_s": elapsed,
+        "flows": flows,
+        "requests": requests_total,
+        "throughput_rps": requests_total / elapsed if elapsed else 0.0,
+        "flows_per_sec": flows / elapsed if elapsed else 0.0,
+        "outcomes": outcomes,
+        "release_success_rate": outcomes["released"] / verifies if verifies else 0.0,
+        "too_early_rate": outcomes["too_early"] / verifies if verifies else 0.0,
+        "window_expired_rate": outcomes["window_expired"] / verifies if verifies else 0.0,
+        "endpoints": {endpoint: histogram(samples) for endpoint, samples in sorted(latencies.items())},
+    }
+
+
+def print_report(report):
+    print(f"\nFlows: {report['flows']} in {report['elapsed_s']:.1f}s ({report['flows_per_sec']:.2f}/s), "
+          f"requests: {report['requests']} ({report['throughput_rps']:.1f}/s)")
+    print(f"Release success: {report['release_success_rate'] * 100:.1f}%  "
+          f"too early: {report['too_early_rate'] * 100:.1f}%  "
+          f"window expired: {report['window_expired_rate'] * 100:.1f}%")
+    print("Outcomes: " + ", ".join(f"{k}={v}" for k, v in report["outcomes"].items() if v))
+    for endpoint, h in report["endpoints"].items():
+        print(f"\n{endpoint}: n={h['count']} p50={h['p50_ms']:.1f}ms p90={h['p90_ms']:.1f}ms "
+              f"p99={h['p99_ms']:.1f}ms max={h['max_ms']:.1f}ms")
+        for bound, count in zip(h["buckets_ms"], h["counts"]):
+            if count:
+                print(f"  <= {bound!s:>5} ms  {count}")
+
+
+def start_local_server(port):
+    """Starts src/app.py (with its ticker) in a temp dir. Returns (process, url, tmpdir)."""
+    tmp = tempfile.TemporaryDirectory()
+    # All workers share one client address; measure capacity, not the per-client limit
+    env = dict(os.environ, PORT=str(port), PYTHONPATH=ROOT, ADMISSION_RATE="0")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "src.app"], cwd=tmp.name, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    import requests
+    deadline = time.time() + 15
+    while time.time() < deadline:
+        try:
+            if requests.get(f"{url}/status", timeout=1).status_code == 200:
+                return proc, url, tmp
+        except requests.exceptions.ConnectionError:
+            time.sleep(0.1)
+    proc.kill()
+    tmp.cleanup()
+    raise RuntimeError("Local server did not start")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Closed-loop load generator")
+    parser.add_argument("--url", help="Target an existing server instead of starting one")
+    parser.add_argument("--port", type=int, default=5055, help="Port for the local server")
+    parser.add_argument("--rate", type=float, default=2.0, help="Total flows started per second")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds to keep starting flows")
+    parser.add_argument("--workers", type=int, default=2, help="Worker processes")
+    parser.add_argument("--max-inflight", type=int, default=50, help="Max flows in flight per worker")
+    parser.add_argument("--lookahead-min", type=int, default=2, help="Min ticks between encrypt and release")
+    parser.add_argument("--lookahead-max", type=int, default=5, help="Max ticks between encrypt and release")
+    parser.add_argument("--resync", type=float, default=1.0, help="Seconds between client tick re-syncs")
+    parser.add_argument("--output", help="Write the JSON report here")
+    args = parser.parse_args(argv)
+
+    proc = tmp = None
+    url = args.url
+    if not url:
+        proc, url, tmp = start_local_server(args.port)
+        print(f"Started local server at {url}")
+
+    try:
+        worker_args = [
+            (url, args.rate / args.workers, args.duration, args.max_inflight,
+             args.lookahead_min, args.lookahead_max, args.resync, i)
+            for i in range(args.workers)
+        ]
+        start = time.time()
+        with multiprocessing.Pool(args.workers) as pool:
+            results = pool.map(_worker, worker_args)
+        report = merge(results, time.time() - start)
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait()
+            tmp.cleanup()
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,326 @@
+"""
+Deterministic replay of captured request traces.
+
+Capture a trace by starting the app with TRACE_CAPTURE=/path/to/trace.bin.
+The replay reproduces every request at the same position relative to the
+tick timeline: same tick distance from the first request, same offset
+inside the tick, same window (in the same level's ticks) relative to the
+arrival tick, same epoch relative to the epoch current at arrival, same
+payload size. Payloads are random (the trace is redacted) and verify
+checksums are recomputed for the replayed window, so only the timing, the
+window mix and the outcome (released / too early / expired) carry over.
+Tenant names are not captured: tenant requests replay against the default
+chain. The in-process target has a single epoch, so requests that named
+another one are rejected there.
+
+Usage:
+    python -m benchmarks.replay trace.bin                       # in-process, real time
+    python -m benchmarks.replay trace.bin --virtual             # in-process, virtual time
+    python -m benchmarks.replay trace.bin --url http://localhost:5001
+"""
+import argparse
+import binascii
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import server as server_module
+from src import stream_aead
+from src.alice import alice_compute_window_checksum
+from src.chain_cache import ChainCheckpointCache
+from src.clock import RealClock, VirtualClock
+from src.core import derive_public_key_piece
+from src.levels import LEVELS, is_base
+from src.request_trace import read_trace, NO_TICK, NO_EPOCH
+from src.server import Server
+from benchmarks.load import classify_verify_error, histogram
+
+
+def schedule(records):
+    """
+    Maps records onto a replay timeline that starts at tick 0.
+    Returns [(at_seconds, rel_tick, record), ...] sorted by time, where
+    at_seconds = rel_tick + tick_offset.
+    """
+    records = list(records)
+    if not records:
+        return []
+    first_tick = min(r.tick for r in records)
+    events = [(r.tick - first_tick + r.tick_offset, r.tick - first_tick, r) for r in records]
+    return sorted(events, key=lambda e: e[0])
+
+
+# Tenant names are redacted: their requests replay on the default routes
+_REPLAY_ENDPOINTS = {
+    "/tenants/<tenant>/status": "/status",
+    "/tenants/<tenant>/encrypt": "/encrypt",
+    "/tenants/<tenant>/verify": "/verify",
+    "/tenants/<tenant>/verify/batch": "/verify/batch",
+}
+VERIFY_ENDPOINTS = ("/verify", "/verify/batch", "/client-helper")
+
+
+def replay_endpoint(record):
+    return _REPLAY_ENDPOINTS.get(record.endpoint, record.endpoint)
+
+
+def _relative_window(record, replay_tick):
+    if record.t_start == NO_TICK or record.t_end == NO_TICK:
+        return None
+    # Level windows are in level ticks: keep their distance from the level tick of arrival
+    factor = LEVELS.get(record.level, 1)
+    arrival, now = record.tick // factor, replay_tick // factor
+    return (now + (record.t_start - arrival), now + (record.t_end - arrival))
+
+
+def _relative_epoch(record, current_epoch):
+    """The epoch to name in the replayed request (None: the current one)."""
+    if record.epoch == NO_EPOCH:
+        return None
+    return current_epoch + (record.epoch - record.current_epoch)
+
+
+class InProcessTarget:
+    """Replays against a local Server driven by the replay's own clock."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.server = Server(clock=clock)
+        self.counter = 0
+
+    def base_tick(self):
+        return self.server.current_t
+
+    def current_epoch(self):
+        return self.server.epoch
+
+    def tick(self):
+        # Same as the production ticker: one step from wherever we are
+        self.server.advance_private_state_to(self.server.current_t + 1)
+
+    def replay_tick(self, base, rel_tick):
+        # Burns move the server ahead of its schedule, as in production
+        return self.server.current_t
+
+    def _checksum(self, t_start, t_end, level):
+        if is_base(level):
+            snap = self.server._snapshot_with_history(t_end)
+            return derive_public_key_piece(snap.public_history, t_start, t_end)
+        return alice_compute_window_checksum(self.server.public_seed, self.server.public_salt, t_start, t_end,
+                                             level=level)
+
+    def send(self, record, window, epoch=None):
+        self.counter += 1
+        nonce = f"replay-{self.counter}"
+        endpoint = replay_endpoint(record)
+        if endpoint == "/status" or window is None:
+            return "ok"
+        if epoch is not None and epoch != self.server.epoch:
+            raise ValueError(f"Unknown epoch {epoch}")
+        t_start, t_end = window
+        level = record.level
+        if endpoint == "/encrypt":
+            self.server.encrypt_for_alice(os.urandom(max(1, record.payload_size // 2)), t_start, t_end, nonce, level)
+            return "ok"
+        if endpoint == "/encrypt/stream":
+            result = self.server.encryption_key_for_alice(t_start, t_end, nonce, level)
+            header = stream_aead.new_header({"t_start": t_start, "t_end": t_end})
+            plaintext = io.BytesIO(os.urandom(max(1, record.payload_size)))
+            for _ in stream_aead.encrypt_stream(result["k_final"], plaintext.read, header):
+                pass
+            return "ok"
+        if endpoint == "/verify/batch":
+            checksum = self._checksum(t_start, t_end, level)
+            self.server.verify_checksums_and_release_batch([(t_start, checksum)], t_end, nonce, level)
+            return "released"
+        if endpoint in VERIFY_ENDPOINTS:
+            checksum = self._checksum(t_start, t_end, level)
+            self.server.verify_checksum_and_release_private_key_piece(checksum, t_start, t_end, nonce, level)
+            return "released"
+        return "ok"
+
+
+class HttpTarget:
+    """Replays against a running server over HTTP (real time only)."""
+
+    def __init__(self, url):
+        import requests
+        self.requests = requests
+        self.url = url
+        self.chains = {}  # epoch named (None: current) -> (public_seed, public_salt)
+        self.cache = ChainCheckpointCache(os.path.join(tempfile.mkdtemp(), "replay_cache.db"))
+
+    def base_tick(self):
+        data = self.requests.get(f"{self.url}/status", timeout=5).json()
+        return data["current_t"]
+
+    def current_epoch(self):
+        return self.requests.get(f"{self.url}/status", timeout=5).json()["epoch"]
+
+    def tick(self):
+        pass  # The server ticks itself
+
+    def replay_tick(self, base, rel_tick):
+        return base + rel_tick
+
+    def _chain(self, epoch):
+        # Any successful encrypt reveals the epoch's public seed and salt
+        if epoch not in self.chains:
+            params = {} if epoch is None else {"epoch": epoch}
+            t = self.requests.get(f"{self.url}/status", params=params, timeout=5).json().get("current_t", 0) + 1
+            resp = self.requests.post(f"{self.url}/encrypt", json={
+                "plaintext": "00", "t_start": t, "t_end": t, "request_nonce": os.urandom(8).hex(), "epoch": epoch,
+            }, timeout=5)
+            data = resp.json()
+            if resp.status_code != 200:
+                raise ValueError(data.get("error", resp.text))
+            self.chains[epoch] = (binascii.unhexlify(data["public_seed"]), binascii.unhexlify(data["public_salt"]))
+        return self.chains[epoch]
+
+    def _post(self, path, **kwargs):
+        resp = self.requests.post(f"{self.url}{path}", timeout=5, **kwargs)
+        if resp.status_code != 200:
+            raise ValueError(resp.json().get("error", resp.text))
+
+    def send(self, record, window, epoch=None):
+        endpoint = replay_endpoint(record)
+        if endpoint == "/status" or window is None:
+            self.requests.get(f"{self.url}/status", timeout=5)
+            return "ok"
+        t_start, t_end = window
+        level = record.level
+        nonce = os.urandom(8).hex()
+        if endpoint == "/encrypt":
+            self._post("/encrypt", json={
+                "plaintext": os.urandom(max(1, record.payload_size // 2)).hex(),
+                "t_start": t_start, "t_end": t_end, "request_nonce": nonce, "level": level, "epoch": epoch,
+            })
+            return "ok"
+        if endpoint == "/encrypt/stream":
+            params = {"t_start": t_start, "t_end": t_end, "request_nonce": nonce, "level": level, "epoch": epoch}
+            self._post("/encrypt/stream", params={k: v for k, v in params.items() if v is not None},
+                       data=os.urandom(max(1, record.payload_size)))
+            return "ok"
+        if endpoint in VERIFY_ENDPOINTS:
+            seed, salt = self._chain(epoch)
+            checksum = alice_compute_window_checksum(seed, salt, t_start, t_end, self.cache, level).hex()
+            if endpoint == "/verify/batch":
+                self._post("/verify/batch", json={
+                    "items": [{"t_start": t_start, "checksum": checksum}], "t_end": t_end,
+                    "request_nonce": nonce, "level": level, "epoch": epoch,
+                })
+            else:
+                self._post("/verify", json={
+                    "checksum": checksum, "t_start": t_start, "t_end": t_end,
+                    "request_nonce": nonce, "level": level, "epoch": epoch,
+                })
+            return "released"
+        return "ok"
+
+
+def replay(records, target, clock, speed=1.0, workers=1):
+    """
+    Issues each record at its scheduled time. With workers > 1 requests are
+    sent from a pool so a slow response does not delay later arrivals.
+    Returns a report with latency histograms and outcome counts.
+    """
+    events = schedule(records)
+    base = target.base_tick()
+    base_epoch = target.current_epoch()
+    start = clock.time()
+    latencies = {}
+    outcomes = {}
+
+    def issue(record, window, epoch):
+        began = time.perf_counter()
+        try:
+            outcome = target.send(record, window, epoch)
+        except ValueError as e:
+            outcome = classify_verify_error(str(e)) if replay_endpoint(record) in VERIFY_ENDPOINTS else "rejected"
+        except Exception:
+            outcome = "error"
+        latencies.setdefault(record.endpoint, []).append(time.perf_counter() - began)
+        key = f"{record.endpoint} {outcome}"
+        outcomes[key] = outcomes.get(key, 0) + 1
+
+    pool = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+    ticks_done = 0
+    for at, rel_tick, record in events:
+        due = start + at / speed
+        # Scheduled ticks that happen before this arrival
+        while start + (ticks_done + 1) / speed <= due:
+            ticks_done += 1
+            clock.sleep(start + ticks_done / speed - clock.time())
+            target.tick()
+        clock.sleep(due - clock.time())
+
+        replay_tick = target.replay_tick(base, rel_tick)
+        window = _relative_window(record, replay_tick)
+        epoch = _relative_epoch(record, base_epoch)
+        if pool:
+            pool.submit(issue, record, window, epoch)
+        else:
+            issue(record, window, epoch)
+    if pool:
+        pool.shutdown(wait=True)
+
+    return {
+        "requests": len(events),
+        "outcomes": dict(sorted(outcomes.items())),
+        "endpoints": {endpoint: histogram(samples) for endpoint, samples in sorted(latencies.items())},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a captured request trace")
+    parser.add_argument("trace", help="Trace file written with TRACE_CAPTURE")
+    parser.add_argument("--url", help="Replay over HTTP against this server instead of in-process")
+    parser.add_argument("--virtual", action="store_true", help="In-process replay in virtual time (no sleeping)")
+    parser.add_argument("--speed", type=float, default=1.0, help="Time compression factor (in-process only)")
+    parser.add_argument("--workers", type=int, default=1, help="Concurrent senders")
+    parser.add_argument("--output", help="Write the JSON report here")
+    args = parser.parse_args(argv)
+
+    records = list(read_trace(args.trace))
+    print(f"Loaded {len(records)} records from {args.trace}")
+
+    cwd = os.getcwd()
+    tmp = tempfile.TemporaryDirectory()
+    try:
+        if args.url:
+            clock = RealClock()
+            target = HttpTarget(args.url)
+            # The remote server ticks once per real second
+            speed = 1.0
+        else:
+            # Server persists to DB_PATH relative to the working directory
+            os.chdir(tmp.name)
+            if os.path.exists(server_module.DB_PATH):
+                os.remove(server_module.DB_PATH)
+            clock = VirtualClock(start=time.time(), auto_advance=True) if args.virtual else RealClock()
+            target = InProcessTarget(clock)
+            speed = args.speed
+        report = replay(records, target, clock, speed=speed, workers=1 if args.virtual else args.workers)
+    finally:
+        os.chdir(cwd)
+        tmp.cleanup()
+
+    print(f"Replayed {report['requests']} requests")
+    for key, count in report["outcomes"].items():
+        print(f"  {key}: {count}")
+    for endpoint, h in report["endpoints"].items():
+        print(f"{endpoint}: n={h['count']} p50={h['p50_ms']:.2f}ms p99={h['p99_ms']:.2f}ms max={h['max_ms']:.2f}ms")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,264 @@
+"""
+Microbenchmarks for the protocol primitives and Server operations.
+
+Usage:
+    python -m benchmarks.run                          # run, print, write benchmarks/results.json
+    python -m benchmarks.run --quick                  # shorter runs (CI smoke)
+    python -m benchmarks.run --compare benchmarks/baseline.json --threshold 0.2
+    python -m benchmarks.run --save-baseline          # overwrite benchmarks/baseline.json
+
+Each benchmark reports ops/s (steps/s or ticks/s where noted), the best of
+--repeat runs: slower runs measure other load on the machine. With
+--compare, any benchmark slower than the baseline by more than
+--threshold (fraction) is flagged and the exit code is 1.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import server as server_module
+from src.core import evolve_public_chain, evolve_public_chain_to, derive_public_key_piece, hkdf, encrypt_aes_gcm
+from src.server import Server
+from src.audit import AuditLog
+from src.alice import alice_compute_window_checksum
+from src import stream_aead
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, "results.json")
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+
+BENCHMARKS = []
+
+
+def benchmark(name, unit="ops/s"):
+    """Registers a benchmark. The function takes `quick` and returns (ops, seconds)."""
+    def register(fn):
+        BENCHMARKS.append((name, unit, fn))
+        return fn
+    return register
+
+
+def timed(fn, min_time):
+    """Calls fn() until min_time has elapsed. Returns (calls, seconds)."""
+    calls = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < min_time:
+        fn()
+        calls += 1
+        elapsed = time.perf_counter() - start
+    return calls, elapsed
+
+
+def _min_time(quick):
+    return 0.05 if quick else 0.5
+
+
+def _fresh_server():
+    """A Server with a fresh DB in the current (temporary) directory."""
+    if os.path.exists(server_module.DB_PATH):
+        os.remove(server_module.DB_PATH)
+    return Server(public_seed=b"\x01" * 32, public_salt=b"\x02" * 32, server_secret=b"\x03" * 32)
+
+
+# --- Primitives -------------------------------------------------------------
+
+@benchmark("evolve_public_chain", unit="steps/s")
+def bench_evolve(quick):
+    steps = 2000 if quick else 20000
+    calls, seconds = timed(lambda: evolve_public_chain(b"\x01" * 32, b"\x02" * 32, steps), _min_time(quick))
+    return calls * steps, seconds
+
+
+@benchmark("evolve_public_chain_to", unit="steps/s")
+def bench_evolve_to(quick):
+    # Per-core rate of a chain audit segment (src/chain_audit.py)
+    steps = 2000 if quick else 20000
+    calls, seconds = timed(lambda: evolve_public_chain_to(b"\x01" * 32, bytes(32), b"\x02" * 32, 0, steps),
+                           _min_time(quick))
+    return calls * steps, seconds
+
+
+def _bench_public_key_piece(width):
+    def run(quick):
+        history = evolve_public_chain(b"\x01" * 32, b"\x02" * 32, width)
+        return timed(lambda: derive_public_key_piece(history, 0, width - 1), _min_time(quick))
+    return run
+
+for _width in (1, 10, 100, 1000):
+    benchmark(f"derive_public_key_piece[width={_width}]")(_bench_public_key_piece(_width))
+
+
+@benchmark("hkdf")
+def bench_hkdf(quick):
+    ikm = os.urandom(64)
+    return timed(lambda: hkdf(ikm, 32, salt=b"encryption", info=b"aes_gcm_key"), _min_time(quick))
+
+
+@benchmark("encrypt_aes_gcm[1KiB]")
+def bench_aes_gcm(quick):
+    key = os.urandom(32)
+    plaintext = os.urandom(1024)
+    return timed(lambda: encrypt_aes_gcm(key, plaintext), _min_time(quick))
+
+
+@benchmark("encrypt_stream[8MiB]", unit="MiB/s")
+def bench_encrypt_stream(quick):
+    # Chunked AEAD behind POST /encrypt/stream; compare with encrypt_aes_gcm
+    key = os.urandom(32)
+    chunk = os.urandom(stream_aead.CHUNK_SIZE)
+    chunks_per_run = 8 * 1024 * 1024 // len(chunk)
+
+    def run():
+        remaining = iter(range(chunks_per_run))
+        header = stream_aead.new_header({})
+        for _ in stream_aead.encrypt_stream(key, lambda n: chunk if next(remaining, None) is not None else b"", header):
+            pass
+
+    calls, seconds = timed(run, _min_time(quick))
+    return calls * 8, seconds
+
+
+# --- Server operations ------------------------------------------------------
+
+@benchmark("Server.advance_private_state_to", unit="ticks/s")
+def bench_advance(quick):
+    server = _fresh_server()
+    return timed(lambda: server.advance_private_state_to(server.current_t + 1), _min_time(quick))
+
+
+def _bench_encrypt(lookahead, level=None):
+    def run(quick):
+        server = _fresh_server()
+        counter = iter(range(10 ** 9))
+        t = server.level(level).current_t
+        return timed(
+            lambda: server.encrypt_for_alice(b"k" * 32, t, t + lookahead, f"bench-{next(counter)}", level),
+            _min_time(quick),
+        )
+    return run
+
+for _lookahead in (1, 10, 100):
+    benchmark(f"encrypt_for_alice[lookahead={_lookahead}]")(_bench_encrypt(_lookahead))
+# 30 days ahead on the day chain; compare with lookahead=10 and 100 above
+benchmark("encrypt_for_alice[level=day,lookahead=30]")(_bench_encrypt(30, "day"))
+
+
+@benchmark("alice_compute_window_checksum[level=day,t=365]")
+def bench_alice_day_checksum(quick):
+    # Unlocking a lock for day 365 of the chain: 365 steps of the day chain
+    return timed(lambda: alice_compute_window_checksum(b"\x01" * 32, b"\x02" * 32, 365, 365, level="day"),
+                 _min_time(quick))
+
+
+@benchmark("verify_checksum_and_release_private_key_piece")
+def bench_verify(quick):
+    server = _fresh_server()
+    # Each release burns a tick, so precompute one checksum per future tick.
+    steps = 2000 if quick else 20000
+    history = evolve_public_chain(server.public_seed, server.public_salt, steps)
+    counter = iter(range(10 ** 9))
+
+    def release():
+        t = server.current_t
+        checksum = derive_public_key_piece(history, t, t)
+        server.verify_checksum_and_release_private_key_piece(checksum, t, t, f"bench-{next(counter)}")
+
+    return timed(release, _min_time(quick))
+
+
+@benchmark("AuditLog.record")
+def bench_audit_record(quick):
+    # The request-path cost only; the writer thread commits in the background
+    audit = AuditLog("audit.log")
+    counter = iter(range(10 ** 9))
+    try:
+        return timed(lambda: audit.record("release", "released", 7, 5, 7, "203.0.113.9", next(counter)),
+                     _min_time(quick))
+    finally:
+        audit.close()
+
+
+# --- Runner -----------------------------------------------------------------
+
+def run_all(quick=False, only=None, repeat=3):
+    results = {}
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        # Server persists to DB_PATH relative to the working directory
+        os.chdir(tmp)
+        try:
+            for name, unit, fn in BENCHMARKS:
+                if only and only not in name:
+                    continue
+                ops, seconds = max((fn(quick) for _ in range(repeat)), key=lambda run: run[0] / run[1])
+                results[name] = {"unit": unit, "ops_per_sec": ops / seconds, "ops": ops, "seconds": seconds}
+                print(f"{name:55s} {ops / seconds:14,.1f} {unit}")
+        finally:
+            os.chdir(cwd)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Returns a list of (name, baseline_ops, current_ops, change) regressions."""
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get("benchmarks", {}).get(name)
+        if not base:
+            continue
+        change = current["ops_per_sec"] / base["ops_per_sec"] - 1
+        flag = "REGRESSION" if change < -threshold else ""
+        print(f"{name:55s} {change * 100:+7.1f}% {flag}")
+        if change < -threshold:
+            regressions.append((name, base["ops_per_sec"], current["ops_per_sec"], change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Protocol microbenchmarks")
+    parser.add_argument("--quick", action="store_true", help="Short runs for smoke testing")
+    parser.add_argument("--only", help="Run only benchmarks whose name contains this string")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per benchmark; the fastest is reported")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Where to write JSON results")
+    parser.add_argument("--compare", metavar="BASELINE", help="Compare against a baseline JSON file")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown fraction before flagging")
+    parser.add_argument("--save-baseline", action="store_true", help=f"Also write results to {DEFAULT_BASELINE}")
+    args = parser.parse_args(argv)
+
+    results = run_all(quick=args.quick, only=args.only, repeat=args.repeat)
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "quick": args.quick,
+        "repeat": args.repeat,
+        "benchmarks": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.save_baseline:
+        with open(DEFAULT_BASELINE, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline written to {DEFAULT_BASELINE}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"\nComparison against {args.compare} (threshold {args.threshold * 100:.0f}%):")
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) found.")
+            return 1
+        print("No regressions.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""
+Throughput of sharded mode versus shard count.
+
+For each shard count, starts a ShardPool in a temporary directory and
+drives encrypts for many tenants from a thread pool for a fixed time.
+With enough cores, ops/s should grow roughly linearly with shards, and
+a hot tenant should only slow down the tenants that share its shard.
+
+Usage:
+    python -m benchmarks.shards --shards 1 2 4 --duration 5
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.shards import ShardPool
+
+
+def measure(shards, duration, threads, tenants, lookahead, connections):
+    with tempfile.TemporaryDirectory() as tmp, ShardPool(shards, db_dir=tmp, connections=connections) as pool:
+        stop = threading.Event()
+        counts = [0] * threads
+
+        def worker(i):
+            names = [f"tenant-{j}" for j in range(i, tenants, threads)] or [f"tenant-{i}"]
+            n = 0
+            while not stop.is_set():
+                tenant = names[n % len(names)]
+                t = pool.call(tenant, "status")["current_t"]
+                pool.call(tenant, "encrypt_for_alice", b"k" * 32, t, t + lookahead, f"bench-{i}-{n}")
+                n += 1
+            counts[i] = n
+
+        workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+        for w in workers:
+            w.start()
+        time.sleep(duration)
+        stop.set()
+        for w in workers:
+            w.join()
+        total = sum(counts)
+        return {"shards": shards, "encrypts": total, "ops_per_s": total / duration}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sharded mode throughput")
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4], help="Shard counts to measure")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per shard count")
+    parser.add_argument("--threads", type=int, default=16, help="Client threads")
+    parser.add_argument("--tenants", type=int, default=64, help="Distinct tenant keys")
+    parser.add_argument("--lookahead", type=int, default=50, help="Encrypt lookahead in ticks")
+    parser.add_argument("--connections", type=int, default=4, help="Pipes (in-flight calls) per shard")
+    parser.add_argument("--output", help="Write the JSON report here")
+    args = parser.parse_args(argv)
+
+    print(f"{os.cpu_count()} CPUs")
+    results = []
+    for shards in args.shards:
+        r = measure(shards, args.duration, args.threads, args.tenants, args.lookahead, args.connections)
+        results.append(r)
+        print(f"{shards:>3} shards: {r['ops_per_s']:>10,.1f} encrypts/s")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
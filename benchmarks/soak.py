@@ -0,0 +1,207 @@
+"""
+Long-horizon soak simulator for capacity planning.
+
+Fast-forwards a Server through many ticks in virtual time and, at regular
+checkpoints, measures how the quantities that grow with uptime behave:
+
+  * memory held by public_history and the nonce set (plus process RSS)
+  * startup time: a fresh Server re-evolving public_history from X_0
+  * per-tick cost: one scheduled tick including persistence
+  * client decrypt cost: Alice computing the public chain up to now
+  * latency of a synthetic encrypt/verify request mix
+
+It then fits each series linearly and projects the tick (and uptime) at
+which configurable limits would be hit.
+
+Usage:
+    python -m benchmarks.soak --ticks 1000000 --checkpoints 10
+    python -m benchmarks.soak --ticks 200000 --requests 200 --output soak.json
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import server as server_module
+from src.alice import alice_compute_window_checksum
+from src.clock import VirtualClock
+from src.profiling import server_structure_sizes
+from src.server import Server
+
+SEED = b"\x01" * 32
+SALT = b"\x02" * 32
+SECRET = b"\x03" * 32
+
+
+def _fast_forward(server, clock, ticks, chunk):
+    """Advances `ticks` ticks in chunks (one persist per chunk)."""
+    remaining = ticks
+    while remaining > 0:
+        step = min(chunk, remaining)
+        clock.advance(step)
+        server.advance_private_state_to(server.current_t + step)
+        remaining -= step
+
+
+def _request_mix(server, clock, count, max_lookahead, rng):
+    """Synthetic encrypt + verify mix at the current tick. Returns latencies in seconds."""
+    encrypt_latencies = []
+    verify_latencies = []
+    for i in range(count):
+        t = server.current_t
+        lookahead = rng.randint(1, max_lookahead)
+        start = time.perf_counter()
+        server.encrypt_for_alice(os.urandom(32), t, t + lookahead, f"soak-{t}-{i}-e")
+        encrypt_latencies.append(time.perf_counter() - start)
+
+    # A release at the current tick (burns it, like production verifies do)
+    t = server.current_t
+    checksum = alice_compute_window_checksum(server.public_seed, server.public_salt, t, t)
+    start = time.perf_counter()
+    server.verify_checksum_and_release_private_key_piece(checksum, t, t, f"soak-{t}-v")
+    verify_latencies.append(time.perf_counter() - start)
+    clock.advance(1)
+    return encrypt_latencies, verify_latencies
+
+
+def _mean(values):
+    return sum(values) / len(values) if values else 0.0
+
+
+def measure(server, clock, tick_samples, requests, max_lookahead, rng):
+    t = server.current_t
+    sizes = server_structure_sizes(server)
+
+    # Startup: a fresh Server loading this DB re-evolves X_0 .. X_t
+    start = time.perf_counter()
+    Server(clock=clock)
+    startup = time.perf_counter() - start
+
+    # Per-tick cost including persistence
+    start = time.perf_counter()
+    for _ in range(tick_samples):
+        clock.advance(1)
+        server.advance_private_state_to(server.current_t + 1)
+    per_tick = (time.perf_counter() - start) / tick_samples
+
+    # Client decrypt cost: checksum for a window ending now, from X_0
+    t_now = server.current_t
+    start = time.perf_counter()
+    alice_compute_window_checksum(server.public_seed, server.public_salt, t_now, t_now)
+    client = time.perf_counter() - start
+
+    encrypts, verifies = _request_mix(server, clock, requests, max_lookahead, rng)
+
+    return {
+        "tick": t,
+        "uptime_days": t / 86400,
+        "public_history_len": sizes["public_history_len"],
+        "public_history_mb": sizes["public_history_bytes"] / 1e6,
+        "nonce_set_len": sizes["seen_nonces_len"],
+        "nonce_mb": (sizes["nonce_timestamps_bytes"] + sizes["seen_nonces_bytes"]) / 1e6,
+        "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "startup_s": startup,
+        "per_tick_ms": per_tick * 1000,
+        "client_decrypt_s": client,
+        "encrypt_mean_ms": _mean(encrypts) * 1000,
+        "verify_mean_ms": _mean(verifies) * 1000,
+    }
+
+
+def fit_linear(points):
+    """Least-squares (slope, intercept) for [(x, y), ...]."""
+    n = len(points)
+    if n < 2:
+        return 0.0, points[0][1] if points else 0.0
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    var_x = sum((x - mean_x) ** 2 for x, _ in points)
+    if var_x == 0:
+        return 0.0, mean_y
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in points) / var_x
+    return slope, mean_y - slope * mean_x
+
+
+def project_limits(samples, limits):
+    """For each {metric: limit}, the tick at which the linear fit reaches the limit."""
+    projections = {}
+    for metric, limit in limits.items():
+        slope, intercept = fit_linear([(s["tick"], s[metric]) for s in samples])
+        if slope <= 0:
+            projections[metric] = {"limit": limit, "tick": None, "uptime_days": None}
+            continue
+        tick = max(0.0, (limit - intercept) / slope)
+        projections[metric] = {"limit": limit, "tick": int(tick), "uptime_days": tick / 86400, "slope_per_tick": slope}
+    return projections
+
+
+def run(ticks, checkpoints, chunk, tick_samples, requests, max_lookahead, limits, seed=0):
+    rng = random.Random(seed)
+    samples = []
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        # Server persists to DB_PATH relative to the working directory
+        os.chdir(tmp)
+        try:
+            if os.path.exists(server_module.DB_PATH):
+                os.remove(server_module.DB_PATH)
+            clock = VirtualClock(start=0.0, auto_advance=True)
+            server = Server(public_seed=SEED, public_salt=SALT, server_secret=SECRET, clock=clock)
+            step = max(1, ticks // checkpoints)
+            header = f"{'tick':>10} {'days':>7} {'hist MB':>8} {'nonces':>7} {'RSS MB':>7} {'startup s':>9} {'tick ms':>8} {'client s':>9} {'enc ms':>7} {'ver ms':>7}"
+            print(header)
+            while server.current_t < ticks:
+                _fast_forward(server, clock, min(step, ticks - server.current_t), chunk)
+                s = measure(server, clock, tick_samples, requests, max_lookahead, rng)
+                samples.append(s)
+                print(f"{s['tick']:>10} {s['uptime_days']:>7.2f} {s['public_history_mb']:>8.1f} {s['nonce_set_len']:>7} "
+                      f"{s['rss_mb']:>7.0f} {s['startup_s']:>9.3f} {s['per_tick_ms']:>8.3f} {s['client_decrypt_s']:>9.3f} "
+                      f"{s['encrypt_mean_ms']:>7.3f} {s['verify_mean_ms']:>7.3f}")
+        finally:
+            os.chdir(cwd)
+
+    projections = project_limits(samples, limits)
+    print("\nProjected limits (linear fit):")
+    for metric, p in projections.items():
+        if p["tick"] is None:
+            print(f"  {metric} <= {p['limit']}: no growth observed")
+        else:
+            print(f"  {metric} reaches {p['limit']} at tick {p['tick']:,} (~{p['uptime_days']:.1f} days uptime)")
+    return {"samples": samples, "projections": projections}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Long-horizon soak simulator")
+    parser.add_argument("--ticks", type=int, default=200000, help="Total ticks to simulate")
+    parser.add_argument("--checkpoints", type=int, default=10, help="Number of measurement points")
+    parser.add_argument("--chunk", type=int, default=10000, help="Ticks advanced per persisted step while fast-forwarding")
+    parser.add_argument("--tick-samples", type=int, default=20, help="Single ticks timed per checkpoint")
+    parser.add_argument("--requests", type=int, default=50, help="Synthetic encrypts per checkpoint")
+    parser.add_argument("--max-lookahead", type=int, default=100, help="Max encrypt lookahead in ticks")
+    parser.add_argument("--startup-limit", type=float, default=30.0, help="Startup seconds considered unacceptable")
+    parser.add_argument("--client-limit", type=float, default=1.0, help="Client decrypt seconds considered unacceptable")
+    parser.add_argument("--memory-limit", type=float, default=1024.0, help="public_history MB considered unacceptable")
+    parser.add_argument("--output", help="Write the JSON report here")
+    args = parser.parse_args(argv)
+
+    limits = {
+        "startup_s": args.startup_limit,
+        "client_decrypt_s": args.client_limit,
+        "public_history_mb": args.memory_limit,
+    }
+    report = run(args.ticks, args.checkpoints, args.chunk, args.tick_samples, args.requests, args.max_lookahead, limits)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
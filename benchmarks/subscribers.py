@@ -0,0 +1,156 @@
+"""
+Tick fan-out to many idle GET /ticks subscribers on the asyncio front end.
+
+Starts the front end and a ticker in this process (fresh Server in a
+temporary directory) and opens the subscriber connections from a child
+process, so each side has its own file descriptor limit. Every subscriber
+reads its stream; a tick's delivery delay is the time from the tick
+starting on the server to the event arriving at a subscriber. Also reports
+the server's resident memory per subscriber.
+
+Usage:
+    python -m benchmarks.subscribers --subscribers 1000 10000 --duration 5
+    (raise `ulimit -n` above the subscriber count first)
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import src.app as app_module
+from src.async_server import AsyncFrontEnd
+from src.server import Server
+from src.ticker import tick_loop
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+def _rss_bytes():
+    """Current resident set size (Linux), falling back to the peak."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _subscribe(port, count, duration, connected, results):
+    """Child process: opens `count` streams, then records delivery delays for `duration` seconds."""
+    async def main():
+        delays = []
+        measuring = asyncio.Event()
+
+        async def subscriber():
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"GET /ticks HTTP/1.1\r\nHost: bench\r\n\r\n")
+            await reader.readuntil(b"\r\n\r\n")
+            await reader.readuntil(b"\n\n")  # The current tick, sent on subscribe
+            return reader, writer
+
+        async def read(reader):
+            # Keep reading while the others connect, but only time events after that
+            while True:
+                event = await reader.readuntil(b"\n\n")
+                if measuring.is_set():
+                    data = json.loads(event.split(b"data: ", 1)[1])
+                    delays.append(time.time() - data["tick_started_at"])
+
+        streams, tasks, failed = [], [], 0
+        for start in range(0, count, 500):
+            for r in await asyncio.gather(*(subscriber() for _ in range(start, min(count, start + 500))),
+                                          return_exceptions=True):
+                if isinstance(r, BaseException):
+                    failed += 1
+                else:
+                    streams.append(r)
+                    tasks.append(asyncio.ensure_future(read(r[0])))
+        connected.put((len(streams), failed))
+
+        measuring.set()
+        await asyncio.sleep(duration)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for _, writer in streams:
+            writer.close()
+        results.put(delays)
+
+    asyncio.run(main())
+
+
+def measure(subscribers, duration, tick_seconds):
+    with tempfile.TemporaryDirectory() as tmp:
+        app_module.server_instance = Server(db_path=os.path.join(tmp, "server_state.db"), tick_seconds=tick_seconds)
+        loop = asyncio.new_event_loop()
+        front_end = AsyncFrontEnd(app_module.app, lambda: app_module.server_instance, port=0)
+        loop.run_until_complete(front_end.start())
+        threading.Thread(target=loop.run_forever, daemon=True).start()
+        stop = threading.Event()
+        ticker = threading.Thread(target=tick_loop, args=(lambda: app_module.server_instance,),
+                                  kwargs={"stop_event": stop}, daemon=True)
+        ticker.start()
+
+        rss_before = _rss_bytes()
+        ctx = multiprocessing.get_context("spawn")
+        connected, results = ctx.Queue(), ctx.Queue()
+        child = ctx.Process(target=_subscribe, args=(front_end.port, subscribers, duration, connected, results))
+        child.start()
+        opened, failed = connected.get()
+        rss_after = _rss_bytes()
+        delays = results.get()
+        child.join()
+
+        stop.set()
+        ticker.join()
+        asyncio.run_coroutine_threadsafe(front_end.close(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        app_module.server_instance.close()
+
+    return {
+        "subscribers": subscribers,
+        "connected": opened,
+        "failed": failed,
+        "tick_seconds": tick_seconds,
+        "events": len(delays),
+        "events_per_subscriber": len(delays) / max(1, opened),
+        "delivery_p50_ms": _percentile(delays, 0.5) * 1000,
+        "delivery_p99_ms": _percentile(delays, 0.99) * 1000,
+        "delivery_max_ms": max(delays, default=0.0) * 1000,
+        "server_rss_per_subscriber_kib": (rss_after - rss_before) / max(1, opened) / 1024,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tick fan-out to idle subscribers")
+    parser.add_argument("--subscribers", type=int, nargs="+", default=[100, 1000, 5000], help="Subscriber counts to measure")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds of ticks per subscriber count")
+    parser.add_argument("--tick-seconds", type=float, default=0.5, help="Tick duration of the benchmark server")
+    parser.add_argument("--output", help="Write the JSON report here")
+    args = parser.parse_args(argv)
+
+    results = []
+    for count in args.subscribers:
+        r = measure(count, args.duration, args.tick_seconds)
+        results.append(r)
+        print(f"subscribers={r['connected']:6d}/{count} (failed {r['failed']})  events/sub={r['events_per_subscriber']:.1f}  "
+              f"delivery p50={r['delivery_p50_ms']:.1f}ms p99={r['delivery_p99_ms']:.1f}ms max={r['delivery_max_ms']:.1f}ms  "
+              f"rss/sub={r['server_rss_per_subscriber_kib']:.1f}KiB")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""
+Achieved tick rate and jitter of the ticker at short tick durations.
+
+Runs tick_loop in real time on a fresh Server (in a temporary directory)
+and watches every published snapshot. A tick's jitter is how late it
+started relative to the fixed schedule tick_loop aims for. The per-tick
+work is the private-state HMAC, the secret ratchet, one public chain step
+and (every persist_interval) the encrypted DB write.
+
+Usage:
+    python -m benchmarks.ticks --tick-seconds 0.01 --duration 5
+    python -m benchmarks.ticks --tick-seconds 0.01 --persist-interval 0   # a DB write every tick
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.server import Server
+from src.ticker import tick_loop
+from src.metrics import METRICS
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+def measure(tick_seconds, duration, persist_interval=None):
+    METRICS.reset()
+    with tempfile.TemporaryDirectory() as tmp:
+        server = Server(db_path=os.path.join(tmp, "server_state.db"), tick_seconds=tick_seconds,
+                        persist_interval=persist_interval)
+        writes_before = METRICS.histogram("stage_seconds", stage="db_write").count
+        stop = threading.Event()
+        starts = {}  # tick -> clock time it started
+
+        def watch():
+            snap = server.snapshot()
+            while not stop.is_set():
+                snap = server.wait_for_change(snap, timeout=0.1)
+                starts[snap.current_t] = snap.tick_started_at
+
+        watcher = threading.Thread(target=watch, daemon=True)
+        ticker = threading.Thread(target=tick_loop, args=(lambda: server,), kwargs={"stop_event": stop}, daemon=True)
+        first_t = server.current_t
+        watcher.start()
+        ticker.start()
+        time.sleep(duration)
+        stop.set()
+        ticker.join()
+        watcher.join()
+        ticks = server.current_t - first_t
+        writes = METRICS.histogram("stage_seconds", stage="db_write").count - writes_before
+        server.close()
+
+    # Tick t is due at base + t * tick_seconds. Anchor the schedule at the
+    # least late tick, so jitter is measured against the best the loop did.
+    observed = sorted(starts.items())
+    offsets = [started - t * tick_seconds for t, started in observed]
+    base = min(offsets)
+    jitter = [offset - base for offset in offsets]
+    return {
+        "tick_seconds": tick_seconds,
+        "target_ticks_per_s": 1 / tick_seconds,
+        "ticks_per_s": ticks / duration,
+        "ticks": ticks,
+        "observed": len(observed),
+        "db_writes": writes,
+        "jitter_p50_ms": _percentile(jitter, 0.5) * 1000,
+        "jitter_p99_ms": _percentile(jitter, 0.99) * 1000,
+        "jitter_max_ms": max(jitter) * 1000,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ticker rate and jitter")
+    parser.add_argument("--tick-seconds", type=float, nargs="+", default=[0.1, 0.02, 0.01], help="Tick durations to measure")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per tick duration")
+    parser.add_argument("--persist-interval", type=float, help="Seconds between batched DB writes (default: the server's)")
+    parser.add_argument("--output", help="Write the JSON report here")
+    args = parser.parse_args(argv)
+
+    results = []
+    for tick_seconds in args.tick_seconds:
+        r = measure(tick_seconds, args.duration, args.persist_interval)
+        results.append(r)
+        print(f"tick={tick_seconds * 1000:6.1f}ms  {r['ticks_per_s']:7.1f}/{r['target_ticks_per_s']:.0f} ticks/s  "
+              f"jitter p50={r['jitter_p50_ms']:.2f}ms p99={r['jitter_p99_ms']:.2f}ms max={r['jitter_max_ms']:.2f}ms  "
+              f"db writes={r['db_writes']}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
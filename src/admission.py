@@ -0,0 +1,132 @@
+import math
+import threading
+from collections import OrderedDict
+
+from .clock import REAL_CLOCK
+from .scheduler import DeadlineScheduler, NORMAL
+
+# Shed reasons, also the `reason` label of timelock_requests_shed_total
+RATE_LIMITED = "rate_limited"
+CLIENT_BUSY = "client_busy"
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, at most `burst` saved up."""
+
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = now
+
+    def take(self, now, cost=1.0) -> float:
+        """Takes `cost` tokens. Returns 0 if admitted, else seconds until it would be."""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        return (cost - self.tokens) / self.rate
+
+
+class AdmissionController:
+    """
+    Optional per-client token buckets in front of a bounded pool of work
+    slots, which a DeadlineScheduler hands out most urgent first.
+
+    admit() either returns None (the caller now holds a slot and must call
+    release()) or (reason, retry_after_seconds) for a shed request:
+
+      * rate_limited: the client's bucket is empty (rate <= 0 disables this)
+      * client_busy: the client already holds or waits for max_per_client
+        slots (None or 0 disables this)
+      * queue_full: all max_in_flight slots are busy and max_queue more
+        urgent requests wait
+      * queue_timeout: waited queue_timeout seconds without getting a slot
+
+    Shedding early keeps the number of requests doing crypto (and fighting the
+    ticker thread for the GIL) bounded, so a well-behaved client waits at most
+    queue_timeout before its request starts.
+
+    The per-client limits are off by default: a "client" is an address, and
+    one AsyncTimeLockClient or every user behind a NAT shares one.
+    """
+
+    def __init__(self, rate=0.0, burst=40.0, max_in_flight=8, max_queue=32, queue_timeout=0.5,
+                 max_per_client=None, max_clients=10000, clock=REAL_CLOCK):
+        self.rate = rate
+        self.burst = burst
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.max_per_client = max_per_client or None
+        self.max_clients = max_clients
+        self.clock = clock
+
+        self._buckets = OrderedDict()  # client -> TokenBucket, least recently seen first
+        self._bucket_lock = threading.Lock()
+        self.scheduler = DeadlineScheduler(max_in_flight, max_queue)
+        self._client_lock = threading.Lock()
+        self._per_client = {}  # client -> slots held or waited for
+
+    @property
+    def in_flight(self):
+        return self.scheduler.in_flight
+
+    @property
+    def queued(self):
+        return self.scheduler.queued
+
+    def check_rate(self, client, cost=1.0) -> float:
+        """Seconds until `client` may spend `cost` tokens; 0 means it just did."""
+        if self.rate <= 0:
+            return 0.0
+        now = self.clock.time()
+        with self._bucket_lock:
+            bucket = self._buckets.get(client)
+            if bucket is None:
+                bucket = self._buckets[client] = TokenBucket(self.rate, self.burst, now)
+                if len(self._buckets) > self.max_clients:
+                    # A forgotten client starts again with a full bucket
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(client)
+            return bucket.take(now, cost)
+
+    def admit(self, client, cost=1.0, rank=NORMAL, deadline=None):
+        """
+        rank and deadline (clock time) order the request against others
+        waiting for a slot (see src/scheduler.py). Default deadline: now
+        plus queue_timeout.
+        """
+        retry_after = self.check_rate(client, cost)
+        if retry_after > 0:
+            return RATE_LIMITED, retry_after
+
+        with self._client_lock:
+            if self.max_per_client and self._per_client.get(client, 0) >= self.max_per_client:
+                return CLIENT_BUSY, self.queue_timeout
+            self._per_client[client] = self._per_client.get(client, 0) + 1
+
+        if deadline is None:
+            deadline = self.clock.time() + self.queue_timeout
+        shed = self.scheduler.acquire(rank, deadline, self.queue_timeout)
+        if shed:
+            self._forget(client)
+            return shed, self.queue_timeout
+        return None
+
+    def release(self, client):
+        self.scheduler.release()
+        self._forget(client)
+
+    def _forget(self, client):
+        with self._client_lock:
+            self._per_client[client] -= 1
+            if self._per_client[client] == 0:
+                del self._per_client[client]
+
+
+def retry_after_ticks(seconds, tick_seconds=1.0) -> int:
+    """Whole ticks a shed client should wait before retrying (at least one)."""
+    return max(1, math.ceil(seconds / tick_seconds))
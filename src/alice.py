@@ -1,4 +1,6 @@
-from .core import evolve_public_chain, derive_public_key_piece, hkdf, decrypt_aes_gcm
+import random
+from .levels import level_public_params
+from .core import evolve_public_chain, evolve_public_chain_from, derive_public_key_piece, hkdf, decrypt_aes_gcm
 
 def alice_compute_public_history(public_seed: bytes, public_salt: bytes, steps: int) -> list[bytes]:
     """
@@ -12,6 +14,56 @@ def alice_compute_checksum(history: list[bytes], t_start: int, t_end: int) -> by
     """
     return derive_public_key_piece(history, t_start, t_end)
 
+def alice_compute_window_checksum(public_seed: bytes, public_salt: bytes, t_start: int, t_end: int, cache=None, level=None) -> bytes:
+    """
+    Computes the chain up to t_end and the checksum for [t_start, t_end].
+    With a ChainCheckpointCache, resumes from the nearest cached checkpoint.
+    For a coarse level window (the "level" field of /encrypt), uses that
+    level's chain, derived from the base seed and salt.
+    Module-level so it can be shipped to a ProcessPoolExecutor.
+    """
+    public_seed, public_salt = level_public_params(public_seed, public_salt, level)
+    if cache is not None:
+        return cache.compute_checksum(public_seed, public_salt, t_start, t_end)
+    history = alice_compute_public_history(public_seed, public_salt, t_end)
+    return alice_compute_checksum(history, t_start, t_end)
+
+def alice_verify_checkpoints(public_seed: bytes, public_salt: bytes, checkpoints: list, spot_checks: int = 2) -> bool:
+    """
+    Spot-checks server-published checkpoints [(k, X_k, X_{k-1}), ...].
+    Picks `spot_checks` random segments between consecutive checkpoints
+    (X_0 counts as the first) and re-evolves them. The cost is a few
+    segments instead of the whole chain; a lying server is detected with
+    probability spot_checks / len(checkpoints) per check, and can at worst
+    make verification fail, never release a wrong key.
+    """
+    points = [(0, public_seed, bytes(32))] + sorted(checkpoints)
+    segments = list(range(1, len(points)))
+    for i in random.sample(segments, min(spot_checks, len(segments))):
+        k0, x0, prev0 = points[i - 1]
+        k1, x1, prev1 = points[i]
+        chain = evolve_public_chain_from(x0, prev0, public_salt, k0, k1)
+        if k1 <= k0 or chain[-1] != x1 or chain[-2] != prev1:
+            return False
+    return True
+
+def alice_compute_window_checksum_from_checkpoints(public_seed: bytes, public_salt: bytes, checkpoints: list, t_start: int, t_end: int, cache=None) -> bytes:
+    """
+    Computes the checksum for [t_start, t_end], evolving from the nearest
+    checkpoint at or before t_start instead of X_0.
+    With a ChainCheckpointCache, uses the cache instead when it holds a
+    checkpoint at least as near. Points evolved from `checkpoints` (which
+    were only spot-checked) are never written to the cache.
+    """
+    k, x_k, x_prev = max(
+        (c for c in checkpoints if c[0] <= t_start),
+        default=(0, public_seed, bytes(32)),
+    )
+    if cache is not None and cache.nearest(public_seed, public_salt, t_start)[0] >= k:
+        return cache.compute_checksum(public_seed, public_salt, t_start, t_end)
+    chain = evolve_public_chain_from(x_k, x_prev, public_salt, k, t_end)
+    return derive_public_key_piece(chain, t_start - k, t_end - k)
+
 def alice_derive_final_key(k_public: bytes, k_private: bytes, length: int = 32) -> bytes:
     """
     Derives the final decryption key from K_public and K_private.
@@ -1,6 +1,24 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, request, jsonify, render_template, g, Response
 from src.server import Server
+from src.metrics import METRICS
+from src.clock import REAL_CLOCK
+from src.ticker import tick_loop
+from src import profiling
+from src.request_trace import TraceWriter
+from src.audit import AuditLog, classify_release_error
+from src.shards import ShardPool
+from src.replication import ReplicaNode, parse_peers, REPLICA_DB_TEMPLATE
+from src.admission import AdmissionController, retry_after_ticks
+from src.scheduler import RELEASE_DUE, NORMAL, BACKGROUND
+from src.levels import base_ticks, level_public_params
+from src.async_server import serve as serve_async
+from src import stream_aead
+from src.epochs import EpochManager, EpochRetired
 import binascii
+import functools
+import hmac
+import math
+import os
 import time
 import threading
 
@@ -9,37 +27,419 @@ app = Flask(__name__)
 # Initialize server
 # In a real app, we'd need persistent storage or a singleton that doesn't reset on reload.
 # For this PoC, a global variable is fine as long as we don't use multiple workers.
-server_instance = Server()
+# Server is thread-safe: ticks and burns go through its writer thread, and
+# request handlers read immutable snapshots, so threaded=True is fine.
+# server_instance is the current chain epoch; POST /admin/epochs/rollover
+# swaps in a prepared one while the old epoch keeps releasing for
+# EPOCH_OVERLAP_TICKS (see src/epochs.py).
+epochs = EpochManager()
+server_instance = epochs.open_current()
 
-def ticker_loop():
+def ticker_loop(clock=REAL_CLOCK, stop_event=None):
     """Background thread to advance server time every second."""
     print("Starting Timekeeper Ticker...")
-    while True:
-        time.sleep(1)
-        try:
-            # We must refresh state to get the latest t from DB (in case other processes moved it)
-            server_instance.refresh_state()
-            # Advance by 1 tick
-            server_instance.advance_private_state_to(server_instance.current_t + 1)
-            # print(f"TICK: {server_instance.current_t}") 
-        except Exception as e:
-            print(f"Ticker error: {e}")
+    # We must refresh state to get the latest t from DB (in case other processes moved it)
+    tick_loop(lambda: server_instance, clock, refresh=True, stop_event=stop_event,
+              after_tick=lambda: epochs.tick_retiring())
+
+def epoch_server(epoch=None, t_end=None, level=None):
+    """
+    The Server of chain epoch `epoch` (default: the current one), held open
+    until the request ends. A retiring epoch only takes windows (t_end, of
+    `level`) that close by its last tick.
+    """
+    try:
+        server, retire_t = epochs.acquire(server_instance, epoch)
+    except EpochRetired:
+        # A rollover retired the Server we read; server_instance is already its successor
+        server, retire_t = epochs.acquire(server_instance, epoch)
+    g.setdefault("epoch_servers", []).append(server)
+    if retire_t is not None and isinstance(t_end, int) and base_ticks(level, t_end)[1] > retire_t:
+        raise ValueError(f"Epoch {epoch} retires after t={retire_t}, before this window ends")
+    return server
+
+@app.teardown_request
+def release_epoch_servers(exc):
+    for server in g.pop("epoch_servers", ()):
+        epochs.release(server)
+
+def rollover_epoch(overlap_ticks=None):
+    """
+    Switches server_instance to the next chain epoch and prepares the one
+    after it. The swap happens before the old epoch can be retired, so no
+    request picks up a closed Server.
+    """
+    def publish(nxt):
+        global server_instance
+        server_instance = nxt
+    nxt = epochs.rollover(server_instance, overlap_ticks, publish=publish)
+    epochs.prepare(nxt)
+    return nxt
+
+# Replicated mode (REPLICA_ID=i, REPLICA_PEERS=host:port,...): this process is
+# one Timekeeper node; the elected leader ticks and serves encrypt/verify
+# (see src/replication.py). Started in __main__ instead of ticker_loop.
+REPLICA_PEERS = os.environ.get('REPLICA_PEERS')
+replica_node = None
+
+# Opt-in request capture for offline replay (see src/request_trace.py)
+TRACE_CAPTURE = os.environ.get('TRACE_CAPTURE')
+trace_writer = TraceWriter(TRACE_CAPTURE, server_instance.clock) if TRACE_CAPTURE else None
+
+# Opt-in audit log of key releases (see src/audit.py). Records who asked for
+# which window and the outcome, never keys; writes happen off the request path.
+AUDIT_LOG = os.environ.get('AUDIT_LOG')
+audit_log = AuditLog(
+    AUDIT_LOG,
+    capacity=int(os.environ.get('AUDIT_CAPACITY', 65536)),
+    overflow=os.environ.get('AUDIT_OVERFLOW', 'drop_newest'),
+    fsync=os.environ.get('AUDIT_FSYNC') == '1',
+) if AUDIT_LOG else None
+
+def audit_release(event, outcome, t_start, t_end, nonce, level=None):
+    if audit_log:
+        audit_log.record(event, outcome, server_instance.current_t, t_start, t_end,
+                         request.remote_addr, nonce, level)
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    if trace_writer:
+        g.arrival = server_instance.clock.time()
+        g.arrival_tick = server_instance.current_t
+        g.arrival_tick_started_at = server_instance.tick_started_at
+        g.arrival_epoch = server_instance.epoch
+
+def _trace_fields():
+    """Window, level and epoch of a request, from its JSON body or (streaming encrypt, status) query string."""
+    data = request.get_json(silent=True) if request.method == 'POST' else None
+    if not isinstance(data, dict):
+        fields = {name: request.args.get(name, type=int) for name in ('t_start', 't_end', 'epoch')}
+        fields['level'] = request.args.get('level')
+        return fields
+    fields = {name: data.get(name) for name in ('t_start', 't_end', 'level', 'epoch')}
+    items = data.get('items')
+    if fields['t_start'] is None and isinstance(items, list):
+        # A batch: its earliest window start
+        starts = [item.get('t_start') for item in items if isinstance(item, dict)]
+        fields['t_start'] = min((t for t in starts if isinstance(t, int)), default=None)
+    return fields
+
+@app.after_request
+def record_request_latency(response):
+    started = getattr(g, 'request_started', None)
+    if started is not None:
+        endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+        METRICS.observe("request_seconds", time.perf_counter() - started, endpoint=endpoint, method=request.method)
+    if trace_writer and hasattr(g, 'arrival'):
+        fields = _trace_fields()
+        trace_writer.record(
+            request.url_rule.rule if request.url_rule else request.path,
+            response.status_code, request.content_length or 0,
+            g.arrival_tick, fields['t_start'], fields['t_end'],
+            g.arrival, g.arrival_tick_started_at,
+            fields['level'], fields['epoch'], g.arrival_epoch,
+        )
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Per-stage latency histograms and server counters in Prometheus text format."""
+    METRICS.set_gauge("current_tick", server_instance.current_t)
+    METRICS.set_gauge("nonce_set_size", len(server_instance.seen_nonces))
+    METRICS.set_gauge("public_history_length", len(server_instance.public_history))
+    # The ticker is due one tick after tick_started_at
+    snap = server_instance.snapshot()
+    METRICS.set_gauge("tick_lag_seconds", max(0.0, server_instance.clock.time() - snap.tick_started_at - snap.tick_seconds))
+    METRICS.set_gauge("admission_in_flight", admission.in_flight)
+    METRICS.set_gauge("admission_queued", admission.queued)
+    return Response(METRICS.render(), mimetype="text/plain; version=0.0.4")
+
+# Admission control for the endpoints that do crypto or advance the state.
+# A bounded pool of work slots, behind per-client limits that are off unless
+# ADMISSION_RATE / ADMISSION_MAX_PER_CLIENT are set; everything else is shed with 429.
+admission = AdmissionController(
+    rate=float(os.environ.get('ADMISSION_RATE', 0)),
+    burst=float(os.environ.get('ADMISSION_BURST', 40)),
+    max_in_flight=int(os.environ.get('ADMISSION_MAX_IN_FLIGHT', 8)),
+    max_queue=int(os.environ.get('ADMISSION_MAX_QUEUE', 32)),
+    queue_timeout=float(os.environ.get('ADMISSION_QUEUE_TIMEOUT', 0.5)),
+    max_per_client=int(os.environ.get('ADMISSION_MAX_PER_CLIENT', 0)),
+)
+
+PRIORITY_CLASSES = {RELEASE_DUE: "release_due", NORMAL: "normal", BACKGROUND: "background"}
+
+def _tick_end(t):
+    """Server clock time at which tick t ends, extrapolated from the current tick."""
+    snap = server_instance.snapshot()
+    return snap.tick_started_at + (t - snap.current_t + 1) * snap.tick_seconds
+
+def _request_ticks():
+    """The request's window in base ticks (a coarse level's window spans many)."""
+    data = request.get_json(silent=True) if request.method == 'POST' else None
+    data = data if isinstance(data, dict) else {}
+    t_start, t_end = data.get('t_start'), data.get('t_end')
+    t_start, t_end = (t_start if isinstance(t_start, int) else None), (t_end if isinstance(t_end, int) else None)
+    try:
+        level = data.get('level')
+        return (base_ticks(level, t_start)[0] if t_start is not None else None,
+                base_ticks(level, t_end)[1] if t_end is not None else None)
+    except ValueError:
+        return t_start, t_end
+
+def _request_epoch_server():
+    """The Server of the request's epoch, or the current one if it names none (or an unknown one)."""
+    data = request.get_json(silent=True) if request.method == 'POST' else None
+    try:
+        return epoch_server(data.get('epoch') if isinstance(data, dict) else None)
+    except ValueError:
+        return server_instance
+
+def _request_epoch_offset():
+    """The request's epoch tick minus the current epoch's (epochs tick in lockstep)."""
+    return _request_epoch_server().current_t - server_instance.current_t
+
+def release_priority():
+    """A verify for the current tick must run before the tick ends; anything else can wait."""
+    _, t_end = _request_ticks()
+    offset = _request_epoch_offset()
+    current = server_instance.current_t + offset
+    if t_end is not None and t_end <= current:
+        return RELEASE_DUE, _tick_end(current - offset)
+    # Not due yet: will be turned away as "Too early" anyway
+    return NORMAL, _tick_end(t_end - offset) if t_end is not None else None
+
+def encrypt_priority():
+    """Encrypts are ordered by slack: the start of their t_start tick."""
+    t_start, _ = _request_ticks()
+    if t_start is None:
+        return NORMAL, None
+    # t_start is in the request's epoch numbering
+    offset = _request_epoch_offset()
+    return NORMAL, _tick_end(max(t_start - 1 - offset, server_instance.current_t))
+
+def background_priority():
+    return BACKGROUND, None
+
+def admission_controlled(cost, priority=None):
+    """
+    Admits the request (spending `cost` tokens of the client's bucket, or
+    cost() for a per-request cost) or sheds it with 429 and a retry-after in
+    ticks. priority() returns (class, deadline) for the deadline scheduler;
+    requests that finish after their deadline are counted in
+    timelock_deadline_missed_total. A streamed response holds its slot until
+    it is closed.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            client = request.remote_addr or "unknown"
+            rank, deadline = priority() if priority else (NORMAL, None)
+            shed = admission.admit(client, cost() if callable(cost) else cost, rank, deadline)
+            if shed:
+                reason, retry_after = shed
+                METRICS.inc("requests_shed_total", endpoint=request.url_rule.rule, reason=reason)
+                ticks = retry_after_ticks(retry_after, server_instance.tick_seconds)
+                response = jsonify({"error": f"Too many requests ({reason}). Retry in {ticks} tick(s).",
+                                    "reason": reason, "retry_after_ticks": ticks})
+                # Retry-After is in whole seconds, whatever the tick duration
+                response.headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+                return response, 429
+            endpoint = request.url_rule.rule
+
+            def finish():
+                admission.release(client)
+                if deadline is not None:
+                    labels = {"endpoint": endpoint, "priority": PRIORITY_CLASSES[rank]}
+                    METRICS.inc("deadline_scheduled_total", **labels)
+                    if server_instance.clock.time() > deadline:
+                        METRICS.inc("deadline_missed_total", **labels)
+            try:
+                result = view(*args, **kwargs)
+            except BaseException:
+                finish()
+                raise
+            if isinstance(result, Response) and result.is_streamed:
+                # The body is produced after the view returns, outside the request context
+                result.call_on_close(finish)
+            else:
+                finish()
+            return result
+        return wrapper
+    return decorator
+
+# Admin endpoints are disabled unless ADMIN_TOKEN is set
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+MAX_PROFILE_SECONDS = 60
+
+def admin_only(view):
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not ADMIN_TOKEN:
+            return jsonify({"error": "Admin endpoints are disabled (ADMIN_TOKEN not set)"}), 404
+        token = request.headers.get('X-Admin-Token', '')
+        if not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+            return jsonify({"error": "Forbidden"}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+@app.route('/admin/profile', methods=['GET'])
+@admin_only
+def admin_profile():
+    """
+    Samples the stacks of all threads (request handlers and ticker) for
+    ?seconds=N and returns collapsed stacks ('thread;file:func;... count').
+    ?threads=ticker,Thread limits sampling to matching thread names.
+    """
+    try:
+        seconds = min(float(request.args.get('seconds', 5)), MAX_PROFILE_SECONDS)
+        interval = max(float(request.args.get('interval', 0.005)), 0.001)
+    except ValueError:
+        return jsonify({"error": "seconds and interval must be numbers"}), 400
+    threads = request.args.get('threads')
+    stacks = profiling.sample_stacks(seconds, interval, threads.split(',') if threads else None)
+    return Response(profiling.format_collapsed(stacks), mimetype="text/plain")
+
+@app.route('/admin/allocations/snapshot', methods=['POST'])
+@admin_only
+def admin_allocations_snapshot():
+    """Stores a tracemalloc baseline for later /admin/allocations diffs."""
+    profiling.take_baseline_snapshot()
+    return jsonify({"message": "Baseline snapshot stored",
+                    "structures": profiling.server_structure_sizes(server_instance)})
+
+@app.route('/admin/allocations/snapshot', methods=['DELETE'])
+@admin_only
+def admin_allocations_stop():
+    """Drops the baseline and stops tracemalloc, which slows every allocation while on."""
+    dropped = profiling.stop_tracing()
+    return jsonify({"message": "Baseline dropped" if dropped else "No baseline stored"})
+
+@app.route('/admin/allocations', methods=['GET'])
+@admin_only
+def admin_allocations():
+    """
+    Top-N tracemalloc allocation growth versus the stored baseline, or over
+    ?seconds=N if no baseline was stored. Also reports the sizes of
+    public_history and nonce_timestamps, the long-uptime growth suspects.
+    """
+    try:
+        top = int(request.args.get('top', 20))
+        seconds = min(float(request.args.get('seconds', 5)), MAX_PROFILE_SECONDS)
+    except ValueError:
+        return jsonify({"error": "top and seconds must be numbers"}), 400
+    return jsonify({
+        "top": profiling.allocation_diff(top, seconds),
+        "structures": profiling.server_structure_sizes(server_instance),
+    })
 
 @app.route('/', methods=['GET'])
 def index():
     return render_template('index.html')
 
 @app.route('/status', methods=['GET'])
+@admission_controlled(cost=0, priority=background_priority)
 def status():
-    server_instance.refresh_state()
+    # ?epoch=N reports a retiring epoch instead of the current one
+    try:
+        server = epoch_server(request.args.get('epoch', type=int))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 404
+    server.refresh_state()
     return jsonify({
-        "current_t": server_instance.current_t,
-        "public_history_len": len(server_instance.public_history)
+        "epoch": server.epoch,
+        "current_t": server.current_t,
+        "public_history_len": len(server.public_history),
+        # Server wall clock, for RTT-compensated client sync (see TimeKeeper.sync)
+        "server_time": server.clock.time(),
+        "tick_started_at": server.tick_started_at,
+        "tick_seconds": server.tick_seconds,
+        # Live epochs, for clients holding windows of a retiring one
+        "epochs": epochs.describe(server_instance),
+        "replica": replica_node.status() if replica_node else None
     })
 
+@app.route('/checkpoints', methods=['GET'])
+@admission_controlled(cost=0, priority=background_priority)
+def checkpoints():
+    """Published public chain checkpoints (see Server.get_checkpoints)."""
+    server = epoch_server()  # held open until the response is built
+    server.refresh_state()
+    try:
+        since = int(request.args.get('since', 0))
+        limit = int(request.args.get('limit', 0))
+    except ValueError:
+        return jsonify({"error": "since and limit must be integers"}), 400
+    if since < 0 or limit < 0:
+        return jsonify({"error": "since and limit must not be negative"}), 400
+    limit = limit or None  # 0: no limit
+    try:
+        result = server.get_checkpoints(since, limit)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 404
+    return jsonify({
+        "interval": server.checkpoint_interval,
+        "current_t": server.current_t,
+        "public_seed": server.public_seed.hex(),
+        "public_salt": server.public_salt.hex(),
+        "checkpoints": [
+            {"k": k, "x_k": x_k.hex(), "x_prev": x_prev.hex()}
+            for k, x_k, x_prev in result
+        ]
+    })
+
+# Sharded mode (SHARDS=N): independent chains in N processes, addressed by
+# tenant under /tenants/<tenant>/... (see src/shards.py). Started in __main__.
+SHARDS = int(os.environ.get('SHARDS', '0'))
+shard_pool = None
+
+def tenant_server(view):
+    """Passes the tenant's shard call to the view, or 404s when not sharded."""
+    @functools.wraps(view)
+    def wrapper(tenant):
+        if shard_pool is None:
+            return jsonify({"error": "Sharded mode is disabled (SHARDS not set)"}), 404
+        return view(tenant, functools.partial(shard_pool.call, tenant))
+    return wrapper
+
+@app.route('/tenants/<tenant>/status', methods=['GET'])
+@tenant_server
+def tenant_status(tenant, call):
+    result = call("status")
+    result["shard"] = shard_pool.shard_of(tenant)
+    return jsonify(result)
+
+@app.route('/tenants/<tenant>/encrypt', methods=['POST'])
+@admission_controlled(cost=1)
+@tenant_server
+def tenant_encrypt(tenant, call):
+    return _encrypt(functools.partial(call, "encrypt_for_alice"))
+
+@app.route('/tenants/<tenant>/verify', methods=['POST'])
+# Shard ticks are not known here; treat every tenant release as due
+@admission_controlled(cost=2, priority=lambda: (RELEASE_DUE, None))
+@tenant_server
+def tenant_verify(tenant, call):
+    return _verify(functools.partial(call, "verify_checksum_and_release_private_key_piece"))
+
+@app.route('/tenants/<tenant>/verify/batch', methods=['POST'])
+@admission_controlled(cost=2, priority=lambda: (RELEASE_DUE, None))
+@tenant_server
+def tenant_verify_batch(tenant, call):
+    return _verify_batch(functools.partial(call, "verify_checksums_and_release_batch"))
+
 @app.route('/encrypt', methods=['POST'])
+@admission_controlled(cost=1, priority=encrypt_priority)
 def encrypt():
-    server_instance.refresh_state()
+    data = request.json
+    try:
+        server = epoch_server(data.get('epoch'), data.get('t_end'), data.get('level'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    server.refresh_state()
+    return _encrypt((replica_node or server).encrypt_for_alice, server.epoch)
+
+def _encrypt(encrypt_for_alice, epoch=None):
     data = request.json
     plaintext_hex = data.get('plaintext')
     t_start = data.get('t_start')
@@ -57,7 +457,8 @@ def encrypt():
 
     try:
         plaintext = binascii.unhexlify(plaintext_hex)
-        result = server_instance.encrypt_for_alice(plaintext, t_start, t_end, request_nonce)
+        # Optional coarse level ("minute", "hour", "day"; see src/levels.py)
+        result = encrypt_for_alice(plaintext, t_start, t_end, request_nonce, data.get('level'))
         
         # Convert bytes to hex for JSON response
         response = {
@@ -69,13 +470,76 @@ def encrypt():
             "public_salt": result["public_salt"].hex(),
             "request_nonce": request_nonce
         }
+        if "level" in result:
+            response["level"] = result["level"]
+        if epoch is not None:
+            response["epoch"] = epoch
         return jsonify(response)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# Streaming encrypt costs one token per started STREAM_COST_BYTES of
+# plaintext, capped at a full bucket so any payload can be admitted
+STREAM_COST_BYTES = 1024 * 1024
+
+def stream_cost():
+    return min(admission.burst, 1 + (request.content_length or 0) // STREAM_COST_BYTES)
+
+@app.route('/encrypt/stream', methods=['POST'])
+@admission_controlled(cost=stream_cost)
+def encrypt_stream():
+    """
+    Streaming encrypt for large payloads. The raw request body is the
+    plaintext; t_start, t_end, request_nonce and optional level, epoch and
+    chunk_size are query parameters. The response is the chunked AEAD stream
+    (src/stream_aead.py), its header carrying what /encrypt returns in JSON.
+    The body is read, sealed and written one chunk at a time, so memory per
+    request does not grow with the payload.
+    """
+    if request.content_length is None:
+        return jsonify({"error": "Content-Length is required"}), 411
+    args = request.args
+    t_start, t_end = args.get('t_start', type=int), args.get('t_end', type=int)
+    request_nonce = args.get('request_nonce')
+    if t_start is None or t_end is None:
+        return jsonify({"error": "t_start and t_end must be integers"}), 400
+    if not request_nonce:
+        return jsonify({"error": "Missing request_nonce"}), 400
+    level = args.get('level')
+    try:
+        server = epoch_server(args.get('epoch', type=int), t_end, level)
+        server.refresh_state()
+        result = (replica_node or server).encryption_key_for_alice(t_start, t_end, request_nonce, level)
+        header = stream_aead.new_header({
+            "t_start": result["t_start"],
+            "t_end": result["t_end"],
+            "public_seed": result["public_seed"].hex(),
+            "public_salt": result["public_salt"].hex(),
+            "request_nonce": request_nonce,
+            "level": result.get("level"),
+            "epoch": server.epoch,
+        }, args.get('chunk_size', stream_aead.CHUNK_SIZE, type=int))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+    body = request.stream
+    response = Response(stream_aead.encrypt_stream(result["k_final"], body.read, header),
+                        mimetype="application/octet-stream")
+    response.headers["Content-Length"] = str(stream_aead.sealed_length(request.content_length, header))
+    return response
+
 @app.route('/verify', methods=['POST'])
+# Release plus burn: two state advances
+@admission_controlled(cost=2, priority=release_priority)
 def verify():
-    server_instance.refresh_state()
+    try:
+        server = epoch_server(request.json.get('epoch'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    server.refresh_state()
+    return _verify((replica_node or server).verify_checksum_and_release_private_key_piece)
+
+def _verify(verify_checksum_and_release_private_key_piece):
     data = request.json
     checksum_hex = data.get('checksum')
     t_start = data.get('t_start')
@@ -90,10 +554,12 @@ def verify():
     request_nonce = data.get('request_nonce')
     if not request_nonce:
         return jsonify({"error": "Missing request_nonce"}), 400
+    level = data.get('level')
 
     try:
         checksum = binascii.unhexlify(checksum_hex)
-        keys = server_instance.verify_checksum_and_release_private_key_piece(checksum, t_start, t_end, request_nonce)
+        keys = verify_checksum_and_release_private_key_piece(checksum, t_start, t_end, request_nonce, level)
+        audit_release("release", "released", t_start, t_end, request_nonce, level)
         
         response = {
             "k_public": keys["k_public"].hex(),
@@ -101,28 +567,88 @@ def verify():
         }
         return jsonify(response)
     except Exception as e:
+        audit_release("release", classify_release_error(str(e)), t_start, t_end, request_nonce, level)
         return jsonify({"error": str(e)}), 400
 
+@app.route('/verify/batch', methods=['POST'])
+# One burn for the whole batch; the checksums are cheap next to it
+@admission_controlled(cost=2, priority=release_priority)
+def verify_batch():
+    try:
+        server = epoch_server(request.json.get('epoch'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    server.refresh_state()
+    return _verify_batch((replica_node or server).verify_checksums_and_release_batch)
+
+def _verify_batch(verify_checksums_and_release_batch):
+    """
+    Body: {"t_end", "request_nonce", "items": [{"t_start", "checksum"}, ...], "level"?}.
+    Returns k_private once and one result per item, in order.
+    """
+    data = request.json
+    t_end = data.get('t_end')
+    items = data.get('items')
+    request_nonce = data.get('request_nonce')
+    level = data.get('level')
+
+    if not isinstance(t_end, int):
+        return jsonify({"error": "t_end must be an integer"}), 400
+    if not request_nonce:
+        return jsonify({"error": "Missing request_nonce"}), 400
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "items must be a non-empty list"}), 400
+
+    parsed = []
+    for i, item in enumerate(items):
+        t_start = item.get('t_start') if isinstance(item, dict) else None
+        if not isinstance(t_start, int):
+            return jsonify({"error": f"items[{i}]: t_start must be an integer"}), 400
+        try:
+            parsed.append((t_start, binascii.unhexlify(item.get('checksum') or "")))
+        except (binascii.Error, TypeError):
+            return jsonify({"error": f"items[{i}]: checksum must be hex"}), 400
+
+    t_first = min(t_start for t_start, _ in parsed)
+    try:
+        result = verify_checksums_and_release_batch(parsed, t_end, request_nonce, level)
+    except Exception as e:
+        audit_release("batch_release", classify_release_error(str(e)), t_first, t_end, request_nonce, level)
+        return jsonify({"error": str(e)}), 400
+
+    k_private = result["k_private"]
+    audit_release("batch_release", "released" if k_private else "invalid_checksum", t_first, t_end, request_nonce, level)
+    return jsonify({
+        "t_end": t_end,
+        "k_private": k_private.hex() if k_private else None,
+        "released": sum(1 for r in result["results"] if "k_public" in r),
+        "results": [{"k_public": r["k_public"].hex()} if "k_public" in r else r for r in result["results"]],
+    })
+
 from src.alice import alice_compute_public_history, alice_compute_checksum, alice_derive_final_key, alice_decrypt
 
 @app.route('/client-helper', methods=['POST'])
+# Recomputes the public chain from X_0, then verifies
+@admission_controlled(cost=4, priority=release_priority)
 def client_helper():
     """
     Helper endpoint for the web UI to simulate Alice's client-side work.
     Avoids re-implementing crypto in JS.
     """
-    server_instance.refresh_state()
     data = request.json
     try:
+        server = epoch_server(data.get("epoch"))
+        server.refresh_state()
         ciphertext = binascii.unhexlify(data["ciphertext"])
         nonce = binascii.unhexlify(data["nonce"])
         pub_seed = binascii.unhexlify(data["public_seed"])
         pub_salt = binascii.unhexlify(data["public_salt"])
         t_start = data["t_start"]
         t_end = data["t_end"]
+        level = data.get("level")
         
-        # 1. Compute Chain
-        history = alice_compute_public_history(pub_seed, pub_salt, t_end)
+        # 1. Compute Chain (of the window's level)
+        history = alice_compute_public_history(*level_public_params(pub_seed, pub_salt, level), t_end)
         
         # 2. Compute Checksum
         checksum = alice_compute_checksum(history, t_start, t_end)
@@ -132,7 +658,12 @@ def client_helper():
         # because the encryption nonce was already used!
         import os
         verify_nonce = os.urandom(8).hex()
-        keys = server_instance.verify_checksum_and_release_private_key_piece(checksum, t_start, t_end, verify_nonce)
+        try:
+            keys = server.verify_checksum_and_release_private_key_piece(checksum, t_start, t_end, verify_nonce, level)
+        except Exception as e:
+            audit_release("client_helper_release", classify_release_error(str(e)), t_start, t_end, verify_nonce, level)
+            raise
+        audit_release("client_helper_release", "released", t_start, t_end, verify_nonce, level)
         
         # 4. Decrypt
         k_final = alice_derive_final_key(keys["k_public"], keys["k_private"])
@@ -146,22 +677,54 @@ def client_helper():
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
+@app.route('/admin/epochs/rollover', methods=['POST'])
+@admin_only
+def admin_epoch_rollover():
+    """Switches to the next chain epoch. Body: {"overlap_ticks"?} (default EPOCH_OVERLAP_TICKS)."""
+    if replica_node:
+        return jsonify({"error": "Epoch rollover is not supported in replicated mode"}), 400
+    overlap_ticks = (request.get_json(silent=True) or {}).get('overlap_ticks')
+    if overlap_ticks is not None and (not isinstance(overlap_ticks, int) or overlap_ticks < 0):
+        return jsonify({"error": "overlap_ticks must be a non-negative integer"}), 400
+    started = time.perf_counter()
+    server = rollover_epoch(overlap_ticks)
+    return jsonify({"epoch": server.epoch, "current_t": server.current_t,
+                    "epochs": epochs.describe(server), "seconds": time.perf_counter() - started})
+
 @app.route('/reset', methods=['POST'])
 def reset():
-    global server_instance
-    # Close existing connection if any (not needed with context managers)
-    
-    # Delete the DB file to truly reset
-    import os
-    if os.path.exists("server_state.db"):
-        os.remove("server_state.db")
-        
-    server_instance = Server()
-    return jsonify({"message": "Server reset complete"})
+    # A fresh chain is a rollover without overlap: the new epoch is built
+    # before the old one (and its DB file) goes away
+    if replica_node:
+        return jsonify({"error": "Reset is not supported in replicated mode"}), 400
+    rollover_epoch(overlap_ticks=0)
+    return jsonify({"message": "Server reset complete", "epoch": server_instance.epoch})
+
+# FRONT_END=asyncio serves the same routes from one event loop with
+# keep-alive and GET /ticks (see src/async_server.py) instead of app.run.
+FRONT_END = os.environ.get('FRONT_END', 'flask')
 
 if __name__ == '__main__':
-    # Start the Timekeeper in the background
-    t = threading.Thread(target=ticker_loop, daemon=True)
-    t.start()
+    if REPLICA_PEERS:
+        node_id = int(os.environ['REPLICA_ID'])
+        server_instance = Server(db_path=REPLICA_DB_TEMPLATE.format(node_id=node_id))
+        replica_node = ReplicaNode(node_id, parse_peers(REPLICA_PEERS), server_instance).start()
+    else:
+        # Start the Timekeeper in the background
+        t = threading.Thread(target=ticker_loop, daemon=True, name="ticker")
+        t.start()
+        # Build the next chain epoch now so a rollover only has to switch
+        epochs.prepare(server_instance)
+
+    if SHARDS:
+        shard_pool = ShardPool(SHARDS, db_dir=os.environ.get('SHARD_DIR', '.')).start()
+        print(f"Started {SHARDS} shards")
     
-    app.run(port=5001)
+    port = int(os.environ.get("PORT", 5001))
+    if FRONT_END == 'asyncio':
+        serve_async(app, lambda: server_instance, port=port,
+                    workers=int(os.environ.get('FRONT_END_WORKERS', 16)),
+                    max_pending=int(os.environ.get('FRONT_END_MAX_PENDING', 256)),
+                    keepalive_timeout=float(os.environ.get('KEEPALIVE_TIMEOUT', 30)))
+    else:
+        app.run(port=port)
@@ -0,0 +1,322 @@
+import asyncio
+import binascii
+import json
+import os
+from urllib.parse import urlsplit
+
+from src.alice import (
+    alice_compute_window_checksum, alice_compute_window_checksum_from_checkpoints,
+    alice_verify_checkpoints, alice_derive_final_key, alice_decrypt,
+)
+from src.levels import base_ticks, is_base
+
+BASE_URL = os.environ.get("BASE_URL", "http://localhost:5001")
+
+
+class AsyncTimeLockClient:
+    """
+    asyncio client for the Timekeeper HTTP API.
+
+    Uses only asyncio streams (no extra network dependencies), so a single
+    process can keep thousands of encrypt/verify flows in flight. Concurrency
+    against the server is bounded by a semaphore, chain computation runs in
+    an executor, and verify calls are scheduled to land on their target tick.
+    """
+
+    def __init__(self, base_url=BASE_URL, max_concurrency=100, executor=None, timeout=10.0, tick_seconds=1.0, cache=None, on_response=None):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self.tick_seconds = tick_seconds
+        self.executor = executor
+        self.cache = cache  # Optional ChainCheckpointCache
+        self.checkpoints = {}  # (public_seed, public_salt) -> verified server checkpoints [(k, X_k, X_{k-1})]
+        # Optional callback(method, path, status, seconds) for latency metrics
+        self.on_response = on_response
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+        # Tick estimate: server was at _sync_t when our loop clock read _sync_at.
+        self._sync_t = None
+        self._sync_at = None
+        self.epoch = None
+        self._epoch_offsets = {}
+
+    async def _request(self, method: str, path: str, payload: dict = None):
+        """Sends one HTTP/1.1 request and returns (status_code, json_body)."""
+        body = json.dumps(payload).encode() if payload is not None else b""
+        head = (
+            f"{method} {path} HTTP/1.1\r\n"
+            f"Host: {self.host}:{self.port}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: close\r\n\r\n"
+        ).encode()
+
+        async with self._semaphore:
+            started = asyncio.get_running_loop().time()
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port), self.timeout
+            )
+            try:
+                writer.write(head + body)
+                await writer.drain()
+                status, headers = await asyncio.wait_for(self._read_head(reader), self.timeout)
+                length = headers.get("content-length")
+                if length is not None:
+                    raw = await asyncio.wait_for(reader.readexactly(int(length)), self.timeout)
+                else:
+                    raw = await asyncio.wait_for(reader.read(), self.timeout)
+            finally:
+                writer.close()
+                try:
+                    await writer.wait_closed()
+                except (ConnectionError, OSError):
+                    pass
+            if self.on_response:
+                self.on_response(method, path.split("?")[0], status, asyncio.get_running_loop().time() - started)
+
+        try:
+            data = json.loads(raw) if raw else {}
+        except ValueError:
+            data = {"error": raw.decode(errors="replace")}
+        return status, data
+
+    @staticmethod
+    async def _read_head(reader):
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError("Server closed connection without a response")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        return status, headers
+
+    async def status(self) -> dict:
+        status, data = await self._request("GET", "/status")
+        if status != 200:
+            raise ValueError(data.get("error", f"Status failed ({status})"))
+        return data
+
+    async def sync(self) -> int:
+        """
+        Fetches the server tick and anchors the local tick estimate to the
+        local time at which that tick started.
+        """
+        loop = asyncio.get_running_loop()
+        sent = loop.time()
+        data = await self.status()
+        received = loop.time()
+        self._sync_t = data["current_t"]
+        # Live chain epochs (src/epochs.py): epoch -> its tick minus the current epoch's
+        self.epoch = data.get("epoch")
+        self._epoch_offsets = {e["epoch"]: e["current_t"] - data["current_t"] for e in data.get("epochs") or []}
+        # Servers report their tick duration (configurable, see Server.tick_seconds)
+        self.tick_seconds = data.get("tick_seconds", self.tick_seconds)
+        # Assume the server read its tick half way through the round trip.
+        self._sync_at = (sent + received) / 2
+        if data.get("tick_started_at") is not None and "server_time" in data:
+            # Step back to where the server is inside its tick
+            self._sync_at -= max(0.0, data["server_time"] - data["tick_started_at"])
+        return self._sync_t
+
+    def estimate_tick(self) -> int:
+        """Returns the estimated current server tick."""
+        if self._sync_t is None:
+            raise ValueError("Client not synced. Call sync() first.")
+        elapsed = asyncio.get_running_loop().time() - self._sync_at
+        return self._sync_t + int(elapsed // self.tick_seconds)
+
+    async def wait_for_tick(self, target_t: int, position: float = 0.5):
+        """Sleeps until the estimated server tick is `position` of the way through target_t."""
+        if self._sync_t is None:
+            await self.sync()
+        loop = asyncio.get_running_loop()
+        # Re-evaluate while sleeping so a re-sync (e.g. after a burn moved the
+        # server ahead) shifts the wake-up time.
+        while True:
+            fire_at = self._sync_at + (target_t - self._sync_t + position) * self.tick_seconds
+            delay = fire_at - loop.time()
+            if delay <= 0:
+                return
+            await asyncio.sleep(min(delay, self.tick_seconds / 4))
+
+    async def load_checkpoints(self, spot_checks: int = 2) -> int:
+        """
+        Fetches the server's published chain checkpoints, spot-checks them in
+        the executor and uses them as starting points for chain computation
+        in this client. Returns the number of checkpoints loaded.
+        """
+        checkpoints = []
+        since = 0
+        chain = None
+        while True:
+            status, data = await self._request("GET", f"/checkpoints?since={since}")
+            if status != 200:
+                raise ValueError(data.get("error", f"Checkpoints failed ({status})"))
+            if chain is None:
+                chain = (data["public_seed"], data["public_salt"])
+            elif chain != (data["public_seed"], data["public_salt"]):
+                raise ValueError("Server changed chains while checkpoints were loading")
+            page = [
+                (c["k"], binascii.unhexlify(c["x_k"]), binascii.unhexlify(c["x_prev"]))
+                for c in data["checkpoints"]
+            ]
+            checkpoints.extend(page)
+            if not page:
+                break
+            since = page[-1][0] + 1
+
+        seed = binascii.unhexlify(data["public_seed"])
+        salt = binascii.unhexlify(data["public_salt"])
+        loop = asyncio.get_running_loop()
+        ok = await loop.run_in_executor(self.executor, alice_verify_checkpoints, seed, salt, checkpoints, spot_checks)
+        if not ok:
+            raise ValueError("Server checkpoints failed spot-check verification")
+
+        # Kept for this client only: a spot check is not a full verification,
+        # so they never reach the persistent cache
+        self.checkpoints[(seed, salt)] = checkpoints
+        return len(checkpoints)
+
+    async def encrypt(self, plaintext: bytes, t_start: int, t_end: int, level: str = None) -> dict:
+        """Requests encryption for [t_start, t_end] (in ticks of `level`). Returns the server JSON (hex fields)."""
+        status, data = await self._request("POST", "/encrypt", {
+            "plaintext": binascii.hexlify(plaintext).decode(),
+            "t_start": t_start,
+            "t_end": t_end,
+            "request_nonce": os.urandom(8).hex(),
+            "level": level,
+        })
+        if status != 200:
+            raise ValueError(data.get("error", f"Encryption failed ({status})"))
+        return data
+
+    async def compute_checksum(self, data: dict) -> bytes:
+        """
+        Computes the public chain checksum for an encrypt response in the
+        executor, from loaded server checkpoints if they are of its chain.
+        """
+        loop = asyncio.get_running_loop()
+        seed, salt = binascii.unhexlify(data["public_seed"]), binascii.unhexlify(data["public_salt"])
+        level = data.get("level")
+        # Server checkpoints are of the base chain
+        checkpoints = self.checkpoints.get((seed, salt)) if is_base(level) else None
+        if checkpoints:
+            return await loop.run_in_executor(
+                self.executor, alice_compute_window_checksum_from_checkpoints,
+                seed, salt, checkpoints, data["t_start"], data["t_end"], self.cache,
+            )
+        return await loop.run_in_executor(
+            self.executor, alice_compute_window_checksum,
+            seed, salt, data["t_start"], data["t_end"], self.cache, level,
+        )
+
+    async def verify(self, checksum: bytes, t_start: int, t_end: int, epoch: int = None, level: str = None) -> tuple[bytes, bytes]:
+        """
+        Submits a checksum (of a window in chain `epoch`, default current, and
+        ticks of `level`). Returns (k_public, k_private).
+        """
+        status, data = await self._request("POST", "/verify", {
+            "checksum": binascii.hexlify(checksum).decode(),
+            "t_start": t_start,
+            "t_end": t_end,
+            "request_nonce": os.urandom(8).hex(),
+            "epoch": epoch,
+            "level": level,
+        })
+        if status != 200:
+            raise ValueError(data.get("error", f"Verification failed ({status})"))
+        return binascii.unhexlify(data["k_public"]), binascii.unhexlify(data["k_private"])
+
+    async def verify_batch(self, items, t_end: int, epoch: int = None, level: str = None) -> tuple:
+        """
+        Releases many windows closing at t_end in one request. items is
+        [(t_start, checksum), ...]. Returns (k_private, [k_public or None per item]).
+        """
+        status, data = await self._request("POST", "/verify/batch", {
+            "t_end": t_end,
+            "items": [{"t_start": t_start, "checksum": binascii.hexlify(checksum).decode()} for t_start, checksum in items],
+            "request_nonce": os.urandom(8).hex(),
+            "epoch": epoch,
+            "level": level,
+        })
+        if status != 200:
+            raise ValueError(data.get("error", f"Batch verification failed ({status})"))
+        if data["k_private"] is None:
+            raise ValueError("No valid checksum in batch")
+        return (binascii.unhexlify(data["k_private"]),
+                [binascii.unhexlify(r["k_public"]) if "k_public" in r else None for r in data["results"]])
+
+    async def decrypt(self, data: dict, retry_interval: float = 0.05) -> bytes:
+        """
+        Computes the checksum, waits for t_end and releases the keys.
+        A "Too early" answer does not burn the window, so it is retried
+        until the estimated tick moves past t_end.
+        """
+        checksum = await self.compute_checksum(data)
+        t_start, t_end, epoch, level = data["t_start"], data["t_end"], data.get("epoch"), data.get("level")
+        if epoch is not None and epoch != self.epoch and epoch not in self._epoch_offsets:
+            await self.sync()  # Encrypted in an epoch we have not seen
+        # The window's ticks are in its epoch's numbering; a level tick opens with its first base tick
+        offset = self._epoch_offsets.get(epoch, 0)
+        opens, closes = base_ticks(level, t_end)
+        await self.wait_for_tick(opens - offset)
+
+        while True:
+            try:
+                k_public, k_private = await self.verify(checksum, t_start, t_end, epoch, level)
+                break
+            except ValueError as e:
+                if "Too early" not in str(e) or self.estimate_tick() + offset > closes:
+                    raise
+                await asyncio.sleep(retry_interval)
+
+        k_final = alice_derive_final_key(k_public, k_private)
+        return alice_decrypt(binascii.unhexlify(data["ciphertext"]), k_final, binascii.unhexlify(data["nonce"]))
+
+    async def encrypt_and_decrypt(self, plaintext: bytes, t_start: int, t_end: int) -> bytes:
+        """Runs a full encrypt -> wait -> verify -> decrypt flow."""
+        data = await self.encrypt(plaintext, t_start, t_end)
+        return await self.decrypt(data)
+
+
+async def run_many(client: AsyncTimeLockClient, jobs):
+    """
+    Runs many (plaintext, t_start, t_end) flows concurrently.
+    Returns a list with the plaintext or the exception for each job.
+    """
+    return await asyncio.gather(
+        *(client.encrypt_and_decrypt(p, s, e) for p, s, e in jobs),
+        return_exceptions=True,
+    )
+
+
+async def _demo(count: int, lookahead: int):
+    client = AsyncTimeLockClient()
+    current_t = await client.sync()
+    # Each release burns its tick, so every flow gets its own t_end.
+    jobs = [(f"message {i}".encode(), current_t, current_t + lookahead + i) for i in range(count)]
+    print(f"Running {count} concurrent flows starting at T={current_t}...")
+    results = await run_many(client, jobs)
+    ok = sum(1 for r in results if isinstance(r, bytes))
+    print(f"{ok}/{count} released and decrypted.")
+    for r in results:
+        if not isinstance(r, bytes):
+            print(f"First failure: {r}")
+            break
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="asyncio Timekeeper client demo")
+    parser.add_argument("--count", type=int, default=10, help="Number of concurrent flows")
+    parser.add_argument("--lookahead", type=int, default=3, help="Ticks between encrypt and release")
+    args = parser.parse_args()
+    asyncio.run(_demo(args.count, args.lookahead))
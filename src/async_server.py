@@ -0,0 +1,431 @@
+"""
+asyncio HTTP/1.1 front end for the Flask app (FRONT_END=asyncio).
+
+The Flask development server spends a thread per connection, so idle
+keep-alive clients and long-lived streams tie up threads. Here every
+connection lives on one event loop instead:
+
+*   Requests are parsed on the loop and handed to the unchanged Flask app
+    (same routes, admission control, audit, metrics) on a small bounded
+    thread pool, which does the blocking crypto and SQLite work. At most
+    max_pending requests wait for it; beyond that they are shed with 429.
+*   Connections are kept alive between requests without holding a thread.
+*   GET /ticks streams one server-sent event per tick. One watcher thread
+    waits for new snapshots and the loop writes the same encoded event to
+    every subscriber, so an idle subscriber costs a socket and a coroutine.
+    A subscriber that stops reading is dropped once max_subscriber_buffer
+    bytes are queued for it.
+*   Routes in stream_paths (POST /encrypt/stream) are not buffered: the app
+    reads the body from the connection and its response is written as it
+    is produced, with backpressure both ways, and max_body does not apply.
+"""
+import asyncio
+import concurrent.futures
+import io
+import json
+import sys
+import threading
+from urllib.parse import unquote_to_bytes
+
+from src.metrics import METRICS
+
+# Hop-by-hop headers are set by the front end, not taken from the app
+HOP_BY_HOP = {"connection", "keep-alive", "transfer-encoding", "content-length"}
+
+REASONS = {400: "Bad Request", 413: "Payload Too Large", 429: "Too Many Requests",
+           431: "Request Header Fields Too Large", 500: "Internal Server Error", 501: "Not Implemented"}
+
+
+class TickBroadcaster:
+    """
+    Pushes an SSE event to every subscribed transport when the tick changes.
+    get_server is called every wait so callers can swap the instance (an
+    epoch rollover); events carry the epoch their tick belongs to.
+    """
+    FAN_OUT_BATCH = 1000
+
+    def __init__(self, get_server, loop, max_buffer=64 * 1024):
+        self.get_server = get_server
+        self.loop = loop
+        self.max_buffer = max_buffer
+        self.subscribers = set()
+        self._event = None  # Latest encoded event, sent to new subscribers
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._watch, daemon=True, name="tick-broadcaster")
+
+    def start(self):
+        server = self.get_server()
+        self._publish(server.snapshot(), server.epoch)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def subscribe(self, transport):
+        self.subscribers.add(transport)
+        METRICS.set_gauge("tick_subscribers", len(self.subscribers))
+        transport.write(self._event)
+
+    def unsubscribe(self, transport):
+        self.subscribers.discard(transport)
+        METRICS.set_gauge("tick_subscribers", len(self.subscribers))
+
+    def _watch(self):
+        snap = self.get_server().snapshot()
+        while not self._stop.is_set():
+            server = self.get_server()
+            current = server.wait_for_change(snap, timeout=0.5)
+            if current.current_t != snap.current_t or current.public_seed != snap.public_seed:
+                self.loop.call_soon_threadsafe(self._publish, current, server.epoch)
+            snap = current
+
+    @staticmethod
+    def encode(snap, epoch=0) -> bytes:
+        data = json.dumps({"t": snap.current_t, "tick_started_at": snap.tick_started_at,
+                           "tick_seconds": snap.tick_seconds, "epoch": epoch})
+        return f"id: {snap.current_t}\nevent: tick\ndata: {data}\n\n".encode()
+
+    def _publish(self, snap, epoch=0):
+        """Loop: encodes the event once and starts writing it to every subscriber."""
+        self._event = self.encode(snap, epoch)
+        self._fan_out(self._event, list(self.subscribers))
+
+    def _fan_out(self, event, transports, start=0):
+        # A write is a send() per subscriber (~10 us); yield to the loop
+        # between batches so requests are not held up by a big fan-out
+        end = start + self.FAN_OUT_BATCH
+        for transport in transports[start:end]:
+            if transport not in self.subscribers:
+                continue
+            if transport.is_closing():
+                self.unsubscribe(transport)
+            elif transport.get_write_buffer_size() > self.max_buffer:
+                # Slow reader: drop it rather than buffer ticks without bound
+                METRICS.inc("tick_subscribers_dropped_total")
+                self.unsubscribe(transport)
+                transport.abort()
+            else:
+                transport.write(event)
+        if end < len(transports):
+            self.loop.call_soon(self._fan_out, event, transports, end)
+
+
+class AsyncFrontEnd:
+    """Serves a WSGI app (the Flask app) and GET /ticks from one event loop."""
+
+    def __init__(self, app, get_server, host="127.0.0.1", port=5001, workers=16, max_pending=256,
+                 keepalive_timeout=30.0, max_body=16 * 1024 * 1024, max_subscriber_buffer=64 * 1024,
+                 stream_paths=("/encrypt/stream",)):
+        self.app = app
+        self.get_server = get_server
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.max_pending = max_pending
+        self.keepalive_timeout = keepalive_timeout
+        self.max_body = max_body
+        self.max_subscriber_buffer = max_subscriber_buffer
+        self.stream_paths = frozenset(stream_paths)
+        self.pending = 0
+        self.broadcaster = None
+        self._connections = {}  # writer -> handler task
+        self._executor = None
+        self._server = None
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        self._executor = concurrent.futures.ThreadPoolExecutor(self.workers, thread_name_prefix="frontend")
+        self.broadcaster = TickBroadcaster(self.get_server, loop, self.max_subscriber_buffer).start()
+        # A large backlog absorbs reconnect storms of tick subscribers
+        self._server = await asyncio.start_server(self._handle, self.host, self.port, backlog=4096)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        await self._server.serve_forever()
+
+    async def close(self):
+        self._server.close()
+        # Idle keep-alive connections and tick subscribers
+        for writer in list(self._connections):
+            writer.close()
+        await asyncio.gather(*self._connections.values(), return_exceptions=True)
+        await self._server.wait_closed()
+        self.broadcaster.stop()
+        self._executor.shutdown(wait=True)
+
+    async def _handle(self, reader, writer):
+        self._connections[writer] = asyncio.current_task()
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.keepalive_timeout)
+                except asyncio.LimitOverrunError:
+                    await self._respond(writer, 431, {"error": "Request head too large"}, keep_alive=False)
+                    return
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    return
+                try:
+                    method, target, version, headers = parse_head(head)
+                except ValueError as e:
+                    await self._respond(writer, 400, {"error": str(e)}, keep_alive=False)
+                    return
+
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+                path, _, query = target.partition("?")
+                if method == "GET" and path == "/ticks":
+                    await self._stream_ticks(reader, writer)
+                    return
+                if "transfer-encoding" in headers:
+                    await self._respond(writer, 501, {"error": "Chunked request bodies are not supported"}, keep_alive=False)
+                    return
+                try:
+                    length = int(headers.get("content-length", 0))
+                except ValueError:
+                    await self._respond(writer, 400, {"error": "Invalid Content-Length"}, keep_alive=False)
+                    return
+                streamed = path in self.stream_paths
+                if length < 0 or (length > self.max_body and not streamed):
+                    await self._respond(writer, 413, {"error": f"Body larger than {self.max_body} bytes"}, keep_alive=False)
+                    return
+                if streamed:
+                    # Shed before reading: an unread body cannot be skipped, so the connection closes
+                    if self.pending >= self.max_pending:
+                        await self._shed(writer, keep_alive=False)
+                        return
+                    if headers.get("expect", "").lower() == "100-continue":
+                        writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+                    loop = asyncio.get_running_loop()
+                    environ = self._environ(method, path, query, version, headers,
+                                            _BodyReader(reader, length, loop), length, writer)
+                    self.pending += 1
+                    try:
+                        keep_alive = await loop.run_in_executor(
+                            self._executor, self._call_app_streaming, environ, writer, keep_alive, loop)
+                    finally:
+                        self.pending -= 1
+                    if not keep_alive:
+                        return
+                    continue
+                if headers.get("expect", "").lower() == "100-continue":
+                    writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+                body = await reader.readexactly(length)
+
+                if self.pending >= self.max_pending:
+                    await self._shed(writer, keep_alive)
+                    if keep_alive:
+                        continue
+                    return
+
+                environ = self._environ(method, path, query, version, headers, io.BytesIO(body), length, writer)
+                self.pending += 1
+                try:
+                    status, app_headers, payload = await asyncio.get_running_loop().run_in_executor(
+                        self._executor, self._call_app, environ)
+                finally:
+                    self.pending -= 1
+                self._write_response(writer, status, app_headers, payload, keep_alive, method == "HEAD")
+                await writer.drain()
+                if not keep_alive:
+                    return
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._connections.pop(writer, None)
+            writer.close()
+
+    async def _stream_ticks(self, reader, writer):
+        """An SSE stream delimited by connection close; events come from the broadcaster."""
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                     b"Cache-Control: no-cache\r\nConnection: close\r\n\r\n")
+        self.broadcaster.subscribe(writer.transport)
+        try:
+            # Nothing is expected from the client; EOF means it went away
+            while await reader.read(1024):
+                pass
+        except ConnectionError:
+            pass
+        finally:
+            self.broadcaster.unsubscribe(writer.transport)
+
+    def _environ(self, method, path, query, version, headers, body, length, writer) -> dict:
+        peer = writer.get_extra_info("peername") or ("", 0)
+        environ = {
+            "REQUEST_METHOD": method,
+            "SCRIPT_NAME": "",
+            "PATH_INFO": unquote_to_bytes(path).decode("latin-1"),
+            "QUERY_STRING": query,
+            "SERVER_NAME": self.host,
+            "SERVER_PORT": str(self.port),
+            "SERVER_PROTOCOL": version,
+            "REMOTE_ADDR": peer[0],
+            "REMOTE_PORT": str(peer[1]),
+            "CONTENT_TYPE": headers.get("content-type", ""),
+            "CONTENT_LENGTH": str(length),
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": "http",
+            "wsgi.input": body,
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+        }
+        for name, value in headers.items():
+            if name not in ("content-type", "content-length"):
+                environ["HTTP_" + name.upper().replace("-", "_")] = value
+        return environ
+
+    def _call_app(self, environ):
+        """Executor: runs the WSGI app to completion and returns (status, headers, body)."""
+        started = []
+
+        def start_response(status, headers, exc_info=None):
+            started[:] = [status, headers]
+
+        try:
+            result = self.app(environ, start_response)
+            try:
+                body = b"".join(result)
+            finally:
+                if hasattr(result, "close"):
+                    result.close()
+        except Exception as e:
+            print(f"Front end error: {e}")
+            return "500 Internal Server Error", [("Content-Type", "application/json")], b'{"error": "Internal server error"}'
+        return started[0], started[1], body
+
+    def _call_app_streaming(self, environ, writer, keep_alive, loop) -> bool:
+        """
+        Executor: runs the WSGI app, writing its head and then each chunk it
+        yields, waiting for the client to take each one. Returns whether the
+        connection can be kept alive.
+        """
+        def send(data):
+            asyncio.run_coroutine_threadsafe(self._send(writer, data), loop).result()
+
+        started = []
+
+        def start_response(status, headers, exc_info=None):
+            started[:] = [status, headers]
+
+        head_sent = False
+        try:
+            result = self.app(environ, start_response)
+            try:
+                for chunk in result:
+                    if not head_sent:
+                        keep_alive = self._send_streamed_head(send, started, keep_alive)
+                        head_sent = True
+                    if chunk:
+                        send(chunk)
+                if not head_sent:
+                    keep_alive = self._send_streamed_head(send, started, keep_alive)
+                    head_sent = True
+            finally:
+                if hasattr(result, "close"):
+                    result.close()
+        except Exception as e:
+            print(f"Front end error: {e}")
+            if not head_sent:
+                body = b'{"error": "Internal server error"}'
+                try:
+                    send(self._head_bytes("500 Internal Server Error", [("Content-Type", "application/json")], False, len(body))
+                         + body)
+                except Exception:
+                    pass
+            # Mid-body there is no way to signal the error but to close
+            return False
+        # Unread body bytes would be taken for the next request
+        return keep_alive and environ["wsgi.input"].remaining == 0
+
+    def _send_streamed_head(self, send, started, keep_alive) -> bool:
+        status, headers = started
+        length = next((value for name, value in headers if name.lower() == "content-length"), None)
+        # Without a length the body is delimited by closing the connection
+        keep_alive = keep_alive and length is not None
+        send(self._head_bytes(status, headers, keep_alive, length))
+        return keep_alive
+
+    @staticmethod
+    async def _send(writer, data):
+        writer.write(data)
+        await writer.drain()
+
+    async def _shed(self, writer, keep_alive):
+        METRICS.inc("frontend_shed_total")
+        await self._respond(writer, 429, {"error": "Too many requests (front end queue full). Retry later.",
+                                          "reason": "frontend_queue"}, keep_alive, {"Retry-After": "1"})
+
+    async def _respond(self, writer, code, data, keep_alive, extra_headers=None):
+        headers = [("Content-Type", "application/json"), *(extra_headers or {}).items()]
+        self._write_response(writer, f"{code} {REASONS[code]}", headers, json.dumps(data).encode(), keep_alive)
+        await writer.drain()
+
+    @staticmethod
+    def _head_bytes(status, headers, keep_alive, content_length=None) -> bytes:
+        lines = [f"HTTP/1.1 {status}"]
+        lines += [f"{name}: {value}" for name, value in headers if name.lower() not in HOP_BY_HOP]
+        if content_length is not None:
+            lines.append(f"Content-Length: {content_length}")
+        lines.append(f"Connection: {'keep-alive' if keep_alive else 'close'}")
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+    @classmethod
+    def _write_response(cls, writer, status, headers, body, keep_alive, head_only=False):
+        if head_only:
+            # The app computed the length of the body it left out
+            length = next((value for name, value in headers if name.lower() == "content-length"), None)
+        else:
+            length = len(body)
+        writer.write(cls._head_bytes(status, headers, keep_alive, length) + (b"" if head_only else body))
+
+
+class _BodyReader:
+    """
+    wsgi.input of a streamed request: reads the body from the connection's
+    StreamReader on the loop, from the executor thread running the app.
+    """
+
+    def __init__(self, reader, length, loop):
+        self.reader = reader
+        self.remaining = length
+        self.loop = loop
+
+    def read(self, n=-1) -> bytes:
+        if self.remaining <= 0:
+            return b""
+        n = self.remaining if n is None or n < 0 else min(n, self.remaining)
+        data = asyncio.run_coroutine_threadsafe(self.reader.read(n), self.loop).result()
+        self.remaining -= len(data)
+        return data
+
+
+def parse_head(head: bytes):
+    """(method, target, version, {lowercase name: value}) from a request head."""
+    request_line, *header_lines = head.decode("latin-1").rstrip("\r\n").split("\r\n")
+    parts = request_line.split(" ")
+    if len(parts) != 3 or not parts[2].startswith("HTTP/1."):
+        raise ValueError(f"Malformed request line: {request_line[:100]!r}")
+    headers = {}
+    for line in header_lines:
+        name, sep, value = line.partition(":")
+        if not sep:
+            raise ValueError(f"Malformed header line: {line[:100]!r}")
+        headers[name.strip().lower()] = value.strip()
+    return parts[0], parts[1], parts[2], headers
+
+
+def serve(app, get_server, host="127.0.0.1", port=5001, **kwargs):
+    """Runs the front end until interrupted."""
+    async def main():
+        front_end = await AsyncFrontEnd(app, get_server, host, port, **kwargs).start()
+        print(f"Async front end on http://{host}:{front_end.port} ({front_end.workers} workers)")
+        await front_end.serve_forever()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
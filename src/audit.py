@@ -0,0 +1,294 @@
+"""
+Audit log of key releases: who asked for which window, and what happened.
+Keys, checksums and plaintexts are never recorded.
+
+Request threads call AuditLog.record(), which packs one fixed-size record
+and appends it to an in-memory ring. That takes a few microseconds and no
+lock, because deque.append is atomic in CPython. A background writer drains
+the ring every flush_interval and group-commits each batch with a single
+write (plus an optional fsync) to an append-only binary file. The file
+rotates at max_bytes.
+
+Usage (reader):
+    python -m src.audit audit.log                 # this file and its rotations
+    python -m src.audit audit.log --json --since 1700000000
+"""
+import argparse
+import glob
+import hashlib
+import ipaddress
+import json
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+from collections import deque, namedtuple
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.metrics import METRICS
+from src.levels import BASE_LEVEL, LEVELS
+
+# File header; records follow back to back. Version 2 added the level byte.
+AUDIT_MAGIC = b"TLAUDIT2"
+
+# time, event, outcome, level, tick, t_start, t_end, client (16-byte address), nonce digest
+RECORD_FORMAT = ">dBBBqqq16s8s"
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+
+# batch_release: one record per /verify/batch, window [earliest t_start, t_end]
+EVENTS = {"release": 1, "client_helper_release": 2, "batch_release": 3}
+OUTCOMES = {
+    "released": 1, "too_early": 2, "window_expired": 3, "invalid_checksum": 4,
+    "replay": 5, "not_committed": 6, "rejected": 7,
+}
+# Window resolution (src/levels.py); t_start and t_end are in its ticks
+LEVEL_CODES = {name: code for code, name in enumerate([BASE_LEVEL, *LEVELS])}
+UNKNOWN_LEVEL = 255
+EVENT_NAMES = {code: name for name, code in EVENTS.items()}
+OUTCOME_NAMES = {code: name for name, code in OUTCOMES.items()}
+LEVEL_NAMES = {code: name for name, code in LEVEL_CODES.items()}
+
+# What record() does when the ring is full. The ring bound is enforced
+# without a lock, so it can be exceeded by at most the number of producer
+# threads racing at the boundary.
+DROP_NEWEST = "drop_newest"  # keep what is queued, count the new record as dropped
+DROP_OLDEST = "drop_oldest"  # make room by discarding the oldest queued record
+BLOCK = "block"              # wait for the writer (puts disk latency back on the request)
+
+_V4_PREFIX = b"\0" * 10 + b"\xff" * 2
+# Stored for ticks that are missing, not ints, or outside the q field
+NO_TICK = -1
+_INT64_MIN, _INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
+AuditRecord = namedtuple("AuditRecord", [
+    "time", "event", "outcome", "level", "tick", "t_start", "t_end", "client", "nonce_digest",
+])
+
+
+def _pack_client(client: str) -> bytes:
+    """IP addresses as 16 bytes (IPv4-mapped for v4); anything else as a digest."""
+    try:
+        return _V4_PREFIX + socket.inet_pton(socket.AF_INET, client)
+    except OSError:
+        pass
+    try:
+        return socket.inet_pton(socket.AF_INET6, client)
+    except OSError:
+        return hashlib.sha256(client.encode()).digest()[:16]
+
+
+def _unpack_client(packed: bytes) -> str:
+    address = ipaddress.IPv6Address(packed)
+    return str(address.ipv4_mapped or address)
+
+
+def _tick(value) -> int:
+    # t_start/t_end come straight from the request body; packing must not fail
+    return value if isinstance(value, int) and _INT64_MIN <= value <= _INT64_MAX else NO_TICK
+
+
+def _level_code(level) -> int:
+    # level comes straight from the request body
+    return LEVEL_CODES.get(level or BASE_LEVEL, UNKNOWN_LEVEL) if isinstance(level, (str, type(None))) else UNKNOWN_LEVEL
+
+
+def classify_release_error(message: str) -> str:
+    for needle, outcome in (("Too early", "too_early"), ("Window expired", "window_expired"),
+                            ("Invalid checksum", "invalid_checksum"), ("Replay", "replay"),
+                            ("not committed", "not_committed")):
+        if needle in message:
+            return outcome
+    return "rejected"
+
+
+class AuditLog:
+    def __init__(self, path, capacity=65536, overflow=DROP_NEWEST, flush_interval=0.05,
+                 max_batch=4096, max_bytes=64 * 1024 * 1024, max_files=5, fsync=False):
+        if overflow not in (DROP_NEWEST, DROP_OLDEST, BLOCK):
+            raise ValueError(f"Unknown overflow policy {overflow!r}")
+        self.path = path
+        self.capacity = capacity
+        self.overflow = overflow
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.fsync = fsync
+
+        self._ring = deque(maxlen=capacity if overflow == DROP_OLDEST else None)
+        self._dropped = 0
+        self._dropped_lock = threading.Lock()  # only taken on the drop path
+        self._dropped_reported = 0
+        self._space = threading.Condition()  # BLOCK policy only
+        self._stop = threading.Event()
+        self._write_lock = threading.Lock()
+        self.written = 0
+
+        self._file = self._open()
+        self._writer = threading.Thread(target=self._run, daemon=True, name="audit-writer")
+        self._writer.start()
+
+    @property
+    def dropped(self) -> int:
+        return self._dropped
+
+    def _drop(self):
+        with self._dropped_lock:
+            self._dropped += 1
+
+    @property
+    def pending(self) -> int:
+        return len(self._ring)
+
+    def record(self, event, outcome, tick, t_start, t_end, client, nonce, level=None):
+        """
+        Queues one record. Never touches the disk (except under BLOCK when
+        full) and never raises: a record that cannot be packed is counted as
+        dropped.
+        """
+        try:
+            packed = struct.pack(
+                RECORD_FORMAT, time.time(), EVENTS[event], OUTCOMES[outcome],
+                _level_code(level), _tick(tick), _tick(t_start), _tick(t_end),
+                _pack_client(client or "unknown"),
+                hashlib.sha256(str(nonce).encode()).digest()[:8],
+            )
+        except (struct.error, KeyError, TypeError, ValueError):
+            self._drop()
+            return
+        ring = self._ring
+        if len(ring) >= self.capacity:
+            if self.overflow == DROP_NEWEST:
+                self._drop()
+                return
+            if self.overflow == DROP_OLDEST:
+                self._drop()  # deque(maxlen) discards the oldest on append
+            else:
+                with self._space:
+                    self._space.wait_for(lambda: len(ring) < self.capacity or self._stop.is_set())
+        ring.append(packed)
+
+    # Writer thread
+
+    def _open(self):
+        if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+            with open(self.path, "rb") as f:
+                magic = f.read(len(AUDIT_MAGIC))
+            if magic != AUDIT_MAGIC:
+                # Another format version (or not an audit log): never append to it
+                aside = base = f"{self.path}.old-{time.strftime('%Y%m%d%H%M%S')}"
+                suffix = 1
+                while os.path.exists(aside):
+                    aside = f"{base}-{suffix}"
+                    suffix += 1
+                os.replace(self.path, aside)
+                print(f"Audit log {self.path} is not in format {AUDIT_MAGIC.decode()}; moved it to {aside}")
+        new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        f = open(self.path, "ab")
+        if new_file:
+            f.write(AUDIT_MAGIC)
+            f.flush()
+        return f
+
+    def _rotate(self):
+        self._file.close()
+        for i in range(self.max_files - 1, 0, -1):
+            src = self.path if i == 1 else f"{self.path}.{i - 1}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i}")
+        self._file = self._open()
+
+    def _drain(self):
+        ring = self._ring
+        while ring:
+            batch = []
+            while ring and len(batch) < self.max_batch:
+                batch.append(ring.popleft())
+            if self.overflow == BLOCK:
+                with self._space:
+                    self._space.notify_all()
+            data = b"".join(batch)
+            if self._file.tell() + len(data) > self.max_bytes:
+                self._rotate()
+            # Group commit: one write (and fsync) per batch
+            with METRICS.stage("audit_write"):
+                self._file.write(data)
+                self._file.flush()
+                if self.fsync:
+                    os.fsync(self._file.fileno())
+            self.written += len(batch)
+            METRICS.inc("audit_records_written_total", len(batch))
+
+        dropped = self.dropped
+        if dropped > self._dropped_reported:
+            METRICS.inc("audit_records_dropped_total", dropped - self._dropped_reported)
+            self._dropped_reported = dropped
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+        self.flush()
+
+    def flush(self):
+        """Commits everything queued so far (writer thread, tests, shutdown)."""
+        with self._write_lock:
+            self._drain()
+
+    def close(self):
+        self._stop.set()
+        with self._space:
+            self._space.notify_all()
+        self._writer.join()
+        self._file.close()
+
+
+def read_audit(path):
+    """Yields AuditRecords from one audit file."""
+    with open(path, "rb") as f:
+        magic = f.read(len(AUDIT_MAGIC))
+        if magic != AUDIT_MAGIC:
+            if magic[:-1] == AUDIT_MAGIC[:-1]:
+                raise ValueError(f"{path} is an audit log of another format version ({magic[-1:].decode()})")
+            raise ValueError(f"{path} is not an audit log")
+        while True:
+            chunk = f.read(RECORD_SIZE)
+            if len(chunk) < RECORD_SIZE:
+                return
+            ts, event, outcome, level, tick, t_start, t_end, client, nonce_digest = struct.unpack(RECORD_FORMAT, chunk)
+            yield AuditRecord(ts, EVENT_NAMES.get(event, "unknown"), OUTCOME_NAMES.get(outcome, "unknown"),
+                              LEVEL_NAMES.get(level, "unknown"), tick, t_start, t_end,
+                              _unpack_client(client), nonce_digest.hex())
+
+
+def audit_files(path):
+    """The rotated files (oldest first) followed by the live one."""
+    rotated = sorted(glob.glob(f"{glob.escape(path)}.[0-9]*"), key=lambda p: int(p.rsplit(".", 1)[1]), reverse=True)
+    return rotated + ([path] if os.path.exists(path) else [])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Read a key-release audit log")
+    parser.add_argument("path", help="Audit log (rotated files next to it are included)")
+    parser.add_argument("--since", type=float, default=0, help="Only records at or after this Unix time")
+    parser.add_argument("--client", help="Only records from this client address")
+    parser.add_argument("--json", action="store_true", help="One JSON object per line")
+    args = parser.parse_args(argv)
+
+    for path in audit_files(args.path):
+        for r in read_audit(path):
+            if r.time < args.since or (args.client and r.client != args.client):
+                continue
+            if args.json:
+                print(json.dumps(r._asdict()))
+            else:
+                stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(r.time))
+                print(f"{stamp} {r.client:>15} {r.event:<22} {r.outcome:<16} tick={r.tick} window=[{r.t_start},{r.t_end}]@{r.level} nonce={r.nonce_digest}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+"""
+Parallel integrity audit of a public chain.
+
+Checks that stored public chain values (a server's published /checkpoints,
+a client ChainCheckpointCache, or an in-memory public_history) are the
+chain defined by (public_seed, public_salt). Evolving the chain is
+sequential, but a checkpoint (k, X_k, X_{k-1}) holds everything needed to
+resume it, so each segment between consecutive checkpoints is re-evolved
+on its own in a process pool. With a full history, the audit records its
+own checkpoints and also compares every stored value in a segment, via a
+digest so workers only receive the segment's endpoints.
+
+A checkpoint is only as good as the segment that ends at it. The final
+pass walks the segment results in order from the trusted start
+(0, X_0, zeros): the first segment that fails holds the first divergent
+tick, and nothing after it is trusted.
+
+Usage:
+    python -m src.chain_audit --url http://localhost:5001 --workers 32
+    python -m src.chain_audit --cache ~/.cache/time-evolving-crypto/chain_checkpoints.db --seed <hex> --salt <hex>
+"""
+import argparse
+import binascii
+import concurrent.futures
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import namedtuple
+
+import requests
+
+from .core import evolve_public_chain_from, evolve_public_chain_to
+
+ChainAuditResult = namedtuple("ChainAuditResult", ["ok", "first_divergent_tick", "ticks", "segments", "seconds"])
+
+# Segments per worker when the audit picks the checkpoint interval itself
+SEGMENTS_PER_WORKER = 8
+
+
+def record_checkpoints(history: list, interval: int) -> list:
+    """(k, X_k, X_{k-1}) every `interval` ticks of history, and at its last tick."""
+    if interval < 1:
+        raise ValueError("Checkpoint interval must be at least 1")
+    last = len(history) - 1
+    ks = list(range(interval, last, interval)) + ([last] if last > 0 else [])
+    return [(k, history[k], history[k - 1]) for k in ks]
+
+
+def _segment_digest(values) -> bytes:
+    digest = hashlib.sha256()
+    for x in values:
+        digest.update(x)
+    return digest.digest()
+
+
+def _audit_segment(segment):
+    """
+    Worker: re-evolves one segment. Returns None if it matches, else the
+    first tick known to be wrong. A digest mismatch only says the segment's
+    history is wrong somewhere after k0; the caller pins it down.
+    """
+    k0, x0, prev0, salt, k1, x1, prev1, expected_digest = segment
+    digest = hashlib.sha256() if expected_digest is not None else None
+    x, prev = evolve_public_chain_to(x0, prev0, salt, k0, k1, digest)
+    if digest is not None and digest.digest() != expected_digest:
+        return k0 + 1
+    if prev != prev1:
+        return k1 - 1
+    if x != x1:
+        return k1
+    return None
+
+
+def _first_mismatch(history, salt, k0, k1):
+    """Sequentially finds the first wrong value of history in (k0, k1], or None."""
+    chain = evolve_public_chain_from(history[k0], history[k0 - 1] if k0 else bytes(32), salt, k0, k1)
+    return next((k0 + i for i, x in enumerate(chain) if history[k0 + i] != x), None)
+
+
+def audit_chain(public_seed: bytes, public_salt: bytes, checkpoints: list, history: list = None,
+                workers: int = None) -> ChainAuditResult:
+    """
+    Audits checkpoints [(k, X_k, X_{k-1}), ...] (and, if given, every value
+    of history between them) against the chain from (public_seed, public_salt).
+    workers=1 runs in this process; None uses one process per CPU.
+    """
+    started = time.perf_counter()
+    by_k = {}
+    conflicts = []  # Two different values for one k: at least one is wrong
+    for k, x_k, x_prev in checkpoints:
+        if k < 1:
+            raise ValueError(f"Invalid checkpoint k={k}")
+        if by_k.setdefault(k, (x_k, x_prev)) != (x_k, x_prev):
+            conflicts.append(k - 1 if by_k[k][1] != x_prev else k)
+    points = [(0, public_seed, bytes(32))] + [(k, *by_k[k]) for k in sorted(by_k)]
+    if history is not None and (not history or history[0] != public_seed):
+        return ChainAuditResult(False, 0, len(history) - 1 if history else 0, 0, time.perf_counter() - started)
+
+    segments = []
+    for (k0, x0, prev0), (k1, x1, prev1) in zip(points, points[1:]):
+        expected = _segment_digest(history[k0 + 1:k1 + 1]) if history is not None and k1 < len(history) else None
+        segments.append((k0, x0, prev0, public_salt, k1, x1, prev1, expected))
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(segments) < 2:
+        results = map(_audit_segment, segments)
+        executor = None
+    else:
+        # spawn, as in src/shards.py: the caller may be a threaded server
+        executor = concurrent.futures.ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+        results = executor.map(_audit_segment, segments, chunksize=max(1, len(segments) // (workers * SEGMENTS_PER_WORKER)))
+
+    # Final pass: a checkpoint is trusted once the segment ending at it checks out
+    first_divergent = None
+    try:
+        for (k0, _, _, _, k1, _, _, _), divergent in zip(segments, results):
+            if divergent is None:
+                continue
+            if history is not None and k1 < len(history):
+                # Pin down the first wrong value; if history is right, the checkpoint itself is wrong
+                divergent = _first_mismatch(history, public_salt, k0, k1) or divergent
+            first_divergent = divergent
+            break
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
+    if conflicts:
+        first_divergent = min(conflicts + ([first_divergent] if first_divergent is not None else []))
+
+    return ChainAuditResult(first_divergent is None, first_divergent, points[-1][0], len(segments),
+                            time.perf_counter() - started)
+
+
+def audit_history(public_seed: bytes, public_salt: bytes, history: list, interval: int = None,
+                  workers: int = None) -> ChainAuditResult:
+    """
+    Audits a full public_history [X_0, ..., X_t]: records a checkpoint every
+    `interval` ticks (default: enough segments to keep `workers` busy) and
+    audits the segments in parallel.
+    """
+    workers = workers or os.cpu_count() or 1
+    if interval is None:
+        interval = max(1, len(history) // (workers * SEGMENTS_PER_WORKER))
+    return audit_chain(public_seed, public_salt, record_checkpoints(history, interval), history, workers)
+
+
+def fetch_server_checkpoints(base_url: str) -> tuple:
+    """(public_seed, public_salt, checkpoints) from a server's paginated /checkpoints."""
+    checkpoints = []
+    since = 0
+    while True:
+        res = requests.get(f"{base_url}/checkpoints", params={"since": since})
+        data = res.json()
+        if res.status_code != 200:
+            raise ValueError(f"Server checkpoints unavailable: {data.get('error')}")
+        page = [(c["k"], binascii.unhexlify(c["x_k"]), binascii.unhexlify(c["x_prev"])) for c in data["checkpoints"]]
+        checkpoints.extend(page)
+        if not page:
+            break
+        since = page[-1][0] + 1
+    return binascii.unhexlify(data["public_seed"]), binascii.unhexlify(data["public_salt"]), checkpoints
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Audit a public chain against its seed and salt")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--url", help="Audit the checkpoints published by this server")
+    source.add_argument("--cache", help="Audit the checkpoints in this ChainCheckpointCache file")
+    parser.add_argument("--seed", help="Public seed (hex), with --cache")
+    parser.add_argument("--salt", help="Public salt (hex), with --cache")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: one per CPU)")
+    parser.add_argument("--json", action="store_true", help="Print the result as JSON")
+    args = parser.parse_args(argv)
+
+    if args.url:
+        public_seed, public_salt, checkpoints = fetch_server_checkpoints(args.url)
+    else:
+        from .chain_cache import ChainCheckpointCache
+
+        if not (args.seed and args.salt):
+            parser.error("--cache needs --seed and --salt")
+        public_seed, public_salt = binascii.unhexlify(args.seed), binascii.unhexlify(args.salt)
+        checkpoints = ChainCheckpointCache(args.cache).checkpoints(public_seed, public_salt)
+
+    result = audit_chain(public_seed, public_salt, checkpoints, workers=args.workers)
+    if args.json:
+        print(json.dumps(result._asdict()))
+    elif result.ok:
+        print(f"OK: {result.ticks} ticks in {result.segments} segments, {result.seconds:.1f}s "
+              f"({result.ticks / max(result.seconds, 1e-9):,.0f} ticks/s)")
+    else:
+        print(f"DIVERGED at tick {result.first_divergent_tick} (of {result.ticks})")
+    return 0 if result.ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
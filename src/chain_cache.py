@@ -0,0 +1,135 @@
+import os
+import time
+import sqlite3
+
+from .core import sha256, evolve_public_chain_from, derive_public_key_piece
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "time-evolving-crypto", "chain_checkpoints.db")
+
+# Approximate on-disk cost of one checkpoint row (chain id + X_k + X_{k-1} + k + last_used)
+CHECKPOINT_ROW_BYTES = 128
+
+
+class ChainCheckpointCache:
+    """
+    Persistent client-side cache of public chain checkpoints.
+
+    The public chain for a (seed, salt) pair is deterministic, so every
+    `interval` steps we store (k, X_k, X_{k-1}) in SQLite. Later
+    computations for the same chain resume from the nearest checkpoint
+    at or before t_start instead of hashing from X_0 again. The cache is
+    capped at `max_bytes`; least recently used checkpoints are evicted.
+
+    Only holds a path (connections are opened per call), so instances can
+    be passed to a ProcessPoolExecutor.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, interval=1000, max_bytes=64 * 1024 * 1024):
+        if interval < 1:
+            raise ValueError("Checkpoint interval must be at least 1")
+        self.path = path
+        self.interval = interval
+        self.max_bytes = max_bytes
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._init_db()
+
+    def _init_db(self):
+        with sqlite3.connect(self.path) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS checkpoints (
+                    chain_id BLOB NOT NULL,
+                    k INTEGER NOT NULL,
+                    x_k BLOB NOT NULL,
+                    x_prev BLOB NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (chain_id, k)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS checkpoints_lru ON checkpoints (last_used)")
+
+    @staticmethod
+    def chain_id(public_seed: bytes, public_salt: bytes) -> bytes:
+        return sha256(b"CHAIN" + public_seed + public_salt)
+
+    def nearest(self, public_seed: bytes, public_salt: bytes, t: int):
+        """
+        Returns (k, X_k, X_{k-1}) for the latest checkpoint with k <= t.
+        Falls back to (0, X_0, zeros) when nothing is cached.
+        """
+        chain_id = self.chain_id(public_seed, public_salt)
+        with sqlite3.connect(self.path) as conn:
+            row = conn.execute(
+                "SELECT k, x_k, x_prev FROM checkpoints WHERE chain_id = ? AND k <= ? ORDER BY k DESC LIMIT 1",
+                (chain_id, t),
+            ).fetchone()
+            if row:
+                conn.execute(
+                    "UPDATE checkpoints SET last_used = ? WHERE chain_id = ? AND k = ?",
+                    (time.time(), chain_id, row[0]),
+                )
+                return row[0], row[1], row[2]
+        return 0, public_seed, bytes(32)
+
+    def checkpoints(self, public_seed: bytes, public_salt: bytes) -> list:
+        """All cached (k, X_k, X_{k-1}) of a chain, by k (see src/chain_audit.py)."""
+        with sqlite3.connect(self.path) as conn:
+            return conn.execute(
+                "SELECT k, x_k, x_prev FROM checkpoints WHERE chain_id = ? ORDER BY k",
+                (self.chain_id(public_seed, public_salt),),
+            ).fetchall()
+
+    def store(self, public_seed: bytes, public_salt: bytes, checkpoints):
+        """Stores an iterable of (k, X_k, X_{k-1}) and enforces the size cap."""
+        chain_id = self.chain_id(public_seed, public_salt)
+        now = time.time()
+        rows = [(chain_id, k, x_k, x_prev, now) for k, x_k, x_prev in checkpoints]
+        if not rows:
+            return
+        with sqlite3.connect(self.path) as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO checkpoints (chain_id, k, x_k, x_prev, last_used) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._evict(conn)
+
+    def _evict(self, conn):
+        max_rows = max(1, self.max_bytes // CHECKPOINT_ROW_BYTES)
+        count = conn.execute("SELECT COUNT(*) FROM checkpoints").fetchone()[0]
+        if count > max_rows:
+            conn.execute("""
+                DELETE FROM checkpoints WHERE rowid IN (
+                    SELECT rowid FROM checkpoints ORDER BY last_used ASC, k ASC LIMIT ?
+                )
+            """, (count - max_rows,))
+
+    def size_bytes(self) -> int:
+        with sqlite3.connect(self.path) as conn:
+            return conn.execute("SELECT COUNT(*) FROM checkpoints").fetchone()[0] * CHECKPOINT_ROW_BYTES
+
+    def compute_window(self, public_seed: bytes, public_salt: bytes, t_start: int, t_end: int) -> list[bytes]:
+        """
+        Returns [X_{t_start}, ..., X_{t_end}], resuming from the nearest
+        checkpoint and recording new checkpoints along the way.
+        """
+        if t_start < 0 or t_start > t_end:
+            raise ValueError("Invalid time window")
+
+        k, x_k, x_prev = self.nearest(public_seed, public_salt, t_start)
+        chain = evolve_public_chain_from(x_k, x_prev, public_salt, k, t_end)
+
+        # chain[i] is X_{k+i}; checkpoint every multiple of interval past k
+        first = (k // self.interval + 1) * self.interval
+        new_checkpoints = [
+            (j, chain[j - k], chain[j - k - 1])
+            for j in range(first, t_end + 1, self.interval)
+        ]
+        self.store(public_seed, public_salt, new_checkpoints)
+
+        return chain[t_start - k:]
+
+    def compute_checksum(self, public_seed: bytes, public_salt: bytes, t_start: int, t_end: int) -> bytes:
+        """Checksum (K_public) for [t_start, t_end] using the cache."""
+        window = self.compute_window(public_seed, public_salt, t_start, t_end)
+        return derive_public_key_piece(window, 0, len(window) - 1)
@@ -43,7 +43,8 @@ def run_client_demo():
     resp = requests.post(f"{BASE_URL}/verify", json={
         "checksum": binascii.hexlify(checksum).decode(),
         "t_start": t_start,
-        "t_end": t_end
+        "t_end": t_end,
+        "epoch": data.get("epoch")
     })
     
     if resp.status_code != 200:
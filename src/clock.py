@@ -0,0 +1,78 @@
+import time
+import threading
+
+
+class RealClock:
+    """Wall clock. The default for Server, TimeKeeper and the tickers."""
+
+    def time(self) -> float:
+        return time.time()
+
+    def sleep(self, seconds: float):
+        if seconds > 0:
+            time.sleep(seconds)
+
+
+class VirtualClock:
+    """
+    Hand-driven clock for tests and simulations.
+
+    sleep() blocks until another thread calls advance() past the sleeper's
+    deadline, so tick/expiry scenarios run at CPU speed. With
+    auto_advance=True, sleep() simply moves time forward instead of
+    blocking, which suits single-threaded simulations of long uptimes.
+    """
+
+    def __init__(self, start: float = 0.0, auto_advance: bool = False):
+        self._now = start
+        self.auto_advance = auto_advance
+        self._cond = threading.Condition()
+        self._sleepers = {}  # thread ident -> deadline
+
+    def time(self) -> float:
+        return self._now
+
+    def sleep(self, seconds: float):
+        with self._cond:
+            deadline = self._now + max(0.0, seconds)
+            if self.auto_advance:
+                self._now = max(self._now, deadline)
+                self._cond.notify_all()
+                return
+            ident = threading.get_ident()
+            self._sleepers[ident] = deadline
+            self._cond.notify_all()
+            try:
+                while self._now < deadline:
+                    self._cond.wait()
+            finally:
+                del self._sleepers[ident]
+                self._cond.notify_all()
+
+    def advance(self, seconds: float):
+        """Moves time forward and wakes every sleeper whose deadline passed."""
+        with self._cond:
+            self._now += seconds
+            self._cond.notify_all()
+
+    def wait_for_sleepers(self, count: int = 1, timeout: float = 5.0) -> bool:
+        """
+        Blocks (in real time) until `count` threads are asleep with deadlines
+        still in the future, i.e. they finished reacting to the last advance().
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while sum(1 for d in self._sleepers.values() if d > self._now) < count:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def advance_and_settle(self, seconds: float, sleepers: int = 1, timeout: float = 5.0) -> bool:
+        """advance() then wait_for_sleepers(): the usual step in threaded tests."""
+        self.advance(seconds)
+        return self.wait_for_sleepers(sleepers, timeout)
+
+
+REAL_CLOCK = RealClock()
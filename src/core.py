@@ -70,29 +70,59 @@ def evolve_public_chain(x0: bytes, salt: bytes, steps: int) -> list[bytes]:
     Returns:
         A list of bytes containing [X_0, X_1, ..., X_steps].
     """
-    history = [x0]
-    
     # X_{-1} is defined as 32 bytes of zeros for the first step
-    prev_x = bytes(32)
+    return evolve_public_chain_from(x0, bytes(32), salt, 0, steps)
+
+def evolve_public_chain_from(x_k: bytes, x_prev: bytes, salt: bytes, k: int, target: int) -> list[bytes]:
+    """
+    Resumes the public chain from a checkpoint.
     
-    for t in range(steps):
-        # Current X_t is the last element in history
-        current_x = history[-1]
+    Args:
+        x_k: X_k, the chain value at index k.
+        x_prev: X_{k-1} (32 zero bytes when k == 0).
+        salt: The public salt.
+        k: Index of x_k.
+        target: Last index to compute (inclusive).
         
-        # t is the step index, starting from 0.
-        # We are computing X_{t+1}.
+    Returns:
+        A list of bytes containing [X_k, X_{k+1}, ..., X_target].
+    """
+    history = [x_k]
+    current_x = x_k
+    
+    for t in range(k, target):
+        # t is the step index; we are computing X_{t+1}.
         # We use 8 bytes (64-bit big-endian) for t.
         t_bytes = struct.pack(">Q", t)
         
         # Input: X_t || X_{t-1} || salt || t
-        data = current_x + prev_x + salt + t_bytes
-        next_x = sha256(data)
+        next_x = sha256(current_x + x_prev + salt + t_bytes)
         
         history.append(next_x)
-        prev_x = current_x
+        x_prev = current_x
+        current_x = next_x
         
     return history
 
+def evolve_public_chain_to(x_k: bytes, x_prev: bytes, salt: bytes, k: int, target: int, digest=None) -> tuple[bytes, bytes]:
+    """
+    Like evolve_public_chain_from, but keeps only the last two values, so
+    long segments run in constant memory.
+
+    Args:
+        digest: Optional hashlib object; X_{k+1}, ..., X_target are fed to it in order.
+
+    Returns:
+        (X_target, X_{target-1}).
+    """
+    new_sha256 = hashlib.sha256
+    pack = struct.Struct(">Q").pack
+    for t in range(k, target):
+        x_k, x_prev = new_sha256(x_k + x_prev + salt + pack(t)).digest(), x_k
+        if digest is not None:
+            digest.update(x_k)
+    return x_k, x_prev
+
 def derive_public_key_piece(history: list[bytes], t_start: int, t_end: int) -> bytes:
     """
     Derives a public key piece from a window of the public chain history.
@@ -0,0 +1,262 @@
+"""
+Chain epochs: replacing the chain (seed, salt, secrets) without downtime.
+
+Each epoch is an independent Server with its own DB file (epoch 0 keeps the
+plain DB path). A rollover
+1. prepares epoch N+1 off the request path: a Server with fresh random
+   seed, salt and secrets, its public history already evolved over the
+   whole encrypt horizon;
+2. anchors its tick 0 at the start of epoch N's current tick, writes the
+   pointer file (tmp + os.replace) and returns it for the caller to swap
+   in, so the switch is one file rename and one reference assignment;
+3. keeps epoch N live through overlap_ticks more ticks, ticked in lockstep
+   with the current epoch (tick_retiring), so windows already encrypted
+   under it are still released; then, once no request is using it, closes
+   it and deletes its DB file, secrets included.
+
+Ticks are numbered per epoch. Requests name their epoch ("epoch"); those
+without one go to the current epoch.
+"""
+import collections
+import concurrent.futures
+import json
+import os
+import threading
+import weakref
+from collections import namedtuple
+
+from .server import Server, DB_PATH
+
+# An epoch still serving releases after a rollover. retire_t is the last
+# tick it serves; it is retired once its current_t moves past it.
+RetiringEpoch = namedtuple("RetiringEpoch", ["epoch", "server", "retire_t"])
+
+# Default overlap: the old epoch accepted windows up to current_t +
+# MAX_FUTURE_TICKS, and serves every tick up to that one
+DEFAULT_OVERLAP_TICKS = Server.MAX_FUTURE_TICKS
+
+
+class EpochRetired(ValueError):
+    """acquire() was handed a Server that has been retired (a rollover raced the request)."""
+
+
+def epoch_db_path(db_path, epoch):
+    """server_state.db for epoch 0, server_state.epoch<N>.db after that."""
+    if epoch == 0:
+        return db_path
+    root, ext = os.path.splitext(db_path)
+    return f"{root}.epoch{epoch}{ext}"
+
+
+class EpochManager:
+    """
+    Epoch bookkeeping for one service. The caller owns the current Server
+    (app.py's server_instance) and passes it in; this holds the retiring
+    epoch and the prepared next one.
+    """
+
+    def __init__(self, db_path=None, overlap_ticks=None, clock=None):
+        self.db_path = db_path or DB_PATH
+        self.pointer_path = self.db_path + ".epoch"
+        if overlap_ticks is None:
+            overlap_ticks = int(os.environ.get('EPOCH_OVERLAP_TICKS', DEFAULT_OVERLAP_TICKS))
+        self.overlap_ticks = overlap_ticks
+        self.clock = clock
+        self.retiring = None
+        self._next = None
+        self._preparer = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="epoch-prepare")
+        # One rollover (or retirement) at a time
+        self._lock = threading.Lock()
+        # Requests holding a Server (acquire/release). A retired Server is
+        # closed when the last one lets go; _use_lock also guards self.retiring.
+        self._use_lock = threading.Lock()
+        self._in_use = collections.Counter()
+        self._closing = {}  # Server -> its RetiringEpoch, closed once unused
+        self._retired = weakref.WeakSet()  # never handed out again
+
+    def _read_pointer(self):
+        try:
+            with open(self.pointer_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"epoch": 0, "retiring": None}
+
+    def _write_pointer(self, epoch, retiring):
+        tmp = self.pointer_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"epoch": epoch, "retiring": retiring and {"epoch": retiring.epoch, "retire_t": retiring.retire_t}}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.pointer_path)
+
+    def open_current(self, **kwargs) -> Server:
+        """
+        Loads the current epoch's Server (and a retiring one whose overlap
+        had not ended at shutdown). kwargs go to the Server.
+        """
+        pointer = self._read_pointer()
+        epoch = pointer["epoch"]
+        retiring = pointer.get("retiring")
+        if retiring:
+            path = epoch_db_path(self.db_path, retiring["epoch"])
+            if os.path.exists(path):
+                server = Server(db_path=path, epoch=retiring["epoch"], clock=self.clock, **kwargs)
+                self.retiring = RetiringEpoch(retiring["epoch"], server, retire_t=retiring["retire_t"])
+            else:
+                self._write_pointer(epoch, None)
+        return Server(db_path=epoch_db_path(self.db_path, epoch), epoch=epoch, clock=self.clock, **kwargs)
+
+    def prepare(self, current: Server) -> concurrent.futures.Future:
+        """Starts building the epoch after `current` in the background (once). Returns its Future."""
+        with self._lock:
+            return self._prepare(current)
+
+    def _prepare(self, current):
+        if self._next is None or self._next.epoch != current.epoch + 1:
+            future = self._preparer.submit(self._build, current, current.epoch + 1)
+            future.epoch = current.epoch + 1
+            self._next = future
+        return self._next
+
+    def _build(self, current, epoch):
+        server = Server(db_path=epoch_db_path(self.db_path, epoch), epoch=epoch, clock=current.clock,
+                        checkpoint_interval=current.checkpoint_interval, tick_seconds=current.tick_seconds,
+                        persist_interval=current.persist_interval)
+        server.warm_public_history()
+        print(f"Prepared chain epoch {epoch}")
+        return server
+
+    def rollover(self, current: Server, overlap_ticks=None, publish=None) -> Server:
+        """
+        Switches from `current` to the next epoch (building it now if
+        prepare() was not called) and returns the new Server. publish(new)
+        is called before anything is retired, so the caller can swap it in
+        while `current` is still open. `current` stays live for
+        overlap_ticks (default self.overlap_ticks); 0 retires it at once.
+        """
+        overlap = self.overlap_ticks if overlap_ticks is None else overlap_ticks
+        if overlap < 0:
+            raise ValueError("overlap_ticks must not be negative")
+        with self._lock:
+            nxt = self._prepare(current).result()
+            self._next = None
+            previous = self._take_retiring()
+            nxt.start_tick_at(current.tick_started_at)
+            retiring = RetiringEpoch(current.epoch, current, current.current_t + overlap) if overlap else None
+            self._write_pointer(nxt.epoch, retiring)
+            with self._use_lock:
+                self.retiring = retiring
+            if publish:
+                publish(nxt)
+            if previous:
+                # A rollover inside an overlap ends the previous overlap early
+                self._retire(previous)
+            if retiring is None:
+                self._retire(RetiringEpoch(current.epoch, current, current.current_t))
+        print(f"Rolled over to chain epoch {nxt.epoch}" + (f"; epoch {current.epoch} serves up to t={retiring.retire_t}" if retiring else ""))
+        return nxt
+
+    def tick_retiring(self):
+        """
+        Advances the retiring epoch by one tick (called by the ticker after
+        each tick of the current epoch) and retires it once its overlap ends.
+        """
+        retiring = self.retiring
+        if retiring is None:
+            return
+        server = retiring.server
+        if server.current_t <= retiring.retire_t:
+            server.advance_private_state_to(server.current_t + 1, defer_save=True)
+        # Past its last tick (a release of window retire_t also moves it there)
+        if server.current_t > retiring.retire_t:
+            with self._lock:
+                if self.retiring is retiring:
+                    self._take_retiring()
+                    self._write_pointer(retiring.epoch + 1, None)
+                    self._retire(retiring)
+
+    def _take_retiring(self):
+        """Unpublishes the retiring epoch, so acquire() no longer hands it out."""
+        with self._use_lock:
+            retiring, self.retiring = self.retiring, None
+        return retiring
+
+    def _retire(self, retiring):
+        with self._use_lock:
+            self._retired.add(retiring.server)
+            if self._in_use[retiring.server]:
+                # Requests still hold it; release() closes it after the last one
+                self._closing[retiring.server] = retiring
+                return
+        self._close(retiring)
+
+    def _close(self, retiring):
+        retiring.server.close()
+        path = epoch_db_path(self.db_path, retiring.epoch)
+        if os.path.exists(path):
+            os.remove(path)
+        print(f"Retired chain epoch {retiring.epoch}")
+
+    def acquire(self, current: Server, epoch=None) -> tuple:
+        """
+        (Server, retire_t) of chain `epoch`: `current` for None or its own
+        epoch (retire_t None), else the retiring epoch. Raises ValueError for
+        any other epoch, EpochRetired if `current` was retired meanwhile (the
+        caller's reference is stale). The Server stays open until
+        release(server).
+        """
+        with self._use_lock:
+            if epoch is None or epoch == current.epoch:
+                if current in self._retired:
+                    raise EpochRetired(f"Epoch {current.epoch} was retired")
+                server, retire_t = current, None
+            else:
+                retiring = self.retiring
+                if retiring is None or retiring.epoch != epoch:
+                    raise ValueError(f"Unknown epoch {epoch} (current epoch is {current.epoch})")
+                server, retire_t = retiring.server, retiring.retire_t
+            self._in_use[server] += 1
+        return server, retire_t
+
+    def release(self, server: Server):
+        """Ends one acquire(); closes the Server if it was retired meanwhile."""
+        with self._use_lock:
+            self._in_use[server] -= 1
+            if self._in_use[server] > 0:
+                return
+            del self._in_use[server]
+            retired = self._closing.pop(server, None)
+        if retired is not None:
+            self._close(retired)
+
+    def follow(self, server: Server = None) -> Server:
+        """
+        For a process that only ticks the chain (src/ticker.py): `server`
+        while it is still the current epoch in the pointer file, else the
+        Server of the epoch another process rolled over to. The retiring
+        epoch is ticked and retired by the process serving requests.
+        """
+        epoch = self._read_pointer()["epoch"]
+        if server is not None:
+            if server.epoch == epoch:
+                return server
+            # A retired epoch's file is deleted; saving would recreate it
+            server.close(save=os.path.exists(server.db_path))
+            print(f"Following chain epoch {epoch}")
+        return Server(db_path=epoch_db_path(self.db_path, epoch), epoch=epoch, clock=self.clock)
+
+    def describe(self, current: Server) -> list:
+        """Live epochs for /status: id, tick and (when retiring) the last tick it serves."""
+        epochs = [{"epoch": current.epoch, "current_t": current.current_t, "retire_t": None}]
+        retiring = self.retiring
+        if retiring is not None:
+            epochs.append({"epoch": retiring.epoch, "current_t": retiring.server.current_t, "retire_t": retiring.retire_t})
+        return epochs
+
+    def close(self):
+        """Stops the preparer and closes the retiring and prepared epochs' Servers (not the current one)."""
+        self._preparer.shutdown(wait=True)
+        if self.retiring:
+            self.retiring.server.close()
+        if self._next is not None and self._next.done() and not self._next.exception():
+            self._next.result().close()
@@ -4,11 +4,16 @@ import requests
 import binascii
 import os
 import sys
-from src.alice import alice_compute_public_history, alice_compute_checksum, alice_derive_final_key, alice_decrypt
+import time
+from src.alice import (alice_compute_window_checksum, alice_compute_window_checksum_from_checkpoints,
+                       alice_verify_checkpoints, alice_derive_final_key, alice_decrypt)
+from src.chain_cache import ChainCheckpointCache
+from src.levels import is_base
+from src import stream_aead
 
 BASE_URL = "http://localhost:5001"
 
-def encrypt_file(filepath, t_start, t_end):
+def encrypt_file(filepath, t_start, t_end, level=None):
     print(f"[*] Reading file: {filepath}")
     try:
         with open(filepath, 'rb') as f:
@@ -24,7 +29,8 @@ def encrypt_file(filepath, t_start, t_end):
         res = requests.post(f"{BASE_URL}/encrypt", json={
             "plaintext": plaintext_hex,
             "t_start": t_start,
-            "t_end": t_end
+            "t_end": t_end,
+            "level": level
         })
         
         if res.status_code != 200:
@@ -46,10 +52,40 @@ def encrypt_file(filepath, t_start, t_end):
         print("[!] Error: Could not connect to server. Is it running on port 5001?")
         sys.exit(1)
 
-def decrypt_file(enc_filepath):
+def load_server_checkpoints(pub_seed, pub_salt, spot_checks=2):
+    """
+    Fetches /checkpoints and spot-checks them. Returns them for this run only
+    ([] if unusable): they are never written to the persistent cache.
+    """
+    checkpoints = []
+    since = 0
+    while True:
+        res = requests.get(f"{BASE_URL}/checkpoints", params={"since": since})
+        if res.status_code != 200:
+            print(f"[!] Server checkpoints unavailable: {res.text}")
+            return []
+        data = res.json()
+        if binascii.unhexlify(data["public_seed"]) != pub_seed or binascii.unhexlify(data["public_salt"]) != pub_salt:
+            print("[!] Server is on a different chain than this file; ignoring its checkpoints.")
+            return []
+        page = [(c["k"], binascii.unhexlify(c["x_k"]), binascii.unhexlify(c["x_prev"])) for c in data["checkpoints"]]
+        if not page:
+            break
+        checkpoints.extend(page)
+        since = page[-1][0] + 1
+
+    if not alice_verify_checkpoints(pub_seed, pub_salt, checkpoints, spot_checks):
+        print("[!] Server checkpoints failed spot-check verification; ignoring them.")
+        return []
+    return checkpoints
+
+def decrypt_file(enc_filepath, cache=None, server_checkpoints=False):
     print(f"[*] Reading encrypted file: {enc_filepath}")
     try:
-        with open(enc_filepath, 'r') as f:
+        with open(enc_filepath, 'rb') as f:
+            if f.read(len(stream_aead.MAGIC)) == stream_aead.MAGIC:
+                return decrypt_stream_file(enc_filepath, cache, server_checkpoints)
+            f.seek(0)
             data = json.load(f)
     except FileNotFoundError:
         print(f"[!] Error: File not found: {enc_filepath}")
@@ -70,14 +106,38 @@ def decrypt_file(enc_filepath):
         print(f"[!] Error: Missing field in encrypted file: {e}")
         sys.exit(1)
 
-    print(f"[*] Target Window: [{t_start}, {t_end}]")
+    k_final = _release_final_key(pub_seed, pub_salt, t_start, t_end, data.get("epoch"), cache, server_checkpoints,
+                                 data.get("level"))
+    try:
+        print("[*] Decrypting...")
+        decrypted_bytes = alice_decrypt(ciphertext, k_final, nonce)
+        
+        output_path = _output_path(enc_filepath)
+            
+        with open(output_path, 'wb') as f:
+            f.write(decrypted_bytes)
+            
+        print(f"[+] Success! Decrypted file saved to: {output_path}")
+        
+    except Exception as e:
+        print(f"[!] Error during decryption: {e}")
+        sys.exit(1)
+
+def _release_final_key(pub_seed, pub_salt, t_start, t_end, epoch, cache, server_checkpoints, level=None):
+    """Computes the window checksum, has the server release the key pieces and returns K_final."""
+    print(f"[*] Target Window: [{t_start}, {t_end}]" + ("" if is_base(level) else f" ({level}s)"))
+    # Server checkpoints are of the base chain
+    checkpoints = []
+    if server_checkpoints and is_base(level):
+        checkpoints = load_server_checkpoints(pub_seed, pub_salt)
+        print(f"[*] Loaded {len(checkpoints)} spot-checked server checkpoints.")
     print("[*] Computing public hash chain (Proof of Time)...")
     
-    # 1. Compute Chain
-    history = alice_compute_public_history(pub_seed, pub_salt, t_end)
-    
-    # 2. Compute Checksum
-    checksum = alice_compute_checksum(history, t_start, t_end)
+    # 1-2. Compute Chain and Checksum (resuming from cached checkpoints if enabled)
+    if checkpoints:
+        checksum = alice_compute_window_checksum_from_checkpoints(pub_seed, pub_salt, checkpoints, t_start, t_end, cache)
+    else:
+        checksum = alice_compute_window_checksum(pub_seed, pub_salt, t_start, t_end, cache, level)
     checksum_hex = binascii.hexlify(checksum).decode()
     
     print("[*] Verifying checksum with server...")
@@ -85,7 +145,10 @@ def decrypt_file(enc_filepath):
         res = requests.post(f"{BASE_URL}/verify", json={
             "checksum": checksum_hex,
             "t_start": t_start,
-            "t_end": t_end
+            "t_end": t_end,
+            "request_nonce": os.urandom(8).hex(),
+            "epoch": epoch,
+            "level": level
         })
         
         if res.status_code != 200:
@@ -98,29 +161,128 @@ def decrypt_file(enc_filepath):
         
         print("[+] Server verified checksum and released private key piece.")
         print("[*] Deriving final key...")
-        
-        k_final = alice_derive_final_key(k_public, k_private)
-        
-        print("[*] Decrypting...")
-        decrypted_bytes = alice_decrypt(ciphertext, k_final, nonce)
-        
-        # Determine output filename (remove .enc if present, else add .dec)
-        if enc_filepath.endswith(".enc"):
-            output_path = enc_filepath[:-4]
-        else:
-            output_path = f"{enc_filepath}.dec"
-            
-        with open(output_path, 'wb') as f:
-            f.write(decrypted_bytes)
-            
-        print(f"[+] Success! Decrypted file saved to: {output_path}")
+        return alice_derive_final_key(k_public, k_private)
         
     except Exception as e:
         print(f"[!] Error during decryption: {e}")
         sys.exit(1)
 
+def encrypt_file_stream(filepath, t_start, t_end, level=None):
+    """
+    Encrypts through POST /encrypt/stream: the file is uploaded and the
+    sealed stream saved as it arrives, so neither side holds the whole file.
+    """
+    output_path = f"{filepath}.enc"
+    print(f"[*] Streaming {filepath} for window [{t_start}, {t_end}]...")
+    try:
+        with open(filepath, 'rb') as f:
+            res = requests.post(f"{BASE_URL}/encrypt/stream", data=f, stream=True, params={
+                "t_start": t_start,
+                "t_end": t_end,
+                "request_nonce": os.urandom(8).hex(),
+                "level": level
+            }, headers={"Content-Type": "application/octet-stream"})
+            if res.status_code != 200:
+                print(f"[!] Server Error ({res.status_code}): {res.text}")
+                sys.exit(1)
+            with open(output_path, 'wb') as out:
+                for chunk in res.iter_content(stream_aead.CHUNK_SIZE):
+                    out.write(chunk)
+    except FileNotFoundError:
+        print(f"[!] Error: File not found: {filepath}")
+        sys.exit(1)
+    except requests.exceptions.ConnectionError:
+        print("[!] Error: Could not connect to server. Is it running on port 5001?")
+        sys.exit(1)
+    print(f"[+] Encrypted stream saved to: {output_path}")
+
+def decrypt_stream_file(enc_filepath, cache=None, server_checkpoints=False):
+    """Decrypts a file written by encrypt_file_stream, one chunk at a time."""
+    output_path = _output_path(enc_filepath)
+    with open(enc_filepath, 'rb') as f:
+        header = stream_aead.read_header(f.read)
+        fields = header.fields
+        k_final = _release_final_key(binascii.unhexlify(fields["public_seed"]), binascii.unhexlify(fields["public_salt"]),
+                                     fields["t_start"], fields["t_end"], fields.get("epoch"), cache, server_checkpoints,
+                                     fields.get("level"))
+        print("[*] Decrypting...")
+        partial = output_path + ".part"
+        try:
+            with open(partial, 'wb') as out:
+                for chunk in stream_aead.decrypt_stream(k_final, f.read, header):
+                    out.write(chunk)
+        except Exception as e:
+            # Never leave plaintext from a stream that failed authentication
+            os.remove(partial)
+            print(f"[!] Error during decryption: {e}")
+            sys.exit(1)
+    os.replace(partial, output_path)
+    print(f"[+] Success! Decrypted file saved to: {output_path}")
+
+def _output_path(enc_filepath):
+    # Determine output filename (remove .enc if present, else add .dec)
+    if enc_filepath.endswith(".enc"):
+        return enc_filepath[:-4]
+    return f"{enc_filepath}.dec"
+
+def _write_scheduled_result(enc_filepath, result):
+    if isinstance(result, Exception):
+        print(f"[!] {enc_filepath}: Decryption Failed: {result}")
+        return
+    output_path = _output_path(enc_filepath)
+    with open(output_path, 'wb') as f:
+        f.write(result)
+    print(f"[+] {enc_filepath}: Decrypted file saved to: {output_path}")
+
+def _start_time_keeper():
+    from src.time_keeper import TimeKeeper
+    tk = TimeKeeper(base_url=BASE_URL)
+    tk.sync()
+    tk.start()
+    return tk
+
+def scheduled_decrypt_files(enc_filepaths, cache=None):
+    """
+    Precomputes the checksum for each file right away, then sends /verify
+    at the middle of each file's t_end tick and decrypts immediately.
+    """
+    from src.scheduled_decrypt import ScheduledDecryptor
+    tk = _start_time_keeper()
+    decryptor = ScheduledDecryptor(tk, base_url=BASE_URL, cache=cache)
+    for path in enc_filepaths:
+        job = decryptor.submit(path, on_done=_write_scheduled_result)
+        print(f"[*] Scheduled {path} for T={job.t_end} (now T={tk.get_time()})")
+    decryptor.shutdown()
+    tk.stop()
+
+def watch_directory(directory, poll_interval=0.5, cache=None):
+    """Schedules every new .enc file that appears in directory."""
+    from src.scheduled_decrypt import ScheduledDecryptor
+    tk = _start_time_keeper()
+    decryptor = ScheduledDecryptor(tk, base_url=BASE_URL, cache=cache)
+    seen = set()
+    print(f"[*] Watching {directory} for .enc files (Ctrl+C to stop)...")
+    try:
+        while True:
+            for name in sorted(os.listdir(directory)):
+                path = os.path.join(directory, name)
+                if name.endswith(".enc") and path not in seen:
+                    seen.add(path)
+                    try:
+                        job = decryptor.submit(path, on_done=_write_scheduled_result)
+                    except (OSError, ValueError, KeyError) as e:
+                        print(f"[!] Skipping {path}: {e}")
+                        continue
+                    print(f"[*] Scheduled {path} for T={job.t_end} (now T={tk.get_time()})")
+            time.sleep(poll_interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        tk.stop()
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Ephemeral File Encryption Demo")
+    parser.add_argument("--no-cache", action="store_true", help="Do not use the on-disk chain checkpoint cache")
     subparsers = parser.add_subparsers(dest="command", required=True)
     
     # Encrypt Command
@@ -128,14 +290,33 @@ if __name__ == "__main__":
     enc_parser.add_argument("filepath", help="Path to the file to encrypt")
     enc_parser.add_argument("t_start", type=int, help="Start tick of the validity window")
     enc_parser.add_argument("t_end", type=int, help="End tick of the validity window")
+    enc_parser.add_argument("--stream", action="store_true", help="Upload through /encrypt/stream (constant memory, for large files)")
+    enc_parser.add_argument("--level", help="Count t_start and t_end in ticks of this level (minute, hour, day)")
     
     # Decrypt Command
     dec_parser = subparsers.add_parser("decrypt", help="Decrypt a file")
     dec_parser.add_argument("filepath", help="Path to the .enc file")
+    dec_parser.add_argument("--server-checkpoints", action="store_true", help="Start from spot-checked /checkpoints published by the server")
+    
+    # Scheduled Decrypt Command
+    sched_parser = subparsers.add_parser("schedule", help="Precompute now, decrypt at the target tick")
+    sched_parser.add_argument("filepaths", nargs="+", help="Paths to .enc files")
+
+    # Watch Command
+    watch_parser = subparsers.add_parser("watch", help="Schedule every .enc file arriving in a directory")
+    watch_parser.add_argument("directory", help="Directory to watch")
     
     args = parser.parse_args()
+    cache = None if args.no_cache else ChainCheckpointCache()
     
     if args.command == "encrypt":
-        encrypt_file(args.filepath, args.t_start, args.t_end)
+        if args.stream:
+            encrypt_file_stream(args.filepath, args.t_start, args.t_end, args.level)
+        else:
+            encrypt_file(args.filepath, args.t_start, args.t_end, args.level)
     elif args.command == "decrypt":
-        decrypt_file(args.filepath)
+        decrypt_file(args.filepath, cache, args.server_checkpoints)
+    elif args.command == "schedule":
+        scheduled_decrypt_files(args.filepaths, cache)
+    elif args.command == "watch":
+        watch_directory(args.directory, cache=cache)
@@ -0,0 +1,66 @@
+"""
+Coarse companion clocks for long-horizon locks.
+
+Next to the base chain (one step per tick), the server keeps one chain per
+level below. Each has its own public chain, private state and ratcheting
+secret, and takes one step every `factor` base ticks. Its index is
+current_t // factor, so "day" index d covers base ticks
+[86400 d, 86400 (d + 1)). Levels are only served at 1 s ticks.
+
+A window given in level ticks costs the same as a base window of the same
+width: encrypt simulates at most MAX_FUTURE_TICKS level steps, and Alice
+evolves the level's public chain, which is `factor` times shorter than the
+base chain. Releases are one-shot per level tick, like base ticks. A level
+key can only be released while the base clock is inside its level tick.
+"""
+from collections import namedtuple
+
+from .core import sha256
+
+BASE_LEVEL = "tick"
+
+# Level name -> base ticks per level tick. The names only hold at 1 s
+# ticks, so servers with another tick duration refuse levels
+# (check_tick_seconds) rather than serve a "day" of the wrong length.
+LEVELS = {"minute": 60, "hour": 3600, "day": 86400}
+LEVEL_TICK_SECONDS = 1.0
+
+# One coarse chain inside a ServerSnapshot (the base chain has the same shape)
+LevelState = namedtuple("LevelState", ["server_secret", "private_state", "current_t", "public_history"])
+
+
+def is_base(level) -> bool:
+    return level is None or level == BASE_LEVEL
+
+
+def level_factor(level) -> int:
+    """Base ticks per tick of `level`. Raises ValueError for unknown levels."""
+    if is_base(level):
+        return 1
+    try:
+        return LEVELS[level]
+    except (KeyError, TypeError):
+        raise ValueError(f"Unknown level {level!r}. Use one of: {', '.join([BASE_LEVEL, *LEVELS])}")
+
+
+def check_tick_seconds(tick_seconds):
+    """Raises ValueError unless levels mean what they say at this tick duration."""
+    if tick_seconds != LEVEL_TICK_SECONDS:
+        raise ValueError(f"Levels need {LEVEL_TICK_SECONDS:g} s ticks; this server ticks every {tick_seconds:g} s")
+
+
+def level_public_params(public_seed: bytes, public_salt: bytes, level) -> tuple:
+    """
+    (X_0, salt) of the level's public chain. Derived from the base chain's,
+    so clients need nothing new from the server.
+    """
+    if is_base(level):
+        return public_seed, public_salt
+    name = level.encode()
+    return sha256(b"LEVEL_SEED" + name + public_seed), sha256(b"LEVEL_SALT" + name + public_salt)
+
+
+def base_ticks(level, t) -> tuple:
+    """First and last base tick of level tick t, during which its key can be released."""
+    factor = level_factor(level)
+    return t * factor, (t + 1) * factor - 1
@@ -0,0 +1,155 @@
+import bisect
+import time
+import threading
+from contextlib import contextmanager
+
+# Histogram bucket upper bounds, in seconds (100us .. 10s)
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Fixed-bucket histogram. observe() is a bisect plus a few adds under a lock."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect.bisect_left(self.buckets, value)  # first bound >= value; len(buckets) is +Inf
+        with self._lock:
+            self.counts[i] += 1
+            self.total += value
+            self.count += 1
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.total, self.count
+
+
+class MetricsRegistry:
+    """
+    In-process metrics: labelled histograms, counters and gauges, rendered
+    in Prometheus text exposition format by render().
+    """
+
+    def __init__(self, prefix="timelock"):
+        self.prefix = prefix
+        self._histograms = {}  # (name, labels) -> Histogram
+        self._counters = {}    # (name, labels) -> float
+        self._gauges = {}      # (name, labels) -> float
+        self._help = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items())) if labels else ()
+
+    def describe(self, name, text):
+        self._help[name] = text
+
+    def histogram(self, name, **labels) -> Histogram:
+        key = self._key(name, labels)
+        hist = self._histograms.get(key)
+        if hist is None:
+            with self._lock:
+                hist = self._histograms.setdefault(key, Histogram())
+        return hist
+
+    def observe(self, name, value, **labels):
+        self.histogram(name, **labels).observe(value)
+
+    def inc(self, name, amount=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def set_gauge(self, name, value, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._gauges[key] = value
+
+    def get_counter(self, name, **labels):
+        return self._counters.get(self._key(name, labels), 0)
+
+    @contextmanager
+    def stage(self, stage_name):
+        """Times a block into the <prefix>_stage_seconds{stage=...} histogram."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("stage_seconds", time.perf_counter() - start, stage=stage_name)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self._gauges.clear()
+
+    @staticmethod
+    def _format_labels(labels, extra=None):
+        items = list(labels) + (list(extra) if extra else [])
+        if not items:
+            return ""
+        escaped = [(k, str(v).replace("\\", "\\\\").replace('"', '\\"')) for k, v in items]
+        return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+    def render(self) -> str:
+        """Prometheus text format (version 0.0.4)."""
+        # Copies taken under the lock: request threads add series while this renders
+        with self._lock:
+            counters, gauges, histograms = dict(self._counters), dict(self._gauges), dict(self._histograms)
+        lines = []
+
+        def header(name, kind):
+            full = f"{self.prefix}_{name}"
+            if name in self._help:
+                lines.append(f"# HELP {full} {self._help[name]}")
+            lines.append(f"# TYPE {full} {kind}")
+            return full
+
+        for kind, store in (("counter", counters), ("gauge", gauges)):
+            by_name = {}
+            for (name, labels), value in sorted(store.items()):
+                by_name.setdefault(name, []).append((labels, value))
+            for name, series in by_name.items():
+                full = header(name, kind)
+                for labels, value in series:
+                    lines.append(f"{full}{self._format_labels(labels)} {value}")
+
+        by_name = {}
+        for (name, labels), hist in sorted(histograms.items(), key=lambda item: item[0]):
+            by_name.setdefault(name, []).append((labels, hist))
+        for name, series in by_name.items():
+            full = header(name, "histogram")
+            for labels, hist in series:
+                counts, total, count = hist.snapshot()
+                cumulative = 0
+                for bound, c in zip(hist.buckets + (float("inf"),), counts):
+                    cumulative += c
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{full}_bucket{self._format_labels(labels, [('le', le)])} {cumulative}")
+                lines.append(f"{full}_sum{self._format_labels(labels)} {total}")
+                lines.append(f"{full}_count{self._format_labels(labels)} {count}")
+
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry used by Server and app.py
+METRICS = MetricsRegistry()
+METRICS.describe("stage_seconds", "Time spent in each request/tick stage.")
+METRICS.describe("request_seconds", "HTTP request latency by endpoint.")
+METRICS.describe("ticks_advanced_total", "Private-state ticks advanced (including burns).")
+METRICS.describe("tick_lag_seconds", "How far past its due time the next tick is.")
+METRICS.describe("tick_jitter_seconds", "How late each tick started relative to its schedule.")
+METRICS.describe("nonce_set_size", "Request nonces currently tracked for replay protection.")
+METRICS.describe("public_history_length", "Entries in the cached public chain history.")
+METRICS.describe("current_tick", "Current server tick.")
+METRICS.describe("audit_records_written_total", "Audit records committed to the audit log.")
+METRICS.describe("audit_records_dropped_total", "Audit records dropped because the audit buffer was full.")
+METRICS.describe("tick_subscribers", "Open GET /ticks streams on the asyncio front end.")
+METRICS.describe("tick_subscribers_dropped_total", "Tick subscribers dropped for not reading their stream.")
+METRICS.describe("frontend_shed_total", "Requests shed because the asyncio front end queue was full.")
@@ -0,0 +1,148 @@
+import sys
+import time
+import threading
+import tracemalloc
+from collections import Counter
+
+# Frames recorded per allocation when tracemalloc is started on demand
+TRACEMALLOC_FRAMES = 10
+
+_baseline_snapshot = None
+# Also serializes captures, so tracing is never stopped under one
+_baseline_lock = threading.Lock()
+# Whether we started tracemalloc (tracing started elsewhere is left running)
+_started_tracing = False
+
+
+def _collapse(frame):
+    """Renders a frame's stack root-first as 'file:function;file:function'."""
+    parts = []
+    while frame is not None:
+        code = frame.f_code
+        filename = code.co_filename.rsplit("/", 1)[-1]
+        parts.append(f"{filename}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(parts))
+
+
+def sample_stacks(seconds: float, interval: float = 0.005, thread_names=None) -> Counter:
+    """
+    Statistical profiler over all threads (request handlers and the ticker).
+
+    Every `interval` seconds, records the current stack of each thread via
+    sys._current_frames(). Returns a Counter of collapsed stacks
+    ('thread;file:func;...') suitable for flamegraph tools. Unlike
+    cProfile, this sees every thread, not only the caller's.
+    """
+    me = threading.get_ident()
+    stacks = Counter()
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            name = names.get(ident, str(ident))
+            if thread_names and not any(n in name for n in thread_names):
+                continue
+            stacks[f"{name};{_collapse(frame)}"] += 1
+        time.sleep(interval)
+    return stacks
+
+
+def format_collapsed(stacks: Counter) -> str:
+    """One 'stack count' line per distinct stack, most frequent first."""
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+def _start_tracing_locked() -> bool:
+    """Starts tracemalloc unless it is on; returns whether it was started now."""
+    global _started_tracing
+    if tracemalloc.is_tracing():
+        return False
+    tracemalloc.start(TRACEMALLOC_FRAMES)
+    _started_tracing = True
+    return True
+
+
+def _stop_tracing_locked():
+    global _baseline_snapshot, _started_tracing
+    _baseline_snapshot = None
+    if _started_tracing:
+        tracemalloc.stop()
+        _started_tracing = False
+
+
+def take_baseline_snapshot():
+    """
+    Starts tracemalloc and stores a snapshot to diff later allocations
+    against. Tracing (which slows every allocation) stays on until
+    stop_tracing().
+    """
+    global _baseline_snapshot
+    with _baseline_lock:
+        _start_tracing_locked()
+        _baseline_snapshot = tracemalloc.take_snapshot()
+        return _baseline_snapshot
+
+
+def stop_tracing() -> bool:
+    """
+    Drops the stored baseline and stops tracemalloc if this module started
+    it. Returns whether a baseline was stored.
+    """
+    with _baseline_lock:
+        had_baseline = _baseline_snapshot is not None
+        _stop_tracing_locked()
+        return had_baseline
+
+
+def allocation_diff(top: int = 20, seconds: float = 0.0, key_type: str = "lineno"):
+    """
+    Top-N allocation growth between two tracemalloc snapshots.
+
+    Diffs against the stored baseline (take_baseline_snapshot) if there is
+    one. Otherwise traces for this capture only: starts tracemalloc, takes a
+    snapshot, waits `seconds`, takes another and stops it again.
+    Returns a list of dicts sorted by size growth.
+    """
+    with _baseline_lock:
+        before = _baseline_snapshot if tracemalloc.is_tracing() else None
+        if before is not None:
+            after = tracemalloc.take_snapshot()
+        else:
+            started = _start_tracing_locked()
+            try:
+                before = tracemalloc.take_snapshot()
+                time.sleep(seconds)
+                after = tracemalloc.take_snapshot()
+            finally:
+                if started:
+                    _stop_tracing_locked()
+
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    stats = after.filter_traces(filters).compare_to(before.filter_traces(filters), key_type)
+    return [
+        {
+            "location": str(stat.traceback[0]) if stat.traceback else "?",
+            "size_diff": stat.size_diff,
+            "size": stat.size,
+            "count_diff": stat.count_diff,
+            "count": stat.count,
+        }
+        for stat in stats[:top]
+    ]
+
+
+def server_structure_sizes(server) -> dict:
+    """Approximate memory held by the long-uptime growth suspects on a Server."""
+    history = server.public_history
+    nonces = server.nonce_timestamps
+    return {
+        "public_history_len": len(history),
+        "public_history_bytes": sys.getsizeof(history) + sum(sys.getsizeof(x) for x in history),
+        "nonce_timestamps_len": len(nonces),
+        "nonce_timestamps_bytes": sys.getsizeof(nonces) + sum(sys.getsizeof(n) + sys.getsizeof(ts) for n, ts in list(nonces.items())),
+        "seen_nonces_len": len(server.seen_nonces),
+        "seen_nonces_bytes": sys.getsizeof(server.seen_nonces),
+    }
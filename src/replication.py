@@ -0,0 +1,553 @@
+"""
+Replicated Timekeeper: a small Raft-style cluster of nodes that agree on the
+current tick (see production_roadmap.md, "High Availability").
+
+The leader ticks and ships its encrypted state to every follower over a
+persistent local TCP connection. Each follower overwrites its own state and
+persists it. The state is a single overwritten row, so a follower that fell
+behind by several ticks gets one message carrying the newest state: the
+backlog is batched into one round trip. A state is committed once a majority
+holds it. /verify only returns a key after the burn is committed, so a
+failover can never hand the same tick's key out twice.
+
+The private chain is deterministic given S_t and the secret, so a new leader
+that is a few ticks behind simply ticks forward through the same states:
+windows that were pending before the failover still decrypt.
+
+Usage (three local processes):
+    python -m src.replication --id 0 --peers 127.0.0.1:7000,127.0.0.1:7001,127.0.0.1:7002
+    python -m src.replication --id 1 --peers ...
+    python -m src.replication --id 2 --peers ...
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import socketserver
+import sqlite3
+import sys
+import threading
+import time
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.server import Server
+from src.levels import is_base
+from src.metrics import METRICS
+from src.clock import REAL_CLOCK
+
+# Per-node persistence when several nodes share a directory
+REPLICA_DB_TEMPLATE = "server_state.replica{node_id}.db"
+
+FOLLOWER, CANDIDATE, LEADER = "follower", "candidate", "leader"
+
+# Fields of Server.export_state() that are bytes on the wire (hex in JSON)
+_BYTES_FIELDS = ("public_seed", "public_salt", "server_secret", "private_state")
+
+
+def parse_peers(spec: str):
+    """'host:port,host:port' -> [(host, port), ...]; the index is the node id."""
+    peers = []
+    for item in spec.split(","):
+        host, port = item.strip().rsplit(":", 1)
+        peers.append((host, int(port)))
+    return peers
+
+
+def _encode_state(state):
+    encoded = {k: (v.hex() if k in _BYTES_FIELDS else v) for k, v in state.items()}
+    if 'levels' in state:
+        encoded['levels'] = {name: _encode_state(level) for name, level in state['levels'].items()}
+    return encoded
+
+
+def _decode_state(state):
+    decoded = {k: (bytes.fromhex(v) if k in _BYTES_FIELDS else v) for k, v in state.items()}
+    if 'levels' in state:
+        decoded['levels'] = {name: _decode_state(level) for name, level in state['levels'].items()}
+    return decoded
+
+
+class _PeerClient:
+    """One persistent JSON-lines connection to a peer. Not thread-safe: one user at a time."""
+
+    def __init__(self, addr, timeout):
+        self.addr = addr
+        self.timeout = timeout
+        self._sock = None
+        self._file = None
+
+    def call(self, message):
+        """Sends one message and returns the reply, or None if the peer is unreachable."""
+        for _ in range(2):
+            try:
+                if self._sock is None:
+                    self._sock = socket.create_connection(self.addr, timeout=self.timeout)
+                    self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                    self._file = self._sock.makefile("rwb")
+                self._file.write(json.dumps(message).encode() + b"\n")
+                self._file.flush()
+                line = self._file.readline()
+                if not line:
+                    raise ConnectionError("peer closed the connection")
+                return json.loads(line)
+            except (OSError, ValueError):
+                self.close()
+                # A stale pooled connection gets one fresh retry
+        return None
+
+    def close(self):
+        for closable in (self._file, self._sock):
+            try:
+                if closable:
+                    closable.close()
+            except OSError:
+                pass
+        self._sock = self._file = None
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        node = self.server.node
+        for line in self.rfile:
+            if node._stopped.is_set():
+                return
+            try:
+                reply = node.handle_message(json.loads(line))
+            except Exception as e:
+                reply = {"error": f"{type(e).__name__}: {e}"}
+            self.wfile.write(json.dumps(reply).encode() + b"\n")
+            self.wfile.flush()
+
+
+class _RPCServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class ReplicaNode:
+    """
+    One Timekeeper node. Wraps a Server (its own DB file) and runs:
+
+      * an RPC listener for append / vote / status messages from peers
+      * an election timer: followers that hear nothing from a leader for
+        election_timeout start an election for the next term
+      * while leader: the ticker plus one replicator thread per follower,
+        which ships the newest state whenever it changes (or a heartbeat)
+
+    Term, vote and the term of the current state are persisted next to the
+    server state so a restarted node cannot vote twice in one term.
+    """
+
+    def __init__(self, node_id, peers, server, clock=REAL_CLOCK, heartbeat_interval=0.1,
+                 election_timeout=(0.5, 1.0), commit_timeout=1.0, rpc_timeout=0.5):
+        self.node_id = node_id
+        self.peers = peers
+        self.server = server
+        self.clock = clock
+        self.heartbeat_interval = heartbeat_interval
+        self.election_timeout = election_timeout
+        self.commit_timeout = commit_timeout
+        self.rpc_timeout = rpc_timeout
+        self.majority = len(peers) // 2 + 1
+
+        self._lock = threading.RLock()
+        self._commit_cond = threading.Condition(self._lock)
+        self._import_lock = threading.Lock()  # one follower state import at a time
+        self._meta_lock = threading.Lock()
+        self._meta_version = self._meta_saved = 0
+        self._stopped = threading.Event()
+        self.role = FOLLOWER
+        self.leader_id = None
+        self.commit_t = 0
+        self._match = {}  # peer id -> current_t it acknowledged (this term)
+        self._term_acked = set()  # peers holding a state shipped in this term
+        self._last_contact = time.monotonic()
+        self._leader_stop = None  # set when this node stops leading
+        self.last_round_seconds = 0.0
+
+        self._init_meta()
+        self.term, self.voted_for, self.state_term = self._load_meta()
+        self._rpc = None
+
+    # Persistence of Raft metadata
+
+    def _init_meta(self):
+        with sqlite3.connect(self.server.db_path) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS replica_meta (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    term INTEGER NOT NULL,
+                    voted_for INTEGER,
+                    state_term INTEGER NOT NULL
+                )
+            """)
+
+    def _load_meta(self):
+        with sqlite3.connect(self.server.db_path) as conn:
+            row = conn.execute("SELECT term, voted_for, state_term FROM replica_meta WHERE id = 1").fetchone()
+        return row if row else (0, None, 0)
+
+    def _save_meta(self):
+        """Persists term, vote and state term. Call with the node lock held."""
+        self._write_meta(self._meta_snapshot_locked())
+
+    def _meta_snapshot_locked(self):
+        self._meta_version += 1
+        return self._meta_version, (self.term, self.voted_for, self.state_term)
+
+    def _write_meta(self, snapshot):
+        """Writes a _meta_snapshot_locked() result; may run without the node lock."""
+        version, row = snapshot
+        with self._meta_lock:
+            if version <= self._meta_saved:
+                return  # a newer snapshot is already on disk
+            with sqlite3.connect(self.server.db_path) as conn:
+                conn.execute("INSERT OR REPLACE INTO replica_meta (id, term, voted_for, state_term) VALUES (1, ?, ?, ?)",
+                             row)
+            self._meta_saved = version
+
+    # Lifecycle
+
+    def start(self):
+        host, port = self.peers[self.node_id]
+        self._rpc = _RPCServer((host, port), _Handler)
+        self._rpc.node = self
+        threading.Thread(target=self._rpc.serve_forever, daemon=True, name=f"replica-{self.node_id}-rpc").start()
+        threading.Thread(target=self._election_timer, daemon=True, name=f"replica-{self.node_id}-election").start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        with self._lock:
+            self._step_down_locked(self.term)
+        if self._rpc:
+            self._rpc.shutdown()
+            self._rpc.server_close()
+
+    @property
+    def is_leader(self):
+        return self.role == LEADER
+
+    def status(self):
+        with self._lock:
+            return {
+                "node_id": self.node_id,
+                "role": self.role,
+                "term": self.term,
+                "leader_id": self.leader_id,
+                "current_t": self.server.current_t,
+                "commit_t": self.commit_t,
+                "last_round_ms": self.last_round_seconds * 1000,
+            }
+
+    # Message handling (RPC threads)
+
+    def handle_message(self, message):
+        kind = message.get("type")
+        if kind == "append":
+            return self._on_append(message)
+        if kind == "vote":
+            return self._on_vote(message)
+        if kind == "status":
+            return self.status()
+        return {"error": f"Unknown message type {kind!r}"}
+
+    def _on_append(self, message):
+        term = message["term"]
+        with self._lock:
+            if term < self.term:
+                return {"term": self.term, "ok": False}
+            if term > self.term or self.role != FOLLOWER:
+                self._step_down_locked(term)
+            self.leader_id = message["leader"]
+            self._last_contact = time.monotonic()
+        if message.get("state"):
+            # The import writes to SQLite: do it outside the node lock so
+            # heartbeats and votes do not wait on the disk
+            with self._import_lock:
+                with self._lock:
+                    if term != self.term:
+                        return {"term": self.term, "ok": False}
+                self.server.import_state(_decode_state(message["state"]))
+                with self._lock:
+                    self.state_term = term
+                    meta = self._meta_snapshot_locked()
+                self._write_meta(meta)
+        with self._lock:
+            self.commit_t = min(message["commit_t"], self.server.current_t)
+            return {"term": self.term, "ok": True, "match_t": self.server.current_t}
+
+    def _on_vote(self, message):
+        with self._lock:
+            if message["term"] > self.term:
+                self._step_down_locked(message["term"])
+            up_to_date = (message["last_term"], message["last_t"]) >= (self.state_term, self.server.current_t)
+            granted = (
+                message["term"] == self.term
+                and self.voted_for in (None, message["candidate"])
+                and up_to_date
+            )
+            if granted:
+                self.voted_for = message["candidate"]
+                self._last_contact = time.monotonic()
+                self._save_meta()
+            return {"term": self.term, "granted": granted}
+
+    def _step_down_locked(self, term):
+        if term > self.term:
+            self.term = term
+            self.voted_for = None
+            self._save_meta()
+        if self._leader_stop:
+            self._leader_stop.set()
+            self._leader_stop = None
+        self.role = FOLLOWER
+        self._commit_cond.notify_all()
+
+    # Elections
+
+    def _election_timer(self):
+        while not self._stopped.is_set():
+            timeout = random.uniform(*self.election_timeout)
+            if self._stopped.wait(timeout / 4):
+                return
+            with self._lock:
+                idle = time.monotonic() - self._last_contact
+                if self.role == LEADER or idle < timeout:
+                    continue
+                self.term += 1
+                self.role = CANDIDATE
+                self.voted_for = self.node_id
+                self.leader_id = None
+                self._last_contact = time.monotonic()
+                self._save_meta()
+                request = {
+                    "type": "vote", "term": self.term, "candidate": self.node_id,
+                    "last_term": self.state_term, "last_t": self.server.current_t,
+                }
+            self._run_election(request)
+
+    def _run_election(self, request):
+        votes = [1]  # our own
+        done = threading.Condition()
+
+        def ask(peer_id):
+            client = _PeerClient(self.peers[peer_id], self.rpc_timeout)
+            reply = client.call(request)
+            client.close()
+            if self._stopped.is_set():
+                return
+            with done:
+                if reply and reply.get("granted"):
+                    votes[0] += 1
+                elif reply and reply.get("term", 0) > request["term"]:
+                    with self._lock:
+                        self._step_down_locked(reply["term"])
+                done.notify_all()
+
+        for peer_id in range(len(self.peers)):
+            if peer_id != self.node_id:
+                threading.Thread(target=ask, args=(peer_id,), daemon=True).start()
+        with done:
+            done.wait_for(lambda: votes[0] >= self.majority, self.rpc_timeout)
+            won = votes[0] >= self.majority
+        with self._lock:
+            if won and self.role == CANDIDATE and self.term == request["term"]:
+                self._become_leader_locked()
+
+    def _become_leader_locked(self):
+        print(f"Node {self.node_id}: leader for term {self.term} at T={self.server.current_t}")
+        self.role = LEADER
+        self.leader_id = self.node_id
+        self._match = {}
+        self._term_acked = set()
+        meta = self._record_term_ack_locked(None)  # a single-node cluster is its own majority
+        if meta:
+            self._write_meta(meta)
+        self._leader_stop = stop = threading.Event()
+        term = self.term
+        for peer_id in range(len(self.peers)):
+            if peer_id != self.node_id:
+                threading.Thread(target=self._replicate_to, args=(peer_id, term, stop), daemon=True,
+                                 name=f"replica-{self.node_id}-to-{peer_id}").start()
+        threading.Thread(target=self._tick_as_leader, args=(term, stop), daemon=True, name="ticker").start()
+        self._update_commit_locked()
+
+    # Leader duties
+
+    def _tick_as_leader(self, term, stop):
+        """tick_loop's fixed schedule, for as long as this node leads `term`."""
+        next_tick_time = self.clock.time() + self.server.tick_seconds
+        while not stop.is_set():
+            sleep_time = next_tick_time - self.clock.time()
+            if sleep_time > 0 and stop.wait(sleep_time):
+                return
+            next_tick_time += self.server.tick_seconds
+            with self._lock:
+                if stop.is_set() or self.term != term:
+                    return
+            try:
+                # Our own DB write may be batched: followers persist every state we ship
+                self.server.advance_private_state_to(self.server.current_t + 1, defer_save=True)
+            except Exception as e:
+                print(f"Ticker error: {e}")
+
+    def _replicate_to(self, peer_id, term, stop):
+        client = _PeerClient(self.peers[peer_id], self.rpc_timeout)
+        snap = None
+        try:
+            while not stop.is_set():
+                current = self.server.snapshot()
+                with self._lock:
+                    if self.term != term:
+                        return
+                    # Ship state only if the follower does not have it yet. After
+                    # a backlog (slow or restarted follower) this one message
+                    # replaces every tick it missed.
+                    ship = current is not snap
+                    message = {
+                        "type": "append", "term": term, "leader": self.node_id,
+                        "commit_t": self.commit_t,
+                        "state": _encode_state(self.server.export_state(current)) if ship else None,
+                    }
+                started = time.perf_counter()
+                reply = client.call(message)
+                elapsed = time.perf_counter() - started
+                if reply is None:
+                    stop.wait(self.heartbeat_interval)
+                    continue
+                with self._lock:
+                    if reply.get("term", 0) > self.term:
+                        self._step_down_locked(reply["term"])
+                        return
+                    meta = None
+                    if reply.get("ok") and self.term == term:
+                        self._match[peer_id] = reply["match_t"]
+                        if ship:
+                            snap = current
+                            self.last_round_seconds = elapsed
+                            METRICS.observe("replication_round_seconds", elapsed)
+                            meta = self._record_term_ack_locked(peer_id)
+                        self._update_commit_locked()
+                if meta:
+                    self._write_meta(meta)
+                # Next round as soon as the state changes, else a heartbeat
+                if not stop.is_set():
+                    self.server.wait_for_change(current, self.heartbeat_interval)
+        finally:
+            client.close()
+
+    def _record_term_ack_locked(self, peer_id):
+        """
+        Notes that peer_id holds a state we shipped in this term. Once a
+        majority does, our state counts as written in this term (Raft's no-op
+        entry) and the new state_term is returned as a meta snapshot to persist.
+        """
+        if peer_id is not None:
+            self._term_acked.add(peer_id)
+        if self.state_term == self.term or len(self._term_acked) + 1 < self.majority:
+            return None
+        self.state_term = self.term
+        return self._meta_snapshot_locked()
+
+    def _update_commit_locked(self):
+        # A leader commits nothing before its own term's state is on a majority
+        if self.role == LEADER and self.state_term != self.term:
+            return
+        # Highest t held by a majority (we hold our own current_t)
+        held = sorted([self.server.current_t] + list(self._match.values()), reverse=True)
+        if len(held) >= self.majority:
+            commit = held[self.majority - 1]
+            if commit > self.commit_t:
+                self.commit_t = commit
+                self._commit_cond.notify_all()
+
+    def wait_for_commit(self, t, timeout=None) -> bool:
+        """Blocks until a state at or past tick t is held by a majority."""
+        timeout = self.commit_timeout if timeout is None else timeout
+        with self._lock:
+            self._update_commit_locked()
+            return self._commit_cond.wait_for(lambda: self.role == LEADER and self.commit_t >= t, timeout)
+
+    # Client API (used by app.py in replicated mode)
+
+    def _require_leader(self):
+        if not self.is_leader:
+            raise ValueError(f"Not the leader (leader is node {self.leader_id})")
+
+    def _require_base_level(self, level):
+        # Commits are tracked by base tick, so a level burn (which leaves the
+        # base tick alone) could not be confirmed on a majority
+        if not is_base(level):
+            raise ValueError("Coarse levels are not supported in replicated mode")
+
+    def encrypt_for_alice(self, plaintext, t_start, t_end, request_nonce, level=None):
+        self._require_leader()
+        self._require_base_level(level)
+        return self.server.encrypt_for_alice(plaintext, t_start, t_end, request_nonce)
+
+    def encryption_key_for_alice(self, t_start, t_end, request_nonce, level=None):
+        self._require_leader()
+        self._require_base_level(level)
+        return self.server.encryption_key_for_alice(t_start, t_end, request_nonce)
+
+    def verify_checksum_and_release_private_key_piece(self, checksum, t_start, t_end, request_nonce, level=None):
+        """Releases only once the burn to t_end + 1 is on a majority of nodes."""
+        self._require_leader()
+        self._require_base_level(level)
+        keys = self.server.verify_checksum_and_release_private_key_piece(checksum, t_start, t_end, request_nonce)
+        if not self.wait_for_commit(t_end + 1):
+            raise ValueError("Release not committed: no majority of Timekeeper nodes reachable")
+        return keys
+
+    def verify_checksums_and_release_batch(self, items, t_end, request_nonce, level=None):
+        """The batch release, returned once its single burn is on a majority of nodes."""
+        self._require_leader()
+        self._require_base_level(level)
+        result = self.server.verify_checksums_and_release_batch(items, t_end, request_nonce)
+        if result["k_private"] is not None and not self.wait_for_commit(t_end + 1):
+            raise ValueError("Release not committed: no majority of Timekeeper nodes reachable")
+        return result
+
+
+def run_node(node_id, peers, db_dir=".", ready=None, stop=None, **options):
+    """Process entry point: one node with its own DB file in db_dir."""
+    server = Server(db_path=os.path.join(db_dir, REPLICA_DB_TEMPLATE.format(node_id=node_id)))
+    node = ReplicaNode(node_id, peers, server, **options).start()
+    if ready is not None:
+        ready.set()
+    try:
+        while not (stop and stop.is_set()):
+            time.sleep(0.1)
+    finally:
+        node.stop()
+
+
+def query_status(addr, timeout=0.5):
+    """Status of the node listening on addr, or None if it is down."""
+    client = _PeerClient(addr, timeout)
+    try:
+        return client.call({"type": "status"})
+    finally:
+        client.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run one replicated Timekeeper node")
+    parser.add_argument("--id", type=int, required=True, help="This node's index in --peers")
+    parser.add_argument("--peers", required=True, help="host:port of every node, comma separated")
+    parser.add_argument("--db-dir", default=".", help="Directory for this node's DB file")
+    args = parser.parse_args(argv)
+
+    if not os.environ.get('SERVER_MASTER_KEY'):
+        print("ERROR: SERVER_MASTER_KEY env var is required (the same on every node).")
+        return 1
+    run_node(args.id, parse_peers(args.peers), args.db_dir)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
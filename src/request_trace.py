@@ -0,0 +1,150 @@
+import os
+import struct
+import threading
+from collections import namedtuple
+
+from .levels import LEVELS, is_base
+
+# File header; records follow back to back. Version 2 added level and epochs.
+TRACE_MAGIC = b"TLTRACE2"
+_MAGIC_PREFIX = b"TLTRACE"
+
+# endpoint, status, payload_size, tick, t_start, t_end, tick_offset, elapsed,
+# level, epoch, current_epoch
+RECORD_FORMAT = ">BHIqqqddBqq"
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+
+# Sentinel for "no window" (e.g. /status), also stored for ticks outside the q field
+NO_TICK = -1
+# Sentinel for "no epoch named" (the request used the current one)
+NO_EPOCH = -1
+_INT64_MIN, _INT64_MAX = -2 ** 63, 2 ** 63 - 1
+# payload_size saturates at the I field's maximum (bodies of 4 GiB and more)
+MAX_PAYLOAD_SIZE = 2 ** 32 - 1
+
+# Keyed by route rule, so tenant names never reach the trace
+ENDPOINT_CODES = {
+    "/status": 1,
+    "/encrypt": 2,
+    "/verify": 3,
+    "/client-helper": 4,
+    "/checkpoints": 5,
+    "/verify/batch": 6,
+    "/encrypt/stream": 7,
+    "/tenants/<tenant>/status": 8,
+    "/tenants/<tenant>/encrypt": 9,
+    "/tenants/<tenant>/verify": 10,
+    "/tenants/<tenant>/verify/batch": 11,
+    "/": 12,
+    "/metrics": 13,
+    "/admin/profile": 14,
+    "/admin/allocations/snapshot": 15,
+    "/admin/allocations": 16,
+    "/admin/epochs/rollover": 17,
+    "/reset": 18,
+}
+ENDPOINT_NAMES = {code: path for path, code in ENDPOINT_CODES.items()}
+
+# 0 is the base chain; unknown level names (rejected requests) get OTHER_LEVEL
+LEVEL_CODES = {name: i + 1 for i, name in enumerate(LEVELS)}
+LEVEL_NAMES = {code: name for name, code in LEVEL_CODES.items()}
+OTHER_LEVEL = 255
+
+TraceRecord = namedtuple("TraceRecord", [
+    "endpoint",      # path, e.g. "/verify" ("other" if unknown)
+    "status",        # HTTP status returned
+    "payload_size",  # request body size in bytes
+    "tick",          # server tick at arrival
+    "t_start",       # requested window start (NO_TICK if none)
+    "t_end",         # requested window end (NO_TICK if none)
+    "tick_offset",   # seconds into the current tick at arrival
+    "elapsed",       # seconds since capture started
+    "level",         # coarse level of the window (None for base ticks, "other" if unknown)
+    "epoch",         # epoch the request named (NO_EPOCH if none)
+    "current_epoch", # current epoch at arrival
+])
+
+
+def _tick(value) -> int:
+    # t_start/t_end/epoch come straight from the request body; packing must not fail
+    return value if isinstance(value, int) and _INT64_MIN <= value <= _INT64_MAX else NO_TICK
+
+
+def _level_code(level) -> int:
+    if is_base(level):
+        return 0
+    return LEVEL_CODES.get(level, OTHER_LEVEL) if isinstance(level, str) else OTHER_LEVEL
+
+
+class TraceWriter:
+    """
+    Append-only binary request trace.
+
+    Records are fixed-size and redacted: only the endpoint, status, body
+    size, ticks, level, epochs and arrival timing are kept. No payloads,
+    checksums, nonces, keys, tenant names or client addresses are written.
+    """
+
+    def __init__(self, path, clock):
+        self.path = path
+        self.clock = clock
+        self.started = clock.time()
+        self._lock = threading.Lock()
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        if not new_file:
+            with open(path, "rb") as f:
+                if f.read(len(TRACE_MAGIC)) != TRACE_MAGIC:
+                    raise ValueError(f"{path} is not a request trace of this format version; capture to a new file")
+        self._file = open(path, "ab")
+        if new_file:
+            self._file.write(TRACE_MAGIC)
+            self._file.flush()
+
+    def record(self, endpoint, status, payload_size, tick, t_start, t_end, arrival, tick_started_at,
+               level=None, epoch=None, current_epoch=0):
+        """
+        Appends one record. endpoint is the route rule. Runs in after_request,
+        so it never raises: a record that cannot be packed is skipped.
+        """
+        try:
+            packed = struct.pack(
+                RECORD_FORMAT,
+                ENDPOINT_CODES.get(endpoint, 0),
+                status,
+                min(payload_size, MAX_PAYLOAD_SIZE),
+                _tick(tick),
+                _tick(t_start),
+                _tick(t_end),
+                max(0.0, arrival - tick_started_at),
+                arrival - self.started,
+                _level_code(level),
+                _tick(epoch),
+                _tick(current_epoch),
+            )
+        except (struct.error, TypeError):
+            return
+        with self._lock:
+            self._file.write(packed)
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def read_trace(path):
+    """Yields TraceRecords from a trace file."""
+    with open(path, "rb") as f:
+        magic = f.read(len(TRACE_MAGIC))
+        if magic != TRACE_MAGIC:
+            if magic.startswith(_MAGIC_PREFIX):
+                raise ValueError(f"{path} is a request trace of another format version")
+            raise ValueError(f"{path} is not a request trace")
+        while True:
+            chunk = f.read(RECORD_SIZE)
+            if len(chunk) < RECORD_SIZE:
+                return
+            code, status, size, tick, t_start, t_end, offset, elapsed, level, epoch, current_epoch = \
+                struct.unpack(RECORD_FORMAT, chunk)
+            yield TraceRecord(ENDPOINT_NAMES.get(code, "other"), status, size, tick, t_start, t_end, offset, elapsed,
+                              None if level == 0 else LEVEL_NAMES.get(level, "other"), epoch, current_epoch)
@@ -0,0 +1,172 @@
+import binascii
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from src.levels import base_ticks
+from src.alice import alice_compute_window_checksum, alice_derive_final_key, alice_decrypt
+from src.time_keeper import TimeKeeper
+
+BASE_URL = os.environ.get("BASE_URL", "http://localhost:5001")
+
+
+class ScheduledDecrypt:
+    """
+    Ahead-of-time decrypt for one encrypted payload.
+
+    The public chain checksum is computed in the background as soon as the
+    job is created, so once the window opens the only remaining work is a
+    single /verify round trip and a local AES-GCM decrypt.
+    """
+
+    def __init__(self, enc_data: dict, time_keeper: TimeKeeper, base_url=BASE_URL, executor=None, cache=None):
+        self.enc_data = enc_data
+        self.time_keeper = time_keeper
+        self.base_url = base_url
+        self.t_start = enc_data["t_start"]
+        self.t_end = enc_data["t_end"]
+        self.level = enc_data.get("level")  # coarse level windows are in that level's ticks
+        self.epoch = enc_data.get("epoch")  # chain epoch the window belongs to (src/epochs.py)
+
+        self._own_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(max_workers=1)
+        self._checksum = self._executor.submit(
+            alice_compute_window_checksum,
+            binascii.unhexlify(enc_data["public_seed"]),
+            binascii.unhexlify(enc_data["public_salt"]),
+            self.t_start,
+            self.t_end,
+            cache,
+            self.level,
+        )
+        if self._own_executor:
+            self._executor.shutdown(wait=False)
+
+    def ready(self) -> bool:
+        """True once the checksum has been precomputed."""
+        return self._checksum.done()
+
+    def checksum(self) -> bytes:
+        """Returns the precomputed checksum, waiting for it if necessary."""
+        return self._checksum.result()
+
+    def release(self) -> bytes:
+        """Sends /verify immediately and decrypts. Returns the plaintext."""
+        resp = requests.post(f"{self.base_url}/verify", json={
+            "checksum": binascii.hexlify(self.checksum()).decode(),
+            "t_start": self.t_start,
+            "t_end": self.t_end,
+            "request_nonce": os.urandom(8).hex(),
+            "level": self.level,
+            "epoch": self.epoch,
+        }, timeout=5)
+        if resp.status_code != 200:
+            raise ValueError(resp.json().get("error", resp.text))
+
+        keys = resp.json()
+        k_final = alice_derive_final_key(binascii.unhexlify(keys["k_public"]), binascii.unhexlify(keys["k_private"]))
+        return alice_decrypt(
+            binascii.unhexlify(self.enc_data["ciphertext"]),
+            k_final,
+            binascii.unhexlify(self.enc_data["nonce"]),
+        )
+
+    def _wait_for_window(self):
+        # A level tick opens with its first base tick
+        self.time_keeper.wait_for_tick(self.time_keeper.epoch_tick(self.epoch, base_ticks(self.level, self.t_end)[0]))
+
+    def run(self, resync=None) -> bytes:
+        """
+        Waits for the checksum and the middle of tick t_end, then releases.
+        A "Too early" (our clock model drifted) is not final: re-syncs with
+        `resync` (default: TimeKeeper.sync), waits again and retries once.
+        """
+        self.checksum()
+        self._wait_for_window()
+        try:
+            return self.release()
+        except ValueError as e:
+            if "Too early" not in str(e):
+                raise
+        (resync or self.time_keeper.sync)()
+        self._wait_for_window()
+        return self.release()
+
+
+class ScheduledDecryptor:
+    """
+    Runs many ScheduledDecrypt jobs. Each submitted file starts its chain
+    computation right away and fires its /verify at its own target tick.
+    """
+
+    def __init__(self, time_keeper: TimeKeeper, base_url=BASE_URL, workers=None, cache=None):
+        self.time_keeper = time_keeper
+        self.base_url = base_url
+        self.cache = cache
+        self.executor = ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1)
+        self.results = {}  # path -> plaintext bytes or Exception
+        self._threads = []
+        self._lock = threading.Lock()
+        # Re-syncs requested / covered by a finished sync; one sync at a time
+        # covers every request made before it started
+        self._sync_cond = threading.Condition()
+        self._sync_requested = self._sync_done = 0
+        self._syncing = False
+
+    def submit(self, enc_filepath: str, on_done=None) -> ScheduledDecrypt:
+        with open(enc_filepath, "r") as f:
+            enc_data = json.load(f)
+        job = ScheduledDecrypt(enc_data, self.time_keeper, self.base_url, self.executor, self.cache)
+
+        def fire():
+            try:
+                result = job.run(self.resync)
+            except Exception as e:
+                result = e
+            with self._lock:
+                self.results[enc_filepath] = result
+            # A release burns t_end, moving the server one tick ahead of
+            # its schedule; re-sync so later jobs aim at the right tick.
+            self.resync()
+            if on_done:
+                on_done(enc_filepath, result)
+
+        thread = threading.Thread(target=fire, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        return job
+
+    def resync(self):
+        """
+        Re-syncs the TimeKeeper, coalescing concurrent callers: returns once a
+        sync that started after this call has finished, but jobs that fire
+        together share one sync rather than running one each.
+        """
+        with self._sync_cond:
+            self._sync_requested += 1
+            ticket = self._sync_requested
+            while self._syncing and self._sync_done < ticket:
+                self._sync_cond.wait()
+            if self._sync_done >= ticket:
+                return
+            self._syncing = True
+            target = self._sync_requested
+        try:
+            self.time_keeper.sync()
+            with self._sync_cond:
+                self._sync_done = target
+        finally:
+            with self._sync_cond:
+                self._syncing = False
+                self._sync_cond.notify_all()
+
+    def join(self):
+        for thread in self._threads:
+            thread.join()
+
+    def shutdown(self):
+        self.join()
+        self.executor.shutdown()
@@ -0,0 +1,86 @@
+import heapq
+import itertools
+import threading
+
+# Priority classes, most urgent first. Within a class, earlier deadline first.
+RELEASE_DUE = 0   # /verify for the current tick: late means the key is gone
+NORMAL = 1        # /encrypt (by t_start slack) and verifies that are not due yet
+BACKGROUND = 2    # /status, /checkpoints
+
+# Outcomes of DeadlineScheduler.acquire() other than getting the slot
+QUEUE_FULL = "queue_full"
+QUEUE_TIMEOUT = "queue_timeout"
+_GRANTED = "granted"
+
+
+class _Ticket:
+    __slots__ = ("key", "event", "result")
+
+    def __init__(self, key):
+        self.key = key
+        self.event = threading.Event()
+        self.result = None
+
+    def __lt__(self, other):
+        return self.key < other.key
+
+
+class DeadlineScheduler:
+    """
+    A fixed number of work slots handed out by (priority class, deadline).
+
+    When a slot frees up it goes straight to the most urgent waiter, so a
+    due release never waits behind encrypts or status polls that arrived
+    earlier. When the queue is full, a more urgent arrival evicts the least
+    urgent waiter instead of being turned away.
+    """
+
+    def __init__(self, slots, max_queue):
+        self.slots = slots
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self._waiting = []  # heap of _Ticket
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    @property
+    def queued(self):
+        return len(self._waiting)
+
+    def acquire(self, rank, deadline, timeout):
+        """
+        Blocks until the caller holds a slot (returns None) or is shed
+        (returns QUEUE_FULL or QUEUE_TIMEOUT). Holders must call release().
+        """
+        with self._lock:
+            if self.in_flight < self.slots and not self._waiting:
+                self.in_flight += 1
+                return None
+            ticket = _Ticket((rank, deadline, next(self._seq)))
+            if len(self._waiting) >= self.max_queue:
+                worst = max(self._waiting, default=None)
+                if worst is None or ticket.key > worst.key:
+                    return QUEUE_FULL
+                self._waiting.remove(worst)
+                heapq.heapify(self._waiting)
+                worst.result = QUEUE_FULL
+                worst.event.set()
+            heapq.heappush(self._waiting, ticket)
+
+        ticket.event.wait(timeout)
+        with self._lock:
+            if ticket.result is None:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                ticket.result = QUEUE_TIMEOUT
+        return None if ticket.result == _GRANTED else ticket.result
+
+    def release(self):
+        with self._lock:
+            if self._waiting:
+                # Hand the slot over; in_flight is unchanged
+                ticket = heapq.heappop(self._waiting)
+                ticket.result = _GRANTED
+                ticket.event.set()
+            else:
+                self.in_flight -= 1
@@ -1,16 +1,92 @@
 import os
+import queue
 import struct
 import hmac
 import sqlite3
+import threading
+import weakref
+from collections import namedtuple
+from concurrent.futures import Future
 from .core import sha256, hkdf, derive_public_key_piece, encrypt_aes_gcm, decrypt_aes_gcm
+from .metrics import METRICS
+from .clock import REAL_CLOCK
+from .levels import LEVELS, LevelState, check_tick_seconds, is_base, level_factor, level_public_params
 
 DB_PATH = "server_state.db"
 
+# Immutable view of the server state. The writer thread publishes a new one
+# after every transition; readers grab self._snapshot once and use only that.
+# public_history is append-only and shared between snapshots of the same
+# chain, so indices below len() never change under a reader. levels maps
+# each coarse level (src/levels.py) to its LevelState.
+ServerSnapshot = namedtuple("ServerSnapshot", [
+    "public_seed", "public_salt", "server_secret", "private_state",
+    "current_t", "tick_started_at", "tick_seconds", "public_history", "levels",
+])
+
+
+def _run_writer(commands):
+    """
+    Writer loop. Holds only the queue, so a Server that is no longer
+    referenced can be collected; its finalizer enqueues None to stop us.
+    """
+    while True:
+        command = commands.get()
+        if command is None:
+            return
+        fn, args, future = command
+        try:
+            future.set_result(fn(*args))
+        except BaseException as e:
+            future.set_exception(e)
+        command = fn = args = future = None
+
+
 class Server:
     MAX_FUTURE_TICKS = 100
+    MAX_CHECKPOINTS_PER_PAGE = 1000
+    MAX_BATCH_ITEMS = 10000
+    # Shortest supported tick (100 ticks/s)
+    MIN_TICK_SECONDS = 0.01
+    # Scheduled ticks are written to the DB at most this often by default
+    # (every tick for ticks of 100 ms or longer); burns are always written
+    DEFAULT_PERSIST_INTERVAL = 0.1
 
-    def __init__(self, public_seed=None, public_salt=None, server_secret=None):
+    def __init__(self, public_seed=None, public_salt=None, server_secret=None, checkpoint_interval=None, clock=None, db_path=None,
+                 tick_seconds=None, persist_interval=None, epoch=0):
+        # Injectable clock (see src/clock.py) so tests can run ticks at CPU speed
+        self.clock = clock or REAL_CLOCK
+        # One chain per DB file; shards (src/shards.py) each get their own
+        self.db_path = db_path or DB_PATH
+        # Which chain epoch this is (src/epochs.py); 0 for a standalone server
+        self.epoch = epoch
         self._init_db()
+
+        # Publish (k, X_k, X_{k-1}) every checkpoint_interval ticks so clients
+        # do not re-evolve the public chain from X_0. 0/None disables it.
+        if checkpoint_interval is None:
+            checkpoint_interval = int(os.environ.get('CHECKPOINT_INTERVAL', '0'))
+        self.checkpoint_interval = checkpoint_interval
+
+        # Tick duration is part of the chain's persisted state. TICK_SECONDS
+        # (or tick_seconds=) sets it for a new chain, or changes it for an
+        # existing one; otherwise the persisted value is kept.
+        if tick_seconds is None and os.environ.get('TICK_SECONDS'):
+            tick_seconds = float(os.environ['TICK_SECONDS'])
+        if tick_seconds is not None and tick_seconds < self.MIN_TICK_SECONDS:
+            raise ValueError(f"tick_seconds must be at least {self.MIN_TICK_SECONDS}")
+
+        # Batch DB writes across fast ticks: a crash loses at most
+        # persist_interval seconds of scheduled ticks (the chain resumes from
+        # the last saved tick, as after any restart). 0 writes every tick.
+        if persist_interval is None and os.environ.get('PERSIST_INTERVAL'):
+            persist_interval = float(os.environ['PERSIST_INTERVAL'])
+        self.persist_interval = self.DEFAULT_PERSIST_INTERVAL if persist_interval is None else persist_interval
+        self._saved_at = None
+        self._unsaved = False
+        # Level states as of our last save; levels step once per minute at
+        # most, so most saves write only the base row
+        self._saved_levels = {}
         
         # Get Master Key for DB encryption
         self.master_key = os.environ.get('SERVER_MASTER_KEY')
@@ -26,68 +102,291 @@ class Server:
         self.master_key = sha256(self.master_key)
 
         state = self._load_state()
+        is_new = not state
         if state:
             print("Loading persisted server state...")
-            self.public_seed = state['public_seed']
-            self.public_salt = state['public_salt']
-            self.server_secret = state['server_secret']
-            self.private_state = state['private_state']
-            self.current_t = state['current_t']
         else:
             print("Initializing new server state...")
-            self.public_seed = public_seed or os.urandom(32)
-            self.public_salt = public_salt or os.urandom(32)
-            self.server_secret = server_secret or os.urandom(32)
-            self.private_state = os.urandom(32) # S_0
-            self.current_t = 0
-            self._save_state()
-        
+            state = {
+                'public_seed': public_seed or os.urandom(32),
+                'public_salt': public_salt or os.urandom(32),
+                'server_secret': server_secret or os.urandom(32),
+                'private_state': os.urandom(32), # S_0
+                'current_t': 0,
+                'tick_started_at': self.clock.time(),
+                'tick_seconds': tick_seconds or 1.0,
+                'levels': {},
+            }
+        missing = [name for name in LEVELS if name not in state['levels']]
+        if missing:
+            # New chain, or one persisted before coarse levels existed: start
+            # each level at the level tick the base clock is in
+            for name in missing:
+                state['levels'][name] = {
+                    'server_secret': os.urandom(32),
+                    'private_state': os.urandom(32),
+                    'current_t': state['current_t'] // LEVELS[name],
+                }
+            is_new = True
+        if tick_seconds is not None and tick_seconds != state['tick_seconds']:
+            print(f"Changing tick duration from {state['tick_seconds']}s to {tick_seconds}s")
+            state['tick_seconds'] = tick_seconds
+            is_new = True  # persist the change
         # Cache public history. Start with X_0.
-        self.public_history = [self.public_seed]
+        self._snapshot = self._build_snapshot(state, [state['public_seed']])
+        self._changed = threading.Condition()
+        if is_new:
+            self._save_state(self._snapshot)
         
         # Replay Protection: Nonce tracking
         # Ideally, use Redis or a DB table for persistence. For PoC, in-memory set with timestamps.
         self.seen_nonces = set()
         self.nonce_timestamps = {} # nonce -> timestamp
         self.NONCE_TTL = 300 # 5 minutes
+        self._nonce_lock = threading.Lock()
 
         # Re-evolve history if we loaded from DB
         if self.current_t > 0:
             self._ensure_public_history_up_to(self.current_t)
+        for name, level in self._snapshot.levels.items():
+            self._ensure_public_history_up_to(level.current_t, level=name)
+
+        # Single writer: every state transition (tick, burn, reload from DB)
+        # runs on this thread, in order. Readers never take a lock.
+        self._commands = queue.Queue()
+        self._closed = False
+        self._submit_lock = threading.Lock()
+        self._writer = threading.Thread(target=_run_writer, args=(self._commands,), daemon=True, name="server-writer")
+        self._writer.start()
+        self._stop_writer = weakref.finalize(self, self._commands.put, None)
+
+    # Read-only views of the current snapshot
+    public_seed = property(lambda self: self._snapshot.public_seed)
+    public_salt = property(lambda self: self._snapshot.public_salt)
+    server_secret = property(lambda self: self._snapshot.server_secret)
+    private_state = property(lambda self: self._snapshot.private_state)
+    current_t = property(lambda self: self._snapshot.current_t)
+    tick_started_at = property(lambda self: self._snapshot.tick_started_at)
+    tick_seconds = property(lambda self: self._snapshot.tick_seconds)
+    public_history = property(lambda self: self._snapshot.public_history)
+
+    def level(self, name) -> LevelState:
+        """The current state of coarse level `name` (or of the base chain for None / "tick")."""
+        return self._chain(self._snapshot, name)
+
+    @staticmethod
+    def _chain(snap, level):
+        if is_base(level):
+            return LevelState(snap.server_secret, snap.private_state, snap.current_t, snap.public_history)
+        level_factor(level)  # unknown levels raise ValueError
+        return snap.levels[level]
+
+    def _build_snapshot(self, state, history, previous=None):
+        """
+        A snapshot of `state` (as loaded or imported). Level histories are
+        taken over from `previous` when it is the same chain.
+        """
+        same_chain = previous is not None and \
+            (previous.public_seed, previous.public_salt) == (state['public_seed'], state['public_salt'])
+        levels = {}
+        for name, level in state['levels'].items():
+            if same_chain and name in previous.levels:
+                level_history = previous.levels[name].public_history
+            else:
+                level_history = [level_public_params(state['public_seed'], state['public_salt'], name)[0]]
+            levels[name] = LevelState(level['server_secret'], level['private_state'], level['current_t'], level_history)
+        return ServerSnapshot(public_history=history, **dict(state, levels=levels))
+
+    def snapshot(self) -> ServerSnapshot:
+        """The current immutable state. Consistent across all fields."""
+        return self._snapshot
+
+    def wait_for_change(self, snap, timeout=None) -> ServerSnapshot:
+        """Blocks until a snapshot other than `snap` is published (or timeout); returns the current one."""
+        with self._changed:
+            self._changed.wait_for(lambda: self._snapshot is not snap, timeout)
+            return self._snapshot
+
+    def _publish(self, snap):
+        """Writer: makes `snap` the state readers see."""
+        with self._changed:
+            self._snapshot = snap
+            self._changed.notify_all()
+
+    def export_state(self, snap=None) -> dict:
+        """
+        A snapshot (default the current one) for shipping to another node
+        (src/replication.py): secrets stay encrypted under the master key,
+        which all nodes share.
+        """
+        snap = snap or self._snapshot
+        return {
+            'public_seed': snap.public_seed,
+            'public_salt': snap.public_salt,
+            'server_secret': self._encrypt_blob(snap.server_secret),
+            'private_state': self._encrypt_blob(snap.private_state),
+            'current_t': snap.current_t,
+            'tick_started_at': snap.tick_started_at,
+            'tick_seconds': snap.tick_seconds,
+            'levels': {
+                name: {
+                    'server_secret': self._encrypt_blob(level.server_secret),
+                    'private_state': self._encrypt_blob(level.private_state),
+                    'current_t': level.current_t,
+                }
+                for name, level in snap.levels.items()
+            },
+        }
+
+    def import_state(self, exported: dict):
+        """
+        Installs and persists state from export_state(), even if it is behind
+        ours: a replica follows its leader, including rolling back ticks that
+        never reached a majority.
+        """
+        state = dict(exported,
+                     server_secret=self._decrypt_blob(exported['server_secret']),
+                     private_state=self._decrypt_blob(exported['private_state']),
+                     levels={name: dict(level,
+                                        server_secret=self._decrypt_blob(level['server_secret']),
+                                        private_state=self._decrypt_blob(level['private_state']))
+                             for name, level in exported['levels'].items()})
+        self._submit(self._adopt_state, state, True)
+
+    def flush(self):
+        """Writes scheduled ticks that are still waiting for a batched save."""
+        self._submit(self._flush)
+
+    def _flush(self):
+        if self._unsaved:
+            self._save_state(self._snapshot)
+
+    def close(self, save=True):
+        """
+        Stops the writer thread after the commands already queued (this also
+        happens when the Server is collected), saving any batched ticks
+        unless save=False (its DB file was deleted). Later state changes raise.
+        """
+        try:
+            if save:
+                self.flush()
+        except RuntimeError:
+            pass  # already closed
+        with self._submit_lock:
+            self._closed = True
+            self._stop_writer()
+        self._writer.join()
+
+    def _submit(self, fn, *args):
+        """Runs fn(*args) on the writer thread and returns its result (or raises)."""
+        if threading.current_thread() is self._writer:
+            return fn(*args)
+        future = Future()
+        with self._submit_lock:
+            if self._closed:
+                raise RuntimeError("Server is closed")
+            self._commands.put((fn, args, future))
+        return future.result()
 
     def refresh_state(self):
-        """Reloads the current state from the database."""
+        """Reloads the current state from the database (not after close(): its file may be gone)."""
+        if self._closed:
+            return
         state = self._load_state()
-        if state:
-            # Check if seed or salt changed (e.g. if Ticker reset the DB or won a race)
-            if state['public_seed'] != self.public_seed or state['public_salt'] != self.public_salt:
-                print("DEBUG: Public seed/salt changed in DB. Resetting local history.")
-                self.public_seed = state['public_seed']
-                self.public_salt = state['public_salt']
-                self.public_history = [self.public_seed] # Reset history
-
-            self.server_secret = state['server_secret']
-            self.private_state = state['private_state']
-            self.current_t = state['current_t']
-            # Also ensure history is up to date with the new time
-            self._ensure_public_history_up_to(self.current_t)
+        if not state:
+            return
+        snap = self._snapshot
+        if (state['public_seed'], state['public_salt']) != (snap.public_seed, snap.public_salt) \
+                or state['current_t'] > snap.current_t or state['tick_seconds'] != snap.tick_seconds \
+                or self._levels_ahead(state, snap):
+            self._submit(self._adopt_state, state)
+
+    @staticmethod
+    def _levels_ahead(state, snap):
+        """Persisted levels that are ahead of ours (burned by another process)."""
+        return {name: level for name, level in state['levels'].items()
+                if name in snap.levels and level['current_t'] > snap.levels[name].current_t}
+
+    def _adopt_state(self, state, force=False):
+        """Writer: takes over state persisted by another process (or shipped by a leader, force=True)."""
+        snap = self._snapshot
+        history = snap.public_history
+        # Check if seed or salt changed (e.g. if Ticker reset the DB or won a race)
+        if state['public_seed'] != snap.public_seed or state['public_salt'] != snap.public_salt:
+            print("DEBUG: Public seed/salt changed in DB. Resetting local history.")
+            history = [state['public_seed']] # Reset history
+        elif state['current_t'] <= snap.current_t and not force:
+            # Read before one of our own writes landed; we are already ahead.
+            # Only a changed tick duration or a level burned elsewhere is taken over.
+            ahead = self._levels_ahead(state, snap)
+            if ahead or state['tick_seconds'] != snap.tick_seconds:
+                levels = dict(snap.levels)
+                for name, level in ahead.items():
+                    levels[name] = LevelState(level['server_secret'], level['private_state'], level['current_t'],
+                                              snap.levels[name].public_history)
+                    self._ensure_public_history_up_to(level['current_t'], level=name, snap=snap)
+                self._publish(snap._replace(tick_seconds=state['tick_seconds'], levels=levels))
+            return
+        snap = self._build_snapshot(state, history, snap)
+        # Also ensure history is up to date with the new time, before publishing
+        self._ensure_public_history_up_to(snap.current_t, snap)
+        for name, level in snap.levels.items():
+            self._ensure_public_history_up_to(level.current_t, snap, level=name)
+        if force:
+            self._save_state(snap)
+        self._publish(snap)
+
+    def warm_public_history(self):
+        """
+        Extends the base and level public histories over the whole encrypt
+        horizon now, so the first requests do not (a prepared epoch, src/epochs.py).
+        """
+        snap = self._snapshot
+        self._submit(self._ensure_public_history_up_to, snap.current_t + self.MAX_FUTURE_TICKS)
+        for name, level in snap.levels.items():
+            self._submit(self._ensure_public_history_up_to, level.current_t + self.MAX_FUTURE_TICKS, None, name)
+
+    def start_tick_at(self, tick_started_at):
+        """Re-anchors the current tick, e.g. to another chain's tick (an epoch taking over the ticker)."""
+        self._submit(self._start_tick_at, tick_started_at)
+
+    def _start_tick_at(self, tick_started_at):
+        snap = self._snapshot._replace(tick_started_at=tick_started_at)
+        self._save_state(snap)
+        self._publish(snap)
+
+    def _snapshot_with_history(self, t, level=None):
+        """
+        A snapshot whose public_history (of `level`, default the base chain)
+        covers X_t, if t is within the MAX_FUTURE_TICKS horizon. Only the
+        writer extends history, so a reader asks it to when the shared list
+        is too short. Requests for levels are refused unless ticks are 1 s.
+        """
+        snap = self._snapshot
+        chain = self._chain(snap, level)
+        if not is_base(level):
+            check_tick_seconds(snap.tick_seconds)
+        if len(chain.public_history) <= t <= chain.current_t + self.MAX_FUTURE_TICKS:
+            self._submit(self._ensure_public_history_up_to, t, None, level)
+            snap = self._snapshot
+        return snap
             
     def _check_nonce(self, nonce: str):
         """Checks if nonce has been seen. Raises ValueError if replay detected."""
-        import time
-        now = time.time()
+        now = self.clock.time()
         
-        # Cleanup old nonces
-        to_remove = [n for n, ts in self.nonce_timestamps.items() if now - ts > self.NONCE_TTL]
-        for n in to_remove:
-            del self.nonce_timestamps[n]
-            self.seen_nonces.remove(n)
+        with self._nonce_lock:
+            # Cleanup old nonces
+            to_remove = [n for n, ts in self.nonce_timestamps.items() if now - ts > self.NONCE_TTL]
+            for n in to_remove:
+                del self.nonce_timestamps[n]
+                self.seen_nonces.remove(n)
             
-        if nonce in self.seen_nonces:
-            raise ValueError(f"Replay detected! Nonce {nonce} already used.")
+            if nonce in self.seen_nonces:
+                raise ValueError(f"Replay detected! Nonce {nonce} already used.")
             
-        self.seen_nonces.add(nonce)
-        self.nonce_timestamps[nonce] = now
+            self.seen_nonces.add(nonce)
+            self.nonce_timestamps[nonce] = now
 
     def _encrypt_blob(self, data: bytes) -> bytes:
         """Encrypts a blob using the master key."""
@@ -101,7 +400,7 @@ class Server:
         return decrypt_aes_gcm(self.master_key, nonce, ciphertext)
 
     def _init_db(self):
-        with sqlite3.connect(DB_PATH) as conn:
+        with sqlite3.connect(self.db_path) as conn:
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS server_state (
                     id INTEGER PRIMARY KEY CHECK (id = 1),
@@ -109,48 +408,99 @@ class Server:
                     public_salt BLOB NOT NULL,
                     server_secret BLOB NOT NULL,
                     private_state BLOB NOT NULL,
+                    current_t INTEGER NOT NULL,
+                    tick_started_at REAL,
+                    tick_seconds REAL
+                )
+            """)
+            # One row per coarse level (src/levels.py); secrets encrypted like server_state's
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS level_state (
+                    level TEXT PRIMARY KEY,
+                    server_secret BLOB NOT NULL,
+                    private_state BLOB NOT NULL,
                     current_t INTEGER NOT NULL
                 )
             """)
+            # Migrate databases created before these columns existed
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(server_state)")}
+            if 'tick_started_at' not in columns:
+                conn.execute("ALTER TABLE server_state ADD COLUMN tick_started_at REAL")
+            if 'tick_seconds' not in columns:
+                conn.execute("ALTER TABLE server_state ADD COLUMN tick_seconds REAL")
 
     def _load_state(self):
-        with sqlite3.connect(DB_PATH) as conn:
-            cursor = conn.execute("SELECT public_seed, public_salt, server_secret, private_state, current_t FROM server_state WHERE id = 1")
+        with METRICS.stage("db_read"), sqlite3.connect(self.db_path) as conn:
+            cursor = conn.execute("SELECT public_seed, public_salt, server_secret, private_state, current_t, tick_started_at, tick_seconds FROM server_state WHERE id = 1")
             row = cursor.fetchone()
-            if row:
-                try:
+            level_rows = conn.execute("SELECT level, server_secret, private_state, current_t FROM level_state").fetchall()
+        if row:
+            try:
+                with METRICS.stage("state_decrypt"):
                     return {
                         'public_seed': row[0],
                         'public_salt': row[1],
                         'server_secret': self._decrypt_blob(row[2]),
                         'private_state': self._decrypt_blob(row[3]),
-                        'current_t': row[4]
+                        'current_t': row[4],
+                        # Wall-clock time at which current_t began (server clock)
+                        'tick_started_at': row[5] if row[5] is not None else self.clock.time(),
+                        # Chains created before ticks were configurable tick once a second
+                        'tick_seconds': row[6] or 1.0,
+                        'levels': {
+                            name: {
+                                'server_secret': self._decrypt_blob(secret),
+                                'private_state': self._decrypt_blob(private),
+                                'current_t': level_t,
+                            }
+                            for name, secret, private, level_t in level_rows
+                        },
                     }
-                except Exception as e:
-                    print(f"CRITICAL: Failed to decrypt server state. Master key mismatch? Error: {e}")
-                    return None
-            return None
+            except Exception as e:
+                print(f"CRITICAL: Failed to decrypt server state. Master key mismatch? Error: {e}")
+                return None
+        return None
 
-    def _save_state(self):
-        with sqlite3.connect(DB_PATH) as conn:
+    def _save_state(self, snap):
+        with METRICS.stage("db_write"), sqlite3.connect(self.db_path) as conn:
             # Encrypt sensitive fields
-            enc_secret = self._encrypt_blob(self.server_secret)
-            enc_private = self._encrypt_blob(self.private_state)
+            enc_secret = self._encrypt_blob(snap.server_secret)
+            enc_private = self._encrypt_blob(snap.private_state)
             
             conn.execute("""
-                INSERT OR REPLACE INTO server_state (id, public_seed, public_salt, server_secret, private_state, current_t)
-                VALUES (1, ?, ?, ?, ?, ?)
-            """, (self.public_seed, self.public_salt, enc_secret, enc_private, self.current_t))
-
-    def _ensure_public_history_up_to(self, t):
-        """Ensures public_history contains X_0 ... X_t."""
-        current_len = len(self.public_history)
-        if t < current_len:
+                INSERT OR REPLACE INTO server_state (id, public_seed, public_salt, server_secret, private_state, current_t, tick_started_at, tick_seconds)
+                VALUES (1, ?, ?, ?, ?, ?, ?, ?)
+            """, (snap.public_seed, snap.public_salt, enc_secret, enc_private, snap.current_t, snap.tick_started_at, snap.tick_seconds))
+            changed = [(name, level) for name, level in snap.levels.items() if self._saved_levels.get(name) is not level]
+            if changed:
+                conn.executemany("""
+                    INSERT OR REPLACE INTO level_state (level, server_secret, private_state, current_t)
+                    VALUES (?, ?, ?, ?)
+                """, [(name, self._encrypt_blob(level.server_secret), self._encrypt_blob(level.private_state), level.current_t)
+                      for name, level in changed])
+        self._saved_levels = snap.levels
+        self._saved_at = self.clock.time()
+        self._unsaved = False
+
+    def _ensure_public_history_up_to(self, t, snap=None, level=None):
+        """
+        Ensures public_history (of `level`, default the base chain) contains
+        X_0 ... X_t (of `snap`, default the current snapshot). Writer thread only.
+        """
+        snap = snap or self._snapshot
+        history = self._chain(snap, level).public_history
+        if t < len(history):
             return
+        _, salt = level_public_params(snap.public_seed, snap.public_salt, level)
+        with METRICS.stage("history_extend"):
+            self._extend_public_history(t, history, salt)
+
+    def _extend_public_history(self, t, history, public_salt):
+        current_len = len(history)
         
         # Continue evolving from the last known state
-        x_prev = self.public_history[-2] if current_len >= 2 else bytes(32)
-        x_curr = self.public_history[-1]
+        x_prev = history[-2] if current_len >= 2 else bytes(32)
+        x_curr = history[-1]
         
         # We need to compute X_k for k from current_len to t (inclusive indices in history)
         # The loop in evolve_public_chain computes X_{t+1} given X_t.
@@ -161,12 +511,31 @@ class Server:
             # k is the step index.
             # We are computing X_{k+1}.
             t_bytes = struct.pack(">Q", k)
-            data = x_curr + x_prev + self.public_salt + t_bytes
+            data = x_curr + x_prev + public_salt + t_bytes
             x_next = sha256(data)
-            self.public_history.append(x_next)
+            history.append(x_next)
             x_prev = x_curr
             x_curr = x_next
 
+    def get_checkpoints(self, since=0, limit=None):
+        """
+        Returns published public chain checkpoints [(k, X_k, X_{k-1}), ...]
+        for k a multiple of checkpoint_interval with since <= k <= current_t.
+        """
+        if not self.checkpoint_interval:
+            raise ValueError("Checkpoints are disabled on this server.")
+        limit = min(limit or self.MAX_CHECKPOINTS_PER_PAGE, self.MAX_CHECKPOINTS_PER_PAGE)
+
+        snap = self._snapshot
+        interval = self.checkpoint_interval
+        first = max(interval, -(-since // interval) * interval)
+        checkpoints = []
+        for k in range(first, snap.current_t + 1, interval):
+            if len(checkpoints) >= limit:
+                break
+            checkpoints.append((k, snap.public_history[k], snap.public_history[k - 1]))
+        return checkpoints
+
     def _ratchet_secret(self, current_secret):
         """
         Ratchets the server secret forward using HKDF.
@@ -174,75 +543,130 @@ class Server:
         """
         return hkdf(current_secret, 32, salt=b"ratchet", info=b"server_secret_ratchet")
 
-    def advance_private_state_to(self, target_t):
+    def advance_private_state_to(self, target_t, scheduled_tick=True, defer_save=False):
         """
         Advances the private state S to S_{target_t}.
         S_{t+1} = H( S_t || X_t || server_secret || t )
         Also ratchets the server_secret: Secret_{t+1} = Ratchet(Secret_t)
+
+        scheduled_tick=False marks an out-of-band advance (the one-shot burn)
+        that does not move the ticker's schedule, so tick_started_at is kept.
+
+        defer_save=True (tickers) lets the DB write wait until persist_interval
+        has passed since the last one; flush() or close() writes it.
         """
+        self._submit(self._advance, target_t, scheduled_tick, defer_save)
+
+    def _advance(self, target_t, scheduled_tick, defer_save=False):
+        """Writer: advance_private_state_to, then persist and publish."""
         self._ensure_public_history_up_to(target_t)
+        snap = self._snapshot
+        current_t = snap.current_t
+        tick_started_at = snap.tick_started_at
+
+        if scheduled_tick and current_t < target_t:
+            # Clients use this to estimate where the server is inside its tick
+            tick_started_at = self.clock.time()
+
+        if current_t < target_t:
+            METRICS.inc("ticks_advanced_total", target_t - current_t)
         
-        while self.current_t < target_t:
-            # We are at S_{current_t}. We want S_{current_t + 1}.
-            # Formula uses S_t, X_t, server_secret, t.
-            # So to get S_{t+1}, we use t = current_t.
+        with METRICS.stage("private_advance"):
+            private_state, server_secret = self._evolve_private(
+                snap.private_state, snap.server_secret, snap.public_history, current_t, target_t)
+            current_t = max(current_t, target_t)
+
+            # Coarse levels step when the base clock enters their next tick
+            # (they may already be there after a burn)
+            levels = dict(snap.levels)
+            for name, level in snap.levels.items():
+                levels[name] = self._advance_level(snap, name, level, current_t // LEVELS[name])
             
-            t = self.current_t
-            x_t = self.public_history[t]
+        snap = snap._replace(private_state=private_state, server_secret=server_secret,
+                             current_t=current_t, tick_started_at=tick_started_at, levels=levels)
+        # Persist the new state, then publish it to readers. Ticker ticks may
+        # be batched (see persist_interval); a burn is always written before
+        # the released key leaves the writer.
+        if not defer_save or self._saved_at is None \
+                or self.clock.time() - self._saved_at >= self.persist_interval:
+            self._save_state(snap)
+        else:
+            self._unsaved = True
+        self._publish(snap)
+
+    def _advance_level(self, snap, name, level, target_t):
+        """Writer: `level` advanced to target_t (unchanged if it is already there)."""
+        if level.current_t >= target_t:
+            return level
+        self._ensure_public_history_up_to(target_t, snap, level=name)
+        private_state, server_secret = self._evolve_private(
+            level.private_state, level.server_secret, level.public_history, level.current_t, target_t)
+        return level._replace(private_state=private_state, server_secret=server_secret, current_t=target_t)
+
+    def _evolve_private(self, private_state, server_secret, history, t, target_t):
+        """(S_target_t, Secret_target_t) from S_t and Secret_t, along public chain `history`."""
+        while t < target_t:
+            # We are at S_t. We want S_{t+1}.
+            # Formula uses S_t, X_t, server_secret, t.
+            x_t = history[t]
             t_bytes = struct.pack(">Q", t)
-            
+
             # Domain Separation: EVOLVE context
-            msg = b"EVOLVE" + x_t + self.server_secret + t_bytes
-            self.private_state = hmac.new(self.private_state, msg, "sha256").digest()
-            
+            msg = b"EVOLVE" + x_t + server_secret + t_bytes
+            private_state = hmac.new(private_state, msg, "sha256").digest()
+
             # RATCHET THE SERVER SECRET
-            self.server_secret = self._ratchet_secret(self.server_secret)
-            
-            self.current_t += 1
-            
-        # Persist the new state
-        self._save_state()
+            server_secret = self._ratchet_secret(server_secret)
 
-    def encrypt_for_alice(self, plaintext: bytes, t_start: int, t_end: int, request_nonce: str):
+            t += 1
+        return private_state, server_secret
+
+    def encrypt_for_alice(self, plaintext: bytes, t_start: int, t_end: int, request_nonce: str, level=None):
         """
         Encrypts a message for a specific time window.
         Does NOT advance the persistent private state.
         Requires a unique request_nonce to prevent replay.
+
+        level (see src/levels.py) picks a coarse chain; t_start and t_end are
+        then in that level's ticks. None / "tick" is the base chain.
+        """
+        result = self.encryption_key_for_alice(t_start, t_end, request_nonce, level)
+        k_final = result.pop("k_final")
+
+        # 5. Encrypt (AES-GCM)
+        with METRICS.stage("aes_gcm"):
+            result["nonce"], result["ciphertext"] = encrypt_aes_gcm(k_final, plaintext)
+        return result
+
+    def encryption_key_for_alice(self, t_start: int, t_end: int, request_nonce: str, level=None):
+        """
+        K_final for a time window, with the metadata Alice needs to unlock it
+        (t_start, t_end, public_seed, public_salt, request_nonce, level), for
+        callers that encrypt themselves (the streaming endpoint, src/stream_aead.py).
+        Same checks as encrypt_for_alice.
         """
         self._check_nonce(request_nonce)
+
+        # 1. Ensure public history (and fix the state we work from)
+        snap = self._snapshot_with_history(t_end, level)
+        chain = self._chain(snap, level)
         
-        if self.current_t > t_end:
-            raise ValueError(f"Server already passed t_end (current: {self.current_t}, target: {t_end}). Cannot encrypt.")
+        if chain.current_t > t_end:
+            raise ValueError(f"Server already passed t_end (current: {chain.current_t}, target: {t_end}). Cannot encrypt.")
 
-        if t_end > self.current_t + self.MAX_FUTURE_TICKS:
+        if t_end > chain.current_t + self.MAX_FUTURE_TICKS:
             raise ValueError(f"Time window too far in the future. Max allowed is +{self.MAX_FUTURE_TICKS} ticks.")
-
-        # 1. Ensure public history
-        self._ensure_public_history_up_to(t_end)
         
         # 2. Compute K_public
-        k_public = derive_public_key_piece(self.public_history, t_start, t_end)
+        k_public = derive_public_key_piece(chain.public_history, t_start, t_end)
         
         # 3. Compute K_private (future)
         # We need S_{t_end}.
         # We don't want to advance self.private_state yet.
         # So we simulate it.
-        
-        temp_state = self.private_state
-        temp_secret = self.server_secret
-        temp_t = self.current_t
-        
-        # Simulate advance
-        while temp_t < t_end:
-            x_t = self.public_history[temp_t]
-            t_bytes = struct.pack(">Q", temp_t)
-            msg = b"EVOLVE" + x_t + temp_secret + t_bytes
-            temp_state = hmac.new(temp_state, msg, "sha256").digest()
-            
-            # Simulate Ratchet
-            temp_secret = self._ratchet_secret(temp_secret)
-            
-            temp_t += 1
+        with METRICS.stage("private_chain_simulate"):
+            temp_state, _ = self._evolve_private(
+                chain.private_state, chain.server_secret, chain.public_history, chain.current_t, t_end)
             
         # Now temp_state is S_{t_end}.
         # Domain Separation: RELEASE context
@@ -250,60 +674,145 @@ class Server:
         
         # 4. Derive K_final
         # K_final = HKDF(K_public || K_private, length=32) for AES-GCM
-        k_final = hkdf(k_public + k_private, 32, salt=b"encryption", info=b"aes_gcm_key")
-        
-        # 5. Encrypt (AES-GCM)
-        nonce, ciphertext = encrypt_aes_gcm(k_final, plaintext)
+        with METRICS.stage("hkdf"):
+            k_final = hkdf(k_public + k_private, 32, salt=b"encryption", info=b"aes_gcm_key")
         
-        return {
-            "ciphertext": ciphertext,
-            "nonce": nonce,
+        result = {
+            "k_final": k_final,
             "t_start": t_start,
             "t_end": t_end,
-            "public_seed": self.public_seed,
-            "public_salt": self.public_salt,
+            "public_seed": snap.public_seed,
+            "public_salt": snap.public_salt,
             "request_nonce": request_nonce # Echo back the nonce
         }
+        if not is_base(level):
+            result["level"] = level
+        return result
 
-    def verify_checksum_and_release_private_key_piece(self, checksum: bytes, t_start: int, t_end: int, request_nonce: str):
+    def verify_checksum_and_release_private_key_piece(self, checksum: bytes, t_start: int, t_end: int, request_nonce: str, level=None):
         """
         Verifies Alice's work and releases the private key piece.
         Advances the private state to t_end, making previous keys inaccessible.
         Requires a unique request_nonce to prevent replay.
+        level: as for encrypt_for_alice.
         """
         self._check_nonce(request_nonce)
 
-        if t_end > self.current_t + self.MAX_FUTURE_TICKS:
+        snap = self._snapshot_with_history(t_end, level)
+        chain = self._chain(snap, level)
+        if t_end > chain.current_t + self.MAX_FUTURE_TICKS:
             raise ValueError(f"Time window too far in the future. Max allowed is +{self.MAX_FUTURE_TICKS} ticks.")
 
-        self._ensure_public_history_up_to(t_end)
-        expected_k_public = derive_public_key_piece(self.public_history, t_start, t_end)
+        # The checksum is checked on the reader thread; only the release is serialized
+        expected_k_public = derive_public_key_piece(chain.public_history, t_start, t_end)
         
         if not hmac.compare_digest(checksum, expected_k_public):
             raise ValueError("Invalid checksum")
 
+        if is_base(level):
+            k_private = self._submit(self._release, t_end, snap.public_seed)
+        else:
+            k_private = self._submit(self._release_level, level, t_end, snap.public_seed)
+        
+        return {
+            "k_public": expected_k_public,
+            "k_private": k_private,
+            "request_nonce": request_nonce # Echo back
+        }
+
+    def verify_checksums_and_release_batch(self, items, t_end: int, request_nonce: str, level=None):
+        """
+        verify_checksum_and_release_private_key_piece for many windows that
+        all close at t_end. items is [(t_start, checksum), ...].
+
+        Every checksum is checked against the same snapshot (windows with the
+        same t_start share one K_public). If at least one is valid, K_private
+        is computed once and the tick is burned once. A window or timing error
+        (Too early, Window expired) fails the whole batch. Returns
+        {"k_private": bytes or None, "results": [{"k_public": ...} or {"error": ...}, ...]}.
+        """
+        if len(items) > self.MAX_BATCH_ITEMS:
+            raise ValueError(f"Batch too large. Max allowed is {self.MAX_BATCH_ITEMS} items.")
+        self._check_nonce(request_nonce)
+
+        snap = self._snapshot_with_history(t_end, level)
+        chain = self._chain(snap, level)
+        if t_end > chain.current_t + self.MAX_FUTURE_TICKS:
+            raise ValueError(f"Time window too far in the future. Max allowed is +{self.MAX_FUTURE_TICKS} ticks.")
+
+        expected = {}
+        results = []
+        for t_start, checksum in items:
+            try:
+                if t_start not in expected:
+                    expected[t_start] = derive_public_key_piece(chain.public_history, t_start, t_end)
+                if not hmac.compare_digest(checksum, expected[t_start]):
+                    raise ValueError("Invalid checksum")
+                results.append({"k_public": expected[t_start]})
+            except (ValueError, TypeError) as e:
+                results.append({"error": str(e)})
+
+        k_private = None
+        if any("k_public" in r for r in results):
+            if is_base(level):
+                k_private = self._submit(self._release, t_end, snap.public_seed)
+            else:
+                k_private = self._submit(self._release_level, level, t_end, snap.public_seed)
+        return {"k_private": k_private, "results": results, "request_nonce": request_nonce}
+
+    def _release(self, t_end, public_seed):
+        """
+        Writer: the window check, release and burn happen atomically, so two
+        concurrent verifies for the same tick cannot both get the key.
+        """
+        snap = self._snapshot
+        if public_seed != snap.public_seed:
+            # Server was reset since the checksum was checked
+            raise ValueError("Invalid checksum")
+
         # 1.5 Check if window is already passed
-        # We allow t_end == self.current_t (the "Now"), but reject if current_t > t_end (the "Past").
-        if t_end < self.current_t:
-            raise ValueError(f"Window expired! Server is at t={self.current_t}, but you requested keys for t={t_end}. The keys are gone.")
+        # We allow t_end == current_t (the "Now"), but reject if current_t > t_end (the "Past").
+        if t_end < snap.current_t:
+            raise ValueError(f"Window expired! Server is at t={snap.current_t}, but you requested keys for t={t_end}. The keys are gone.")
             
-        if t_end > self.current_t:
-            raise ValueError(f"Too early! Server is at t={self.current_t}, but you requested keys for t={t_end}. Please wait.")
+        if t_end > snap.current_t:
+            raise ValueError(f"Too early! Server is at t={snap.current_t}, but you requested keys for t={t_end}. Please wait.")
 
-        # 2. Advance private state to t_end
-        self.advance_private_state_to(t_end)
+        # 2. Advance private state to t_end (a no-op after the checks above)
         
         # 3. Capture the key for t_end
         # Domain Separation: RELEASE context
-        k_private = hmac.new(self.private_state, b"RELEASE", "sha256").digest()
+        k_private = hmac.new(snap.private_state, b"RELEASE", "sha256").digest()
         
         # 4. THE BURN: Advance to t_end + 1
         # This enforces "One-Shot". Once we give you the key for t_end, 
         # we immediately move to t_end + 1 so nobody else can get it.
-        self.advance_private_state_to(t_end + 1)
-        
-        return {
-            "k_public": expected_k_public,
-            "k_private": k_private,
-            "request_nonce": request_nonce # Echo back
-        }
+        self._advance(t_end + 1, scheduled_tick=False)
+        return k_private
+
+    def _release_level(self, name, t_end, public_seed):
+        """
+        Writer: _release for a coarse level. The level's key for t_end is
+        released only while the base clock is inside level tick t_end, and
+        the burn moves just that level to t_end + 1. The level tick after it
+        still opens on the base clock's schedule.
+        """
+        snap = self._snapshot
+        if public_seed != snap.public_seed:
+            raise ValueError("Invalid checksum")
+        level = snap.levels[name]
+        clock_t = snap.current_t // LEVELS[name]
+
+        if t_end < level.current_t:
+            raise ValueError(f"Window expired! Server is at {name} t={level.current_t}, but you requested keys for {name} t={t_end}. The keys are gone.")
+        if t_end > clock_t:
+            raise ValueError(f"Too early! Server is at {name} t={clock_t}, but you requested keys for {name} t={t_end}. Please wait.")
+
+        k_private = hmac.new(level.private_state, b"RELEASE", "sha256").digest()
+
+        # The burn, persisted before the key leaves the writer
+        levels = dict(snap.levels, **{name: self._advance_level(snap, name, level, t_end + 1)})
+        snap = snap._replace(levels=levels)
+        self._save_state(snap)
+        self._publish(snap)
+        return k_private
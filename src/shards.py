@@ -0,0 +1,199 @@
+import hashlib
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.server import Server
+from src.ticker import tick_loop
+
+# Per-shard persistence, relative to the pool's db_dir
+SHARD_DB_TEMPLATE = "server_state.shard{index}.db"
+
+
+def shard_for(key: str, shards: int) -> int:
+    """
+    Rendezvous (highest random weight) hashing of a tenant key onto a shard.
+    Stable across processes and restarts; changing the shard count only
+    moves the tenants whose winning shard was added or removed.
+    """
+    best, best_score = 0, b""
+    for index in range(shards):
+        score = hashlib.sha256(f"{index}:{key}".encode()).digest()
+        if score > best_score:
+            best, best_score = index, score
+    return best
+
+
+def _status(server):
+    return {
+        "current_t": server.current_t,
+        "public_history_len": len(server.public_history),
+        "server_time": server.clock.time(),
+        "tick_started_at": server.tick_started_at,
+        "tick_seconds": server.tick_seconds,
+    }
+
+
+# What a shard process will run on behalf of the front end
+SHARD_METHODS = {
+    "status": _status,
+    "encrypt_for_alice": Server.encrypt_for_alice,
+    "verify_checksum_and_release_private_key_piece": Server.verify_checksum_and_release_private_key_piece,
+    "verify_checksums_and_release_batch": Server.verify_checksums_and_release_batch,
+}
+
+
+def _serve_connection(server, conn):
+    """Answers calls on one pipe until the front end closes it."""
+    while True:
+        try:
+            call = conn.recv()
+        except (EOFError, OSError):
+            return
+        method, args = call
+        try:
+            conn.send(("ok", SHARD_METHODS[method](server, *args)))
+        except ValueError as e:
+            conn.send(("error", str(e)))
+        except Exception as e:
+            conn.send(("crash", f"{type(e).__name__}: {e}"))
+
+
+def _shard_main(index, db_path, conns, ready, stop):
+    """Entry point of a shard process: one Server, its ticker, one thread per pipe."""
+    server = Server(db_path=db_path)
+    print(f"Shard {index} started at T={server.current_t} ({db_path})")
+    for conn in conns:
+        threading.Thread(target=_serve_connection, args=(server, conn), daemon=True, name=f"shard-{index}-conn").start()
+    # This process is the only writer of its DB, so no refresh is needed
+    threading.Thread(target=tick_loop, args=(lambda: server,), kwargs={"stop_event": stop}, daemon=True, name="ticker").start()
+    ready.set()
+    stop.wait()
+
+
+class ShardPool:
+    """
+    Several independent chains, one per process.
+
+    Each shard has its own seed, salt, secret, ticker and SQLite file, so
+    ticks and burns on one shard never touch another, and shards run on
+    separate cores. Tenants are routed with shard_for(). Calls reach a
+    shard over `connections` pipes, so at most that many requests per shard
+    are in flight and a busy tenant can only queue behind its own shard.
+    """
+
+    def __init__(self, shards, db_dir=".", connections=4, start_timeout=30.0):
+        if shards < 1:
+            raise ValueError("Need at least one shard")
+        self.shards = shards
+        self.db_dir = db_dir
+        self.connections = connections
+        self.start_timeout = start_timeout
+        self._idle = []
+        self._live = []  # per shard: connections not yet lost
+        self._live_lock = threading.Lock()
+        self._conns = []
+        self._processes = []
+        self._stop = None
+
+    def db_path(self, index):
+        return os.path.join(self.db_dir, SHARD_DB_TEMPLATE.format(index=index))
+
+    def start(self):
+        # spawn, not fork: the parent has Flask and Server writer threads running
+        ctx = multiprocessing.get_context("spawn")
+        self._stop = ctx.Event()
+        readies = []
+        for index in range(self.shards):
+            pipes = [ctx.Pipe() for _ in range(self.connections)]
+            ready = ctx.Event()
+            process = ctx.Process(
+                target=_shard_main,
+                args=(index, self.db_path(index), [child for _, child in pipes], ready, self._stop),
+                daemon=True,
+                name=f"shard-{index}",
+            )
+            process.start()
+            for _, child in pipes:
+                child.close()
+            idle = queue.Queue()
+            for parent, _ in pipes:
+                idle.put(parent)
+                self._conns.append(parent)
+            self._idle.append(idle)
+            self._live.append(self.connections)
+            self._processes.append(process)
+            readies.append(ready)
+        for index, ready in enumerate(readies):
+            if not ready.wait(self.start_timeout):
+                self.close()
+                raise RuntimeError(f"Shard {index} did not start within {self.start_timeout}s")
+        return self
+
+    def shard_of(self, tenant: str) -> int:
+        return shard_for(tenant, self.shards)
+
+    def call(self, tenant: str, method: str, *args):
+        """
+        Runs a SHARD_METHODS entry on the tenant's shard. ValueErrors from
+        the Server are re-raised as ValueError, anything else (including a
+        lost connection to the shard) as RuntimeError.
+        """
+        index = self.shard_of(tenant)
+        idle = self._idle[index]
+        conn = idle.get()
+        if conn is None:
+            idle.put(None)  # Wake the next waiter too
+            raise RuntimeError(f"Shard {index} has no live connections")
+        try:
+            conn.send((method, args))
+            status, result = conn.recv()
+        except (EOFError, OSError) as e:
+            self._discard(index, conn)
+            raise RuntimeError(f"Lost connection to shard {index}: {e!r}") from e
+        except BaseException:
+            # A reply may still be in flight on it
+            self._discard(index, conn)
+            raise
+        idle.put(conn)
+        if status == "error":
+            raise ValueError(result)
+        if status == "crash":
+            raise RuntimeError(result)
+        return result
+
+    def _discard(self, index, conn):
+        """Drops a connection that can no longer be trusted (pipes cannot be reopened)."""
+        conn.close()
+        with self._live_lock:
+            self._live[index] -= 1
+            last = self._live[index] == 0
+        if last:
+            self._idle[index].put(None)
+
+    def close(self):
+        # A shard that died while waiting on _stop leaves the Event waiting
+        # for it forever in set(), so the others are terminated instead
+        crashed = any(not process.is_alive() for process in self._processes)
+        if self._stop is not None and not crashed:
+            self._stop.set()
+        for conn in self._conns:
+            conn.close()
+        for process in self._processes:
+            if crashed:
+                process.terminate()
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._conns, self._idle, self._live, self._processes = [], [], [], []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
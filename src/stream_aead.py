@@ -0,0 +1,140 @@
+"""
+Chunked AEAD for payloads too large to encrypt in memory (POST /encrypt/stream).
+
+The STREAM construction over AES-GCM: the plaintext is cut into chunk_size
+chunks and each chunk is sealed on its own, so encrypting and decrypting
+hold one chunk at a time. Stream layout:
+
+    MAGIC | version (1 byte) | header length (4 bytes) | header JSON | sealed chunks
+
+The header carries the window metadata (t_start, t_end, public_seed, ...)
+plus chunk_size and a random stream_salt. Each stream gets its own key,
+HKDF(K_final, salt=stream_salt), so the same window key can seal many
+streams. Chunk i is sealed under the nonce i (11 bytes) || last flag
+(1 byte), with the header as associated data: reordered, dropped or
+duplicated chunks, a truncated or extended stream, or an edited header all
+fail authentication.
+"""
+import json
+import os
+import struct
+from collections import namedtuple
+
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from .core import hkdf
+
+MAGIC = b"TESTREAM"
+VERSION = 1
+CHUNK_SIZE = 64 * 1024
+TAG_SIZE = 16
+# Decryptors refuse larger chunks, so a hostile header cannot make them buffer without bound
+MAX_CHUNK_SIZE = 16 * 1024 * 1024
+_PREFIX = struct.Struct(">BI")
+
+# fields: the header dict; raw: its bytes, authenticated with every chunk
+StreamHeader = namedtuple("StreamHeader", ["fields", "raw"])
+
+
+def sealed_length(plaintext_length: int, header: StreamHeader) -> int:
+    """Length of the whole stream for a plaintext of plaintext_length bytes (the response Content-Length)."""
+    chunks = max(1, -(-plaintext_length // header.fields["chunk_size"]))
+    return len(MAGIC) + _PREFIX.size + len(header.raw) + plaintext_length + chunks * TAG_SIZE
+
+
+def new_header(fields: dict, chunk_size: int = CHUNK_SIZE) -> StreamHeader:
+    """A header for a new stream: fields plus chunk_size and a fresh stream_salt."""
+    if not 0 < chunk_size <= MAX_CHUNK_SIZE:
+        raise ValueError(f"chunk_size must be between 1 and {MAX_CHUNK_SIZE}")
+    fields = dict(fields, chunk_size=chunk_size, stream_salt=os.urandom(16).hex())
+    return StreamHeader(fields, json.dumps(fields, sort_keys=True).encode())
+
+
+def _stream_key(k_final, header):
+    return AESGCM(hkdf(k_final, 32, salt=bytes.fromhex(header.fields["stream_salt"]), info=b"stream_aead"))
+
+
+def _nonce(index, last):
+    return index.to_bytes(11, "big") + (b"\x01" if last else b"\x00")
+
+
+def _read_full(read, n) -> bytes:
+    """Up to n bytes from read(), fewer only at EOF (sockets return short reads)."""
+    data = read(n)
+    if len(data) == n or not data:
+        return data
+    parts = [data]
+    remaining = n - len(data)
+    while remaining:
+        data = read(remaining)
+        if not data:
+            break
+        parts.append(data)
+        remaining -= len(data)
+    return b"".join(parts)
+
+
+def encrypt_stream(k_final: bytes, read, header: StreamHeader):
+    """
+    Generator: yields the stream prefix and header, then one sealed chunk
+    per chunk_size bytes of read(n) (which returns b"" at EOF). An empty
+    plaintext is one empty final chunk.
+    """
+    aead = _stream_key(k_final, header)
+    chunk_size = header.fields["chunk_size"]
+    yield MAGIC + _PREFIX.pack(VERSION, len(header.raw)) + header.raw
+
+    # One chunk of lookahead: a chunk is the last one when nothing follows it
+    chunk = _read_full(read, chunk_size)
+    index = 0
+    while True:
+        following = _read_full(read, chunk_size) if len(chunk) == chunk_size else b""
+        last = not following
+        yield aead.encrypt(_nonce(index, last), chunk, header.raw)
+        if last:
+            return
+        chunk = following
+        index += 1
+
+
+def read_header(read) -> StreamHeader:
+    """Reads the prefix and header of a stream. Raises ValueError if it is not one."""
+    prefix = _read_full(read, len(MAGIC) + _PREFIX.size)
+    if len(prefix) < len(MAGIC) + _PREFIX.size or not prefix.startswith(MAGIC):
+        raise ValueError("Not an encrypted stream")
+    version, length = _PREFIX.unpack(prefix[len(MAGIC):])
+    if version != VERSION:
+        raise ValueError(f"Unsupported stream version {version}")
+    raw = _read_full(read, length)
+    if len(raw) < length:
+        raise ValueError("Truncated stream header")
+    fields = json.loads(raw)
+    if not 0 < fields.get("chunk_size", 0) <= MAX_CHUNK_SIZE:
+        raise ValueError("Invalid stream chunk size")
+    return StreamHeader(fields, raw)
+
+
+def decrypt_stream(k_final: bytes, read, header: StreamHeader):
+    """
+    Generator: yields the plaintext chunk by chunk from the sealed chunks
+    that follow the header. Raises InvalidTag on a forged chunk and
+    ValueError on a truncated stream or trailing data. Do not use output
+    from a stream that raised.
+    """
+    aead = _stream_key(k_final, header)
+    sealed_size = header.fields["chunk_size"] + TAG_SIZE
+    sealed = _read_full(read, sealed_size)
+    index = 0
+    while True:
+        if len(sealed) < TAG_SIZE:
+            raise ValueError("Truncated stream")
+        following = _read_full(read, sealed_size) if len(sealed) == sealed_size else b""
+        if following:
+            yield aead.decrypt(_nonce(index, False), sealed, header.raw)
+        else:
+            yield aead.decrypt(_nonce(index, True), sealed, header.raw)
+            if read(1):
+                raise ValueError("Data after the final chunk")
+            return
+        sealed = following
+        index += 1
@@ -1,41 +1,77 @@
-import time
 import os
 import sys
 
 # Add project root to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from src.server import Server
+from src.clock import REAL_CLOCK
+from src.epochs import EpochManager
+from src.metrics import METRICS
 
-def run_ticker():
-    print("Initializing Ticker Service...")
-    
-    # Initialize server (loads state from DB)
-    server = Server()
-    print(f"Ticker started at T={server.current_t}")
-    
-    next_tick_time = time.time() + 1
-    
-    while True:
-        now = time.time()
+def tick_loop(get_server, clock=REAL_CLOCK, refresh=False, stop_event=None, max_ticks=None, after_tick=None):
+    """
+    Advances the server by one tick every tick_seconds on a fixed schedule.
+
+    get_server is called every tick so callers can swap the instance (app.py's /reset).
+    The duration is read from the server each tick, so a changed tick_seconds
+    takes effect on the next tick. refresh=True reloads state from the DB
+    first, for when other processes also advance it. stop_event / max_ticks
+    end the loop (tests and simulations). after_tick runs after every tick
+    (app.py ticks a retiring chain epoch with it, see src/epochs.py).
+    """
+    next_tick_time = clock.time() + get_server().tick_seconds
+    ticks = 0
+
+    while not (stop_event and stop_event.is_set()):
+        if max_ticks is not None and ticks >= max_ticks:
+            break
+
+        now = clock.time()
         sleep_time = next_tick_time - now
         if sleep_time > 0:
-            time.sleep(sleep_time)
-        
-        next_tick_time += 1
-        
+            clock.sleep(sleep_time)
+
+        # How late this tick starts (scheduler wake-up plus the last tick's overrun)
+        METRICS.observe("tick_jitter_seconds", max(0.0, clock.time() - next_tick_time))
+        server = get_server()
+        next_tick_time += server.tick_seconds
+        ticks += 1
+
         try:
-            # Advance the server state by 1 tick
+            if refresh:
+                # Get the latest t from DB (in case other processes moved it)
+                server.refresh_state()
+            # Advance the server state by 1 tick. At high tick rates the DB
+            # write is batched (Server.persist_interval).
             target = server.current_t + 1
-            server.advance_private_state_to(target)
+            server.advance_private_state_to(target, defer_save=True)
             # print(f"Ticked to {target}")
+            if after_tick:
+                after_tick()
         except Exception as e:
             print(f"Ticker error: {e}")
 
+def run_ticker(clock=REAL_CLOCK, stop_event=None, max_ticks=None, db_path=None):
+    print("Initializing Ticker Service...")
+
+    # Initialize server (loads state from DB). The web process rolls chain
+    # epochs over; this follows its pointer file to the current epoch.
+    epochs = EpochManager(db_path, clock=clock)
+    server = epochs.follow()
+    print(f"Ticker started at T={server.current_t} (epoch {server.epoch})")
+
+    def current():
+        nonlocal server
+        server = epochs.follow(server)
+        return server
+
+    tick_loop(current, clock, stop_event=stop_event, max_ticks=max_ticks)
+    server.close()
+
 if __name__ == "__main__":
     # Ensure we have the master key
     if not os.environ.get('SERVER_MASTER_KEY'):
         print("ERROR: SERVER_MASTER_KEY env var is required.")
         sys.exit(1)
-        
+
     run_ticker()
@@ -1,27 +1,161 @@
-import time
+import math
 import threading
 import requests
+from src.clock import REAL_CLOCK
 
 class TimeKeeper:
-    def __init__(self, base_url="http://localhost:5001"):
+    """
+    Client-side estimate of the server tick.
+
+    sync() takes several timestamped /status samples NTP-style, keeps the one
+    with the lowest round trip, compensates RTT/2 to get the clock offset, and
+    uses the server's tick_started_at to estimate where the server is inside
+    its current tick. Offsets from successive syncs are fitted to a line so
+    clock drift between client and server is corrected continuously.
+
+    The sync model is updated under a lock, and predictions read it under
+    the same lock, so ScheduledDecrypt jobs can sync() from several threads
+    while others wait for their ticks.
+    """
+
+    MAX_DRIFT_SAMPLES = 8
+
+    def __init__(self, base_url="http://localhost:5001", tick_seconds=1.0, samples=5, resync_interval=30, clock=None):
         self.base_url = base_url
+        self.clock = clock or REAL_CLOCK
+        self.tick_seconds = tick_seconds
+        self.samples = samples
+        self.resync_interval = resync_interval
         self.local_t = 0
         self.running = False
         self.offset = 0  # For simulating drift
         self._thread = None
 
-    def sync(self):
+        # Sync model (None until a sync with server timestamps succeeds)
+        self.clock_offset = None    # server_clock - local_clock, in seconds
+        self.skew = 0.0             # d(clock_offset)/d(local time)
+        self.rtt = None             # round trip of the best sample
+        self.anchor_t = None        # server tick at the best sample
+        self.tick_started_at = None # server clock time when anchor_t began
+        self._sync_local = None     # local time of the best sample
+        self._offset_history = []   # (local_time, clock_offset)
+        # Live chain epochs (src/epochs.py): epoch -> its tick minus the current epoch's
+        self.epoch = None
+        self.epoch_offsets = {}
+        # Guards the sync model; reentrant because predictions call each other
+        self._lock = threading.RLock()
+
+    def _sample(self):
+        """Takes one timestamped /status sample. Returns (rtt, offset, local_mid, data)."""
+        sent = self.clock.time()
+        resp = requests.get(f"{self.base_url}/status", timeout=5)
+        received = self.clock.time()
+        if resp.status_code != 200:
+            raise ValueError(f"Sync failed: {resp.status_code}")
+        data = resp.json()
+        local_mid = (sent + received) / 2
+        rtt = received - sent
+        # NTP-style: assume the server stamped server_time half way through the RTT
+        offset = data['server_time'] - local_mid if 'server_time' in data else None
+        return rtt, offset, local_mid, data
+
+    def sync(self, samples=None):
         """Fetches the authoritative time from the server."""
+        samples = samples or self.samples
         try:
-            resp = requests.get(f"{self.base_url}/status", timeout=5)
-            if resp.status_code == 200:
-                data = resp.json()
-                self.local_t = data['current_t']
-                print(f"[TimeKeeper] Synced. Local time is now: {self.local_t}")
-            else:
-                print(f"[TimeKeeper] Sync failed: {resp.status_code}")
+            results = [self._sample() for _ in range(samples)]
         except Exception as e:
             print(f"[TimeKeeper] Sync error: {e}")
+            return
+
+        rtt, offset, local_mid, data = min(results, key=lambda r: r[0])
+        # Sampling above runs unlocked; the model is replaced as one step
+        with self._lock:
+            self.local_t = data['current_t']
+            # Servers report their tick duration (configurable, see Server.tick_seconds)
+            self.tick_seconds = data.get('tick_seconds', self.tick_seconds)
+            self.epoch = data.get('epoch')
+            self.epoch_offsets = {e['epoch']: e['current_t'] - data['current_t'] for e in data.get('epochs') or []}
+
+            if offset is None or data.get('tick_started_at') is None:
+                # Older server without timestamps: fall back to copying the tick
+                print(f"[TimeKeeper] Synced (no timestamps). Local time is now: {self.local_t}")
+                return
+
+            self.rtt = rtt
+            self.clock_offset = offset
+            self.anchor_t = data['current_t']
+            self.tick_started_at = data['tick_started_at']
+            self._sync_local = local_mid
+
+            self._offset_history.append((local_mid, offset))
+            self._offset_history = self._offset_history[-self.MAX_DRIFT_SAMPLES:]
+            self.skew = self._estimate_skew()
+
+            print(f"[TimeKeeper] Synced. Server T={self.anchor_t}, offset={offset * 1000:.1f}ms, rtt={rtt * 1000:.1f}ms, phase={self.phase():.2f}")
+
+    def _estimate_skew(self):
+        """Least-squares slope of clock offset over local time."""
+        points = self._offset_history
+        if len(points) < 2:
+            return 0.0
+        n = len(points)
+        mean_x = sum(x for x, _ in points) / n
+        mean_y = sum(y for _, y in points) / n
+        var_x = sum((x - mean_x) ** 2 for x, _ in points)
+        if var_x == 0:
+            return 0.0
+        return sum((x - mean_x) * (y - mean_y) for x, y in points) / var_x
+
+    def _offset_at(self, local_time):
+        """Predicted clock offset at local_time, including drift correction."""
+        return self.clock_offset + self.skew * (local_time - self._sync_local)
+
+    def predict_tick(self, local_time=None):
+        """Predicts the server tick at local_time (defaults to now). Returns a float."""
+        if local_time is None:
+            local_time = self.clock.time()
+        with self._lock:
+            server_now = local_time + self._offset_at(local_time)
+            return self.anchor_t + (server_now - self.tick_started_at) / self.tick_seconds
+
+    def phase(self, local_time=None):
+        """Fraction of the current server tick already elapsed (0.0 - 1.0)."""
+        predicted = self.predict_tick(local_time)
+        return predicted - math.floor(predicted)
+
+    def local_time_of_tick(self, t, position=0.5):
+        """
+        Local wall-clock time at which the server is `position` of the way
+        through tick t. position=0.5 aims at the middle of the tick.
+        """
+        with self._lock:
+            server_time = self.tick_started_at + (t - self.anchor_t + position) * self.tick_seconds
+            # Invert local + offset(local) = server_time (skew is tiny, one step is enough)
+            local_guess = server_time - self.clock_offset
+            return server_time - self._offset_at(local_guess)
+
+    def epoch_tick(self, epoch, t):
+        """
+        Tick t of chain epoch `epoch` in the current epoch's numbering (the
+        epochs tick in lockstep). Unknown epochs are taken as the current one.
+        """
+        with self._lock:
+            return t - self.epoch_offsets.get(epoch, 0)
+
+    def wait_for_tick(self, t, position=0.5):
+        """Sleeps until the middle of server tick t."""
+        if self.clock_offset is None:
+            while self.get_time() < t:
+                self.clock.sleep(0.05)
+            return
+        # Re-evaluate while sleeping so a re-sync (e.g. after a burn moved the
+        # server ahead) shifts the wake-up time.
+        while True:
+            delay = self.local_time_of_tick(t, position) - self.clock.time()
+            if delay <= 0:
+                return
+            self.clock.sleep(min(delay, self.tick_seconds / 4))
 
     def start(self):
         """Starts the local ticker."""
@@ -38,21 +172,33 @@ class TimeKeeper:
             self._thread.join()
 
     def _tick_loop(self):
-        """Accurate ticker loop."""
-        next_tick = time.time() + 1
+        """Accurate ticker loop. Re-syncs periodically to correct drift."""
+        next_tick = self.clock.time() + self.tick_seconds
+        next_sync = self.clock.time() + self.resync_interval if self.resync_interval else None
         while self.running:
-            now = time.time()
+            now = self.clock.time()
             sleep_time = next_tick - now
             if sleep_time > 0:
-                time.sleep(sleep_time)
-            
-            next_tick += 1
-            self.local_t += 1
+                self.clock.sleep(sleep_time)
+
+            next_tick += self.tick_seconds
+            with self._lock:
+                if self.clock_offset is None:
+                    self.local_t += 1
+                else:
+                    self.local_t = math.floor(self.predict_tick())
+
+            if next_sync is not None and self.clock.time() >= next_sync:
+                self.sync()
+                next_sync = self.clock.time() + self.resync_interval
             # print(f"[TimeKeeper] Tick: {self.get_time()}")
 
     def get_time(self):
-        """Returns the local time + any simulated drift."""
-        return self.local_t + self.offset
+        """Returns the predicted server tick + any simulated drift."""
+        with self._lock:
+            if self.clock_offset is not None:
+                return math.floor(self.predict_tick()) + self.offset
+            return self.local_t + self.offset
 
     def simulate_drift(self, delta):
         """Adds 'delta' seconds to the local clock (can be negative)."""
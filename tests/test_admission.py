@@ -0,0 +1,165 @@
+import unittest
+import os
+import threading
+import time
+import src.app as app_module
+from src.server import Server
+from src.clock import VirtualClock
+from src.metrics import METRICS
+from src.admission import AdmissionController, TokenBucket, retry_after_ticks, RATE_LIMITED, CLIENT_BUSY
+from src.scheduler import QUEUE_FULL, QUEUE_TIMEOUT
+
+class TestTokenBucket(unittest.TestCase):
+    def test_burst_then_refill(self):
+        bucket = TokenBucket(rate=2, burst=3, now=0.0)
+        self.assertEqual([bucket.take(0.0) for _ in range(3)], [0.0, 0.0, 0.0])
+        self.assertAlmostEqual(bucket.take(0.0), 0.5)
+        self.assertEqual(bucket.take(0.5), 0.0)
+        # Never more than burst, however long idle
+        bucket.take(100.0, cost=0)
+        self.assertEqual(bucket.tokens, 3)
+
+    def test_retry_after_ticks(self):
+        self.assertEqual(retry_after_ticks(0.01), 1)
+        self.assertEqual(retry_after_ticks(2.5), 3)
+        self.assertEqual(retry_after_ticks(1.0, tick_seconds=0.1), 10)
+
+class TestAdmissionController(unittest.TestCase):
+    def test_rate_limit_is_per_client(self):
+        clock = VirtualClock()
+        ctl = AdmissionController(rate=1, burst=2, clock=clock)
+        for _ in range(2):
+            self.assertIsNone(ctl.admit("a"))
+            ctl.release("a")
+        reason, retry = ctl.admit("a")
+        self.assertEqual(reason, RATE_LIMITED)
+        self.assertAlmostEqual(retry, 1.0)
+        self.assertIsNone(ctl.admit("b"))
+        ctl.release("b")
+        clock.advance(1)
+        self.assertIsNone(ctl.admit("a"))
+
+    def test_forgets_least_recent_clients(self):
+        ctl = AdmissionController(rate=1, burst=1, max_clients=2, clock=VirtualClock())
+        ctl.check_rate("a")
+        ctl.check_rate("b")
+        ctl.check_rate("c")
+        self.assertEqual(list(ctl._buckets), ["b", "c"])
+
+    def test_queue_full_and_timeout(self):
+        ctl = AdmissionController(rate=0, max_in_flight=1, max_queue=1, queue_timeout=0.2, max_per_client=5)
+        self.assertIsNone(ctl.admit("a"))
+        results = []
+        waiter = threading.Thread(target=lambda: results.append(ctl.admit("b")))
+        waiter.start()
+        while ctl.queued == 0:
+            time.sleep(0.001)
+        self.assertEqual(ctl.admit("c")[0], QUEUE_FULL)
+        waiter.join()
+        self.assertEqual(results[0][0], QUEUE_TIMEOUT)
+        ctl.release("a")
+        self.assertEqual((ctl.in_flight, ctl.queued, ctl._per_client), (0, 0, {}))
+
+    def test_queued_request_gets_released_slot(self):
+        ctl = AdmissionController(rate=0, max_in_flight=1, max_queue=4, queue_timeout=2.0)
+        self.assertIsNone(ctl.admit("a"))
+        results = []
+        waiter = threading.Thread(target=lambda: results.append(ctl.admit("b")))
+        waiter.start()
+        while ctl.queued == 0:
+            time.sleep(0.001)
+        ctl.release("a")
+        waiter.join()
+        self.assertEqual(results, [None])
+        self.assertEqual(ctl.in_flight, 1)
+
+    def test_one_client_cannot_take_every_slot(self):
+        ctl = AdmissionController(rate=0, max_in_flight=2, max_queue=2, max_per_client=2)
+        self.assertIsNone(ctl.admit("greedy"))
+        self.assertIsNone(ctl.admit("greedy"))
+        self.assertEqual(ctl.admit("greedy")[0], CLIENT_BUSY)
+
+    def test_per_client_limits_are_opt_in(self):
+        # One address may be a whole NAT or one AsyncTimeLockClient
+        ctl = AdmissionController(max_in_flight=4, max_queue=0)
+        for _ in range(100):
+            self.assertIsNone(ctl.admit("nat"))
+            ctl.release("nat")
+        for _ in range(4):
+            self.assertIsNone(ctl.admit("nat"))
+        self.assertEqual(ctl.admit("nat")[0], QUEUE_FULL)
+
+class TestAdmissionEndpoints(unittest.TestCase):
+    def setUp(self):
+        if os.path.exists("server_state.db"):
+            os.remove("server_state.db")
+        METRICS.reset()
+        app_module.server_instance = Server()
+        app_module.server_instance.advance_private_state_to(1)
+        self.saved = app_module.admission
+        app_module.admission = AdmissionController(rate=0.001, burst=3)
+
+    def tearDown(self):
+        app_module.admission = self.saved
+        if os.path.exists("server_state.db"):
+            os.remove("server_state.db")
+
+    def _encrypt(self, client, addr):
+        return client.post('/encrypt', json={
+            "plaintext": "aa", "t_start": 1, "t_end": 3, "request_nonce": os.urandom(8).hex()
+        }, environ_base={"REMOTE_ADDR": addr})
+
+    def test_shed_with_429_and_retry_after_ticks(self):
+        client = app_module.app.test_client()
+        statuses = [self._encrypt(client, "10.0.0.1").status_code for _ in range(3)]
+        self.assertEqual(statuses, [200, 200, 200])
+        resp = self._encrypt(client, "10.0.0.1")
+        self.assertEqual(resp.status_code, 429)
+        body = resp.get_json()
+        self.assertEqual(body["reason"], RATE_LIMITED)
+        self.assertGreaterEqual(body["retry_after_ticks"], 1)
+        self.assertEqual(resp.headers["Retry-After"], str(body["retry_after_ticks"]))
+
+        # Other clients are unaffected
+        self.assertEqual(self._encrypt(client, "10.0.0.2").status_code, 200)
+        text = client.get('/metrics').get_data(as_text=True)
+        self.assertIn('timelock_requests_shed_total{endpoint="/encrypt",reason="rate_limited"} 1', text)
+        self.assertIn('timelock_admission_in_flight 0', text)
+
+    def test_verify_costs_two_tokens(self):
+        client = app_module.app.test_client()
+        body = {"checksum": "00", "t_start": 1, "t_end": 1, "request_nonce": "x"}
+        self.assertEqual(client.post('/verify', json=body, environ_base={"REMOTE_ADDR": "10.0.0.3"}).status_code, 400)
+        self.assertEqual(client.post('/verify', json=body, environ_base={"REMOTE_ADDR": "10.0.0.3"}).status_code, 429)
+
+    def test_well_behaved_client_bounded_under_flood(self):
+        app_module.admission = AdmissionController(rate=200, burst=200, max_in_flight=2, max_queue=4, queue_timeout=0.2,
+                                                   max_per_client=3)
+        stop = threading.Event()
+        flood_statuses = []
+
+        def flood():
+            client = app_module.app.test_client()
+            while not stop.is_set():
+                flood_statuses.append(self._encrypt(client, "10.0.0.66").status_code)
+
+        flooders = [threading.Thread(target=flood) for _ in range(12)]
+        for th in flooders:
+            th.start()
+        try:
+            client = app_module.app.test_client()
+            latencies = []
+            for _ in range(5):
+                started = time.perf_counter()
+                self.assertEqual(self._encrypt(client, "10.0.0.7").status_code, 200)
+                latencies.append(time.perf_counter() - started)
+                time.sleep(0.02)
+        finally:
+            stop.set()
+            for th in flooders:
+                th.join()
+        self.assertIn(429, flood_statuses)
+        self.assertLess(max(latencies), 1.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+import unittest
+import os
+import asyncio
+import tempfile
+import threading
+from unittest import mock
+from werkzeug.serving import make_server
+
+import src.app as app_module
+from src.server import Server
+from src.async_client import AsyncTimeLockClient
+from src.alice import alice_compute_window_checksum
+from src.chain_cache import ChainCheckpointCache
+
+class TestAsyncClient(unittest.TestCase):
+    def setUp(self):
+        if os.path.exists("server_state.db"):
+            os.remove("server_state.db")
+        app_module.server_instance = Server()
+        # t=0 is rejected by the /encrypt parameter check, so start at t=1
+        app_module.server_instance.advance_private_state_to(1)
+
+        self.httpd = make_server("127.0.0.1", 0, app_module.app, threaded=True)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_port}"
+
+    def tearDown(self):
+        self.httpd.shutdown()
+        self.thread.join()
+        if os.path.exists("server_state.db"):
+            os.remove("server_state.db")
+
+    def test_encrypt_and_decrypt_current_tick(self):
+        async def flow():
+            client = AsyncTimeLockClient(self.base_url)
+            self.assertEqual(await client.sync(), 1)
+            return await client.encrypt_and_decrypt(b"async secret", 1, 1)
+
+        self.assertEqual(asyncio.run(flow()), b"async secret")
+
+    def test_too_early_is_retried_until_tick(self):
+        """A verify that lands before the server ticks is retried, not burned."""
+        def tick_later():
+            app_module.server_instance.advance_private_state_to(2)
+
+        async def flow():
+            client = AsyncTimeLockClient(self.base_url, tick_seconds=1.0)
+            await client.sync()
+            data = await client.encrypt(b"later", 1, 2)
+            # Pretend the middle of the next tick is now; the server ticks 0.2s later.
+            client._sync_at -= 1.5
+            threading.Timer(0.2, tick_later).start()
+            return await client.decrypt(data, retry_interval=0.02)
+
+        self.assertEqual(asyncio.run(flow()), b"later")
+
+    def test_level_window(self):
+        """A minute window waits for the minute's first base tick and verifies at its level."""
+        app_module.server_instance.advance_private_state_to(60)
+
+        async def flow():
+            client = AsyncTimeLockClient(self.base_url)
+            await client.sync()
+            data = await client.encrypt(b"minutely", 1, 1, level="minute")
+            self.assertEqual(data["level"], "minute")
+            return await client.decrypt(data)
+
+        self.assertEqual(asyncio.run(flow()), b"minutely")
+
+    def test_checkpoints_only_serve_their_own_chain(self):
+        server = app_module.server_instance
+        server.checkpoint_interval = 5
+        server.advance_private_state_to(12)
+        other_seed, other_salt = os.urandom(32), os.urandom(32)
+
+        async def flow():
+            client = AsyncTimeLockClient(self.base_url)
+            self.assertEqual(await client.load_checkpoints(), 2)
+            self.assertEqual(list(client.checkpoints), [(server.public_seed, server.public_salt)])
+            own = await client.compute_checksum({"public_seed": server.public_seed.hex(), "public_salt": server.public_salt.hex(),
+                                                 "t_start": 6, "t_end": 12})
+            # A window of another chain (e.g. an older epoch) takes the normal path
+            other = await client.compute_checksum({"public_seed": other_seed.hex(), "public_salt": other_salt.hex(),
+                                                   "t_start": 6, "t_end": 12})
+            return own, other
+
+        own, other = asyncio.run(flow())
+        self.assertEqual(own, alice_compute_window_checksum(server.public_seed, server.public_salt, 6, 12))
+        self.assertEqual(other, alice_compute_window_checksum(other_seed, other_salt, 6, 12))
+
+    def test_server_checkpoints_stay_out_of_the_cache(self):
+        server = app_module.server_instance
+        server.checkpoint_interval = 5
+        server.advance_private_state_to(12)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = ChainCheckpointCache(os.path.join(tmp, "cache.db"), interval=1000)
+
+            async def flow():
+                client = AsyncTimeLockClient(self.base_url, cache=cache)
+                await client.load_checkpoints()
+                return await client.compute_checksum({"public_seed": server.public_seed.hex(),
+                                                      "public_salt": server.public_salt.hex(),
+                                                      "t_start": 11, "t_end": 12})
+
+            self.assertEqual(asyncio.run(flow()),
+                             alice_compute_window_checksum(server.public_seed, server.public_salt, 11, 12))
+            # Only spot-checked, so used in memory but never persisted
+            self.assertEqual(cache.checkpoints(server.public_seed, server.public_salt), [])
+
+    def test_concurrency_limit(self):
+        """At most max_concurrency connections are open at once."""
+        active = peak = 0
+
+        async def counting_open_connection(*args, **kwargs):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)  # Let the other requests pile up
+            reader, writer = await opened(*args, **kwargs)
+            writer_close = writer.close
+
+            def close():
+                nonlocal active
+                active -= 1
+                writer_close()
+            writer.close = close
+            return reader, writer
+
+        async def flow():
+            client = AsyncTimeLockClient(self.base_url, max_concurrency=4)
+            return await asyncio.gather(*(client.status() for _ in range(20)))
+
+        opened = asyncio.open_connection
+        with mock.patch("src.async_client.asyncio.open_connection", counting_open_connection):
+            results = asyncio.run(flow())
+        self.assertEqual(len(results), 20)
+        self.assertEqual(active, 0)
+        self.assertGreater(peak, 1)
+        self.assertLessEqual(peak, 4)
+        self.assertTrue(all(r["current_t"] == 1 for r in results))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import unittest
+import os
+import json
+import socket
+import time
+import asyncio
+import threading
+
+import src.app as app_module
+from src.server import Server, DB_PATH
+from src.async_server import AsyncFrontEnd
+from src.async_client import AsyncTimeLockClient
+
+class TestAsyncFrontEnd(unittest.TestCase):
+    def setUp(self):
+        if os.path.exists(DB_PATH):
+            os.remove(DB_PATH)
+        app_module.server_instance = Server()
+        app_module.server_instance.advance_private_state_to(1)
+        self.start()
+
+    def start(self, **kwargs):
+        self.loop = asyncio.new_event_loop()
+        self.front_end = AsyncFrontEnd(app_module.app, lambda: app_module.server_instance, port=0, **kwargs)
+        self.loop.run_until_complete(self.front_end.start())
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        asyncio.run_coroutine_threadsafe(self.front_end.close(), self.loop).result(5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+        if os.path.exists(DB_PATH):
+            os.remove(DB_PATH)
+
+    def connect(self):
+        sock = socket.create_connection(("127.0.0.1", self.front_end.port), timeout=5)
+        self.addCleanup(sock.close)
+        return sock, sock.makefile("rb")
+
+    def request(self, sock, stream, method, path, payload=None):
+        body = json.dumps(payload).encode() if payload is not None else b""
+        sock.sendall(f"{method} {path} HTTP/1.1\r\nHost: x\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+        status = int(stream.readline().split()[1])
+        headers = {}
+        while (line := stream.readline().decode().strip()):
+            name, _, value = line.partition(":")
+            headers[name.lower()] = value.strip()
+        body = stream.read(int(headers["content-length"]))
+        return status, headers, json.loads(body) if headers["content-type"] == "application/json" else body
+
+    def test_keep_alive_serves_the_flask_routes(self):
+        sock, stream = self.connect()
+        status, headers, data = self.request(sock, stream, "GET", "/status")
+        self.assertEqual((status, headers["connection"]), (200, "keep-alive"))
+        self.assertEqual(data["current_t"], 1)
+
+        # Same connection: an encrypt, then a bad request through the Flask error path
+        status, _, enc = self.request(sock, stream, "POST", "/encrypt", {
+            "plaintext": b"hi".hex(), "t_start": 1, "t_end": 2, "request_nonce": "n1"})
+        self.assertEqual((status, enc["t_end"]), (200, 2))
+        status, _, data = self.request(sock, stream, "POST", "/verify", {"t_start": 1, "t_end": 2})
+        self.assertEqual(status, 400)
+        status, _, _ = self.request(sock, stream, "GET", "/nowhere")
+        self.assertEqual(status, 404)
+
+    def test_async_client_round_trip(self):
+        async def flow():
+            client = AsyncTimeLockClient(f"http://127.0.0.1:{self.front_end.port}")
+            await client.sync()
+            return await client.encrypt_and_decrypt(b"over asyncio", 1, 1)
+
+        self.assertEqual(asyncio.run(flow()), b"over asyncio")
+
+    def read_event(self, stream):
+        fields = dict(line.decode().rstrip("\n").split(": ", 1) for line in iter(stream.readline, b"\n"))
+        return fields["event"], int(fields["id"]), json.loads(fields["data"])
+
+    def test_tick_stream(self):
+        subscribers = [self.connect() for _ in range(20)]
+        for sock, _ in subscribers:
+            sock.sendall(b"GET /ticks HTTP/1.1\r\nHost: x\r\n\r\n")
+        for _, stream in subscribers:
+            self.assertIn(b"text/event-stream", b"".join(iter(stream.readline, b"\r\n")))
+            self.assertEqual(self.read_event(stream)[:2], ("tick", 1))
+
+        app_module.server_instance.advance_private_state_to(2)
+        for _, stream in subscribers:
+            event, t, data = self.read_event(stream)
+            self.assertEqual((event, t, data["t"], data["tick_seconds"]), ("tick", 2, 2, 1.0))
+
+        # A subscriber that hangs up is forgotten; the others keep streaming
+        subscribers[0][1].close()
+        subscribers[0][0].close()
+        app_module.server_instance.advance_private_state_to(3)
+        self.assertEqual(self.read_event(subscribers[1][1])[1], 3)
+        deadline = time.monotonic() + 5
+        while len(self.front_end.broadcaster.subscribers) > 19 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(len(self.front_end.broadcaster.subscribers), 19)
+
+    def test_sheds_when_queue_is_full(self):
+        self.front_end.pending = self.front_end.max_pending
+        sock, stream = self.connect()
+        status, headers, data = self.request(sock, stream, "GET", "/status")
+        self.assertEqual((status, headers["retry-after"], data["reason"]), (429, "1", "frontend_queue"))
+        self.front_end.pending = 0
+        self.assertEqual(self.request(sock, stream, "GET", "/status")[0], 200)
+
+if __name__ == '__main__':
+    unittest.main()
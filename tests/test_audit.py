@@ -0,0 +1,148 @@
+import unittest
+import os
+import tempfile
+import src.app as app_module
+from src.server import Server
+from src.metrics import METRICS
+from src.core import evolve_public_chain, derive_public_key_piece
+from src.audit import (AuditLog, read_audit, audit_files, classify_release_error, main,
+                       RECORD_SIZE, AUDIT_MAGIC, DROP_NEWEST, DROP_OLDEST, BLOCK)
+
+class TestAuditLog(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "audit.log")
+        METRICS.reset()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_roundtrip_never_stores_the_nonce(self):
+        audit = AuditLog(self.path)
+        audit.record("release", "released", 7, 5, 7, "203.0.113.9", "secret-nonce")
+        audit.record("client_helper_release", "too_early", 3, 4, 6, "2001:db8::1", "n2", "day")
+        audit.record("release", "rejected", 3, "x", None, None, "n3")
+        audit.record("release", "released", 3, 1, 2 ** 64, "10.0.0.1", "n4")  # Out of int64: clamped, not raised
+        audit.close()
+
+        records = list(read_audit(self.path))
+        self.assertEqual(os.path.getsize(self.path), len(AUDIT_MAGIC) + 4 * RECORD_SIZE)
+        self.assertEqual((records[0].event, records[0].outcome, records[0].client), ("release", "released", "203.0.113.9"))
+        self.assertEqual((records[0].tick, records[0].t_start, records[0].t_end), (7, 5, 7))
+        self.assertEqual((records[1].client, records[1].level), ("2001:db8::1", "day"))
+        self.assertEqual(records[0].level, "tick")
+        self.assertEqual((records[2].t_start, records[2].t_end), (-1, -1))
+        self.assertEqual((records[3].t_start, records[3].t_end), (1, -1))
+        self.assertEqual(audit.dropped, 0)
+        self.assertEqual(len(records[0].nonce_digest), 16)
+        with open(self.path, "rb") as f:
+            self.assertNotIn(b"secret-nonce", f.read())
+        old = os.path.join(self.tmp.name, "old.log")
+        with open(old, "wb") as f:
+            f.write(b"TLAUDIT1")
+        with self.assertRaisesRegex(ValueError, "another format version"):
+            list(read_audit(old))
+        self.assertEqual(METRICS.get_counter("audit_records_written_total"), 4)
+
+    def test_overflow_policies(self):
+        # The writer never runs between flushes here, so the ring fills up
+        for policy, kept_first in ((DROP_NEWEST, 0), (DROP_OLDEST, 2)):
+            path = os.path.join(self.tmp.name, f"{policy}.log")
+            audit = AuditLog(path, capacity=3, overflow=policy, flush_interval=60)
+            for tick in range(5):
+                audit.record("release", "released", tick, tick, tick, "10.0.0.1", tick)
+            self.assertEqual(audit.dropped, 2)
+            audit.close()
+            self.assertEqual([r.tick for r in read_audit(path)], list(range(kept_first, kept_first + 3)))
+
+        with self.assertRaises(ValueError):
+            AuditLog(self.path, overflow="spill")
+
+    def test_block_waits_for_writer(self):
+        audit = AuditLog(self.path, capacity=2, overflow=BLOCK, flush_interval=0.01)
+        for tick in range(20):
+            audit.record("release", "released", tick, tick, tick, "10.0.0.1", tick)
+        audit.close()
+        self.assertEqual(audit.dropped, 0)
+        self.assertEqual([r.tick for r in read_audit(self.path)], list(range(20)))
+
+    def test_rotation_and_reader_cli(self):
+        audit = AuditLog(self.path, max_bytes=len(AUDIT_MAGIC) + 2 * RECORD_SIZE, max_files=3, flush_interval=60)
+        for tick in range(7):
+            audit.record("release", "released", tick, tick, tick, f"10.0.0.{tick % 2}", tick)
+            audit.flush()
+        audit.close()
+
+        files = audit_files(self.path)
+        self.assertEqual(files, [self.path + ".2", self.path + ".1", self.path])
+        self.assertEqual([r.tick for f in files for r in read_audit(f)], [2, 3, 4, 5, 6])
+        for f in files:
+            self.assertLessEqual(os.path.getsize(f), len(AUDIT_MAGIC) + 2 * RECORD_SIZE)
+        self.assertEqual(main([self.path, "--client", "10.0.0.1", "--json"]), 0)
+
+    def test_older_format_is_moved_aside(self):
+        with open(self.path, "wb") as f:
+            f.write(b"TLAUDIT1" + bytes(58))
+        audit = AuditLog(self.path)
+        audit.record("release", "released", 1, 1, 1, "10.0.0.1", "n")
+        audit.close()
+
+        self.assertEqual([r.tick for r in read_audit(self.path)], [1])
+        aside = [name for name in os.listdir(self.tmp.name) if name.startswith("audit.log.old-")]
+        self.assertEqual(len(aside), 1)
+        with open(os.path.join(self.tmp.name, aside[0]), "rb") as f:
+            self.assertEqual(f.read(), b"TLAUDIT1" + bytes(58))
+        # The reader CLI only walks numbered rotations, not the moved file
+        self.assertEqual(audit_files(self.path), [self.path])
+
+    def test_classify_release_error(self):
+        self.assertEqual(classify_release_error("Too early! Server is at t=3"), "too_early")
+        self.assertEqual(classify_release_error("Window expired! Server is at t=9"), "window_expired")
+        self.assertEqual(classify_release_error("Replay detected! Nonce n already used."), "replay")
+        self.assertEqual(classify_release_error("Release not committed: no majority"), "not_committed")
+        self.assertEqual(classify_release_error("boom"), "rejected")
+
+class TestAuditEndpoints(unittest.TestCase):
+    def setUp(self):
+        if os.path.exists("server_state.db"):
+            os.remove("server_state.db")
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "audit.log")
+        app_module.server_instance = Server()
+        app_module.server_instance.advance_private_state_to(2)
+        app_module.audit_log = AuditLog(self.path, flush_interval=60)
+
+    def tearDown(self):
+        app_module.audit_log.close()
+        app_module.audit_log = None
+        self.tmp.cleanup()
+        if os.path.exists("server_state.db"):
+            os.remove("server_state.db")
+
+    def test_verify_records_who_and_outcome(self):
+        server = app_module.server_instance
+        history = evolve_public_chain(server.public_seed, server.public_salt, 6)
+        checksum = derive_public_key_piece(history, 2, 2).hex()
+        client = app_module.app.test_client()
+        ok = client.post('/verify', json={"checksum": checksum, "t_start": 2, "t_end": 2, "request_nonce": "a"},
+                         environ_base={"REMOTE_ADDR": "10.1.2.3"})
+        self.assertEqual(ok.status_code, 200)
+        early_checksum = derive_public_key_piece(history, 3, 5).hex()
+        early = client.post('/verify', json={"checksum": early_checksum, "t_start": 3, "t_end": 5, "request_nonce": "b"},
+                            environ_base={"REMOTE_ADDR": "10.1.2.4"})
+        self.assertEqual(early.status_code, 400)
+        huge = client.post('/verify', json={"checksum": checksum, "t_start": 2, "t_end": 2 ** 64, "request_nonce": "c"},
+                           environ_base={"REMOTE_ADDR": "10.1.2.5"})
+        self.assertEqual(huge.status_code, 400)
+        app_module.audit_log.flush()
+
+        records = list(read_audit(self.path))
+        self.assertEqual([(r.client, r.outcome, r.t_end) for r in records],
+                         [("10.1.2.3", "released", 2), ("10.1.2.4", "too_early", 5), ("10.1.2.5", "rejected", -1)])
+        with open(self.path, "rb") as f:
+            self.assertNotIn(ok.get_json()["k_private"].encode(), f.read())
+            f.seek(0)
+            self.assertNotIn(bytes.fromhex(ok.get_json()["k_private"]), f.read())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+import os
+import src.app as app_module
+from src.server import Server, DB_PATH
+from src.alice import alice_compute_window_checksum, alice_derive_final_key, alice_decrypt
+
+def checksum_for(enc):
+    return alice_compute_window_checksum(enc["public_seed"], enc["public_salt"], enc["t_start"], enc["t_end"])
+
+class TestBatchRelease(unittest.TestCase):
+    def setUp(self):
+        if os.path.exists(DB_PATH):
+            os.remove(DB_PATH)
+        self.server = Server()
+
+    def tearDown(self):
+        if os.path.exists(DB_PATH):
+            os.remove(DB_PATH)
+
+    def test_many_windows_one_burn(self):
+        encs = [self.server.encrypt_for_alice(f"msg {i}".encode(), 1 + i % 3, 5, f"e{i}") for i in range(9)]
+        self.server.advance_private_state_to(5)
+        items = [(enc["t_start"], checksum_for(enc)) for enc in encs]
+        items.insert(4, (2, b"\x00" * 32))
+
+        result = self.server.verify_checksums_and_release_batch(items, 5, "batch-1")
+        self.assertEqual(self.server.current_t, 6)
+        self.assertEqual(result["results"][4], {"error": "Invalid checksum"})
+        valid = result["results"][:4] + result["results"][5:]
+        for i, (enc, r) in enumerate(zip(encs, valid)):
+            key = alice_derive_final_key(r["k_public"], result["k_private"])
+            self.assertEqual(alice_decrypt(enc["ciphertext"], key, enc["nonce"]), f"msg {i}".encode())
+
+        # The tick is gone for everyone else too
+        with self.assertRaisesRegex(ValueError, "Window expired"):
+            self.server.verify_checksums_and_release_batch(items, 5, "batch-2")
+
+    def test_all_invalid_does_not_burn(self):
+        self.server.advance_private_state_to(3)
+        result = self.server.verify_checksums_and_release_batch([(1, b"\x01" * 32), (3, b"\x02" * 32)], 3, "b")
+        self.assertIsNone(result["k_private"])
+        self.assertEqual([r["error"] for r in result["results"]], ["Invalid checksum"] * 2)
+        self.assertEqual(self.server.current_t, 3)
+
+    def test_timing_errors_fail_the_batch(self):
+        enc = self.server.encrypt_for_alice(b"later", 1, 4, "e")
+        with self.assertRaisesRegex(ValueError, "Too early"):
+            self.server.verify_checksums_and_release_batch([(1, checksum_for(enc))], 4, "b1")
+        with self.assertRaisesRegex(ValueError, "Batch too large"):
+            self.server.verify_checksums_and_release_batch([(1, b"")] * (Server.MAX_BATCH_ITEMS + 1), 4, "b2")
+        result = self.server.verify_checksums_and_release_batch([(5, b""), (1, b"")], 4, "b3")
+        self.assertIn("Invalid time window", result["results"][0]["error"])
+        self.assertEqual(self.server.current_t, 0)
+
+class TestBatchEndpoint(unittest.TestCase):
+    def setUp(self):
+        if os.path.exists(DB_PATH):
+            os.remove(DB_PATH)
+        app_module.server_instance = Server()
+
+    def tearDown(self):
+        if os.path.exists(DB_PATH):
+            os.remove(DB_PATH)
+
+    def test_verify_batch(self):
+        client = app_module.app.test_client()
+        encs = []
+        for i in range(3):
+            resp = client.post('/encrypt', json={"plaintext": f"p{i}".encode().hex(), "t_start": i + 1, "t_end": 3,
+                                                 "request_nonce": f"e{i}"})
+            encs.append(resp.get_json())
+        app_module.server_instance.advance_private_state_to(3)
+
+        bad = client.post('/verify/batch', json={"t_end": 3, "request_nonce": "v0",
+                                                 "items": [{"t_start": 1, "checksum": "zz"}]})
+        self.assertEqual(bad.status_code, 400)
+        self.assertIn("items[0]", bad.get_json()["error"])
+
+        items = [{"t_start": e["t_start"], "checksum": alice_compute_window_checksum(
+                      bytes.fromhex(e["public_seed"]), bytes.fromhex(e["public_salt"]), e["t_start"], 3).hex()}
+                 for e in encs]
+        resp = client.post('/verify/batch', json={"t_end": 3, "request_nonce": "v1", "items": items})
+        self.assertEqual(resp.status_code, 200)
+        body = resp.get_json()
+        self.assertEqual(body["released"], 3)
+        k_private = bytes.fromhex(body["k_private"])
+        for i, (enc, r) in enumerate(zip(encs, body["results"])):
+            key = alice_derive_final_key(bytes.fromhex(r["k_public"]), k_private)
+            plaintext = alice_decrypt(bytes.fromhex(enc["ciphertext"]), key, bytes.fromhex(enc["nonce"]))
+            self.assertEqual(plaintext, f"p{i}".encode())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+from benchmarks.run import compare, timed
+from benchmarks.load import classify_verify_error, histogram, merge
+from benchmarks.soak import fit_linear, project_limits, run as run_soak
+
+class TestBenchmarkCompare(unittest.TestCase):
+    def test_flags_regressions_beyond_threshold(self):
+        baseline = {"benchmarks": {
+            "fast": {"ops_per_sec": 1000.0},
+            "slow": {"ops_per_sec": 1000.0},
+        }}
+        results = {
+            "fast": {"ops_per_sec": 900.0},   # -10%: within threshold
+            "slow": {"ops_per_sec": 700.0},   # -30%: regression
+            "new": {"ops_per_sec": 5.0},      # not in baseline: ignored
+        }
+        regressions = compare(results, baseline, threshold=0.2)
+        self.assertEqual([r[0] for r in regressions], ["slow"])
+
+    def test_timed(self):
+        calls, seconds = timed(lambda: None, 0.01)
+        self.assertGreater(calls, 0)
+        self.assertGreaterEqual(seconds, 0.01)
+
+class TestLoadReport(unittest.TestCase):
+    def test_classify_verify_error(self):
+        self.assertEqual(classify_verify_error("Too early! Server is at t=3"), "too_early")
+        self.assertEqual(classify_verify_error("Window expired! Server is at t=9"), "window_expired")
+        self.assertEqual(classify_verify_error("Invalid checksum"), "invalid_checksum")
+        self.assertEqual(classify_verify_error("boom"), "error")
+
+    def test_histogram(self):
+        h = histogram([0.0005, 0.003, 0.003, 0.150])
+        self.assertEqual(h["count"], 4)
+        self.assertEqual(sum(h["counts"]), 4)
+        self.assertEqual(h["counts"][0], 1)  # <= 1ms
+        self.assertAlmostEqual(h["max_ms"], 150.0)
+
+    def test_merge_release_rates(self):
+        worker = {
+            "flows": 4,
+            "latencies": {"POST /verify": [0.01, 0.02]},
+            "outcomes": {"released": 3, "too_early": 0, "window_expired": 1},
+        }
+        report = merge([worker, worker], elapsed=2.0)
+        self.assertEqual(report["flows"], 8)
+        self.assertAlmostEqual(report["release_success_rate"], 0.75)
+        self.assertAlmostEqual(report["window_expired_rate"], 0.25)
+        self.assertAlmostEqual(report["throughput_rps"], 2.0)
+
+class TestSoak(unittest.TestCase):
+    def test_fit_and_projection(self):
+        self.assertEqual(fit_linear([(0, 1.0), (10, 3.0), (20, 5.0)]), (0.2, 1.0))
+        samples = [{"tick": 1000, "startup_s": 1.0}, {"tick": 2000, "startup_s": 2.0}]
+        projection = project_limits(samples, {"startup_s": 30.0})["startup_s"]
+        self.assertEqual(projection["tick"], 30000)
+
+    def test_small_run(self):
+        report = run_soak(ticks=300, checkpoints=3, chunk=100, tick_samples=2, requests=3,
+                          max_lookahead=5, limits={"startup_s": 60.0})
+        self.assertEqual(len(report["samples"]), 3)
+        self.assertEqual(report["samples"][-1]["tick"], 300)
+        self.assertIn("startup_s", report["projections"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+import os
+import json
+import tempfile
+from unittest import mock
+from src.core import evolve_public_chain, evolve_public_chain_to
+from src.chain_cache import ChainCheckpointCache
+from src.chain_audit import audit_chain, audit_history, record_checkpoints, main
+
+class TestChainAudit(unittest.TestCase):
+    def setUp(self):
+        self.seed = os.urandom(32)
+        self.salt = os.urandom(32)
+        self.history = evolve_public_chain(self.seed, self.salt, 1000)
+
+    def test_evolve_to_matches_full_chain(self):
+        digest = mock.Mock()
+        self.assertEqual(evolve_public_chain_to(self.history[100], self.history[99], self.salt, 100, 1000, digest),
+                         (self.history[1000], self.history[999]))
+        self.assertEqual([c.args[0] for c in digest.update.call_args_list], self.history[101:])
+
+    def test_clean_history_and_checkpoints(self):
+        checkpoints = record_checkpoints(self.history, 64)
+        self.assertEqual([k for k, _, _ in checkpoints], list(range(64, 1000, 64)) + [1000])
+        result = audit_history(self.seed, self.salt, self.history, interval=64, workers=1)
+        self.assertEqual((result.ok, result.first_divergent_tick, result.ticks, result.segments), (True, None, 1000, 16))
+        self.assertTrue(audit_chain(self.seed, self.salt, checkpoints[::3], workers=1).ok)
+
+    def test_reports_first_divergent_tick(self):
+        for tick in (1, 63, 64, 65, 500, 1000):
+            history = list(self.history)
+            history[tick] = os.urandom(32)
+            history[tick + 1:tick + 5] = [os.urandom(32)] * len(history[tick + 1:tick + 5])
+            result = audit_history(self.seed, self.salt, history, interval=64, workers=1)
+            self.assertEqual((result.ok, result.first_divergent_tick), (False, tick))
+
+        # Endpoints only: a wrong X_{k-1} or X_k in a published checkpoint
+        checkpoints = record_checkpoints(self.history, 100)
+        k, x_k, x_prev = checkpoints[4]
+        bad_prev = checkpoints[:4] + [(k, x_k, os.urandom(32))] + checkpoints[5:]
+        self.assertEqual(audit_chain(self.seed, self.salt, bad_prev, workers=1).first_divergent_tick, k - 1)
+        bad_x = checkpoints[:4] + [(k, os.urandom(32), x_prev)] + checkpoints[5:]
+        self.assertEqual(audit_chain(self.seed, self.salt, bad_x, workers=1).first_divergent_tick, k)
+        self.assertEqual(audit_chain(self.seed, self.salt, checkpoints + bad_x[4:5], workers=1).first_divergent_tick, k)
+
+    def test_process_pool_agrees(self):
+        history = list(self.history)
+        history[777] = os.urandom(32)
+        result = audit_history(self.seed, self.salt, history, workers=2)
+        self.assertEqual((result.ok, result.first_divergent_tick), (False, 777))
+
+    def test_cli_audits_cache(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "cache.db")
+            cache = ChainCheckpointCache(path, interval=50)
+            cache.compute_checksum(self.seed, self.salt, 900, 1000)
+            args = [f"--cache={path}", f"--seed={self.seed.hex()}", f"--salt={self.salt.hex()}", "--workers=1", "--json"]
+            with mock.patch("builtins.print") as printed:
+                self.assertEqual(main(args), 0)
+            self.assertEqual(json.loads(printed.call_args.args[0])["ticks"], 1000)
+
+            cache.store(self.seed, self.salt, [(550, os.urandom(32), self.history[549])])
+            with mock.patch("builtins.print"):
+                self.assertEqual(main(args), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+import os
+import tempfile
+from unittest import mock
+from src.core import evolve_public_chain, evolve_public_chain_from, derive_public_key_piece
+from src.chain_cache import ChainCheckpointCache, CHECKPOINT_ROW_BYTES
+from src.alice import alice_compute_window_checksum
+import src.chain_cache as chain_cache_module
+
+class TestChainCheckpointCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "cache", "checkpoints.db")
+        self.seed = os.urandom(32)
+        self.salt = os.urandom(32)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_resume_matches_full_chain(self):
+        full = evolve_public_chain(self.seed, self.salt, 50)
+        resumed = evolve_public_chain_from(full[20], full[19], self.salt, 20, 50)
+        self.assertEqual(resumed, full[20:])
+
+    def test_checksum_matches_uncached(self):
+        cache = ChainCheckpointCache(self.path, interval=10)
+        history = evolve_public_chain(self.seed, self.salt, 95)
+        expected = derive_public_key_piece(history, 80, 95)
+        self.assertEqual(cache.compute_checksum(self.seed, self.salt, 80, 95), expected)
+        # Second call resumes from a checkpoint and must agree
+        self.assertEqual(cache.compute_checksum(self.seed, self.salt, 80, 95), expected)
+        self.assertEqual(alice_compute_window_checksum(self.seed, self.salt, 80, 95, cache), expected)
+
+    def test_resumes_from_nearest_checkpoint(self):
+        cache = ChainCheckpointCache(self.path, interval=10)
+        cache.compute_window(self.seed, self.salt, 0, 95)
+        k, x_k, x_prev = cache.nearest(self.seed, self.salt, 87)
+        full = evolve_public_chain(self.seed, self.salt, 95)
+        self.assertEqual((k, x_k, x_prev), (80, full[80], full[79]))
+
+        with mock.patch.object(chain_cache_module, "evolve_public_chain_from", wraps=evolve_public_chain_from) as evolve:
+            window = cache.compute_window(self.seed, self.salt, 92, 95)
+        self.assertEqual(window, full[92:96])
+        self.assertEqual(evolve.call_args[0][3], 90)
+
+    def test_chains_are_separate(self):
+        cache = ChainCheckpointCache(self.path, interval=5)
+        cache.compute_window(self.seed, self.salt, 0, 20)
+        other_seed = os.urandom(32)
+        self.assertEqual(cache.nearest(other_seed, self.salt, 20), (0, other_seed, bytes(32)))
+
+    def test_size_based_eviction(self):
+        cache = ChainCheckpointCache(self.path, interval=1, max_bytes=10 * CHECKPOINT_ROW_BYTES)
+        cache.compute_window(self.seed, self.salt, 0, 50)
+        self.assertLessEqual(cache.size_bytes(), 10 * CHECKPOINT_ROW_BYTES)
+
+    def test_persists_across_instances(self):
+        ChainCheckpointCache(self.path, interval=10).compute_window(self.seed, self.salt, 0, 30)
+        k, _, _ = ChainCheckpointCache(self.path, interval=10).nearest(self.seed, self.salt, 30)
+        self.assertEqual(k, 30)
+
+if __name__ == "__main__":
+    unittest.main()
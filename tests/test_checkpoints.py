@@ -0,0 +1,63 @@
+import unittest
+import os
+import src.app as app_module
+from src.server import Server
+from src.core import evolve_public_chain, derive_public_key_piece
+from src.alice import alice_verify_checkpoints, alice_compute_window_checksum_from_checkpoints
+
+class TestServerCheckpoints(unittest.TestCase):
+    def setUp(self):
+        if os.path.exists("server_state.db"):
+            os.remove("server_state.db")
+        self.server = Server(checkpoint_interval=10)
+        self.server.advance_private_state_to(45)
+
+    def tearDown(self):
+        if os.path.exists("server_state.db"):
+            os.remove("server_state.db")
+
+    def test_get_checkpoints(self):
+        history = evolve_public_chain(self.server.public_seed, self.server.public_salt, 45)
+        checkpoints = self.server.get_checkpoints()
+        self.assertEqual([k for k, _, _ in checkpoints], [10, 20, 30, 40])
+        for k, x_k, x_prev in checkpoints:
+            self.assertEqual((x_k, x_prev), (history[k], history[k - 1]))
+        self.assertEqual([k for k, _, _ in self.server.get_checkpoints(since=21, limit=1)], [30])
+
+    def test_disabled_by_default(self):
+        self.server.checkpoint_interval = 0
+        with self.assertRaises(ValueError):
+            self.server.get_checkpoints()
+
+    def test_alice_spot_check(self):
+        seed, salt = self.server.public_seed, self.server.public_salt
+        checkpoints = self.server.get_checkpoints()
+        self.assertTrue(alice_verify_checkpoints(seed, salt, checkpoints, spot_checks=len(checkpoints)))
+
+        tampered = list(checkpoints)
+        k, x_k, x_prev = tampered[2]
+        tampered[2] = (k, os.urandom(32), x_prev)
+        self.assertFalse(alice_verify_checkpoints(seed, salt, tampered, spot_checks=len(tampered)))
+
+    def test_checksum_from_checkpoints(self):
+        seed, salt = self.server.public_seed, self.server.public_salt
+        history = evolve_public_chain(seed, salt, 45)
+        checksum = alice_compute_window_checksum_from_checkpoints(seed, salt, self.server.get_checkpoints(), 33, 45)
+        self.assertEqual(checksum, derive_public_key_piece(history, 33, 45))
+
+    def test_endpoint(self):
+        app_module.server_instance = self.server
+        client = app_module.app.test_client()
+        data = client.get('/checkpoints?since=15').get_json()
+        self.assertEqual(data["interval"], 10)
+        self.assertEqual([c["k"] for c in data["checkpoints"]], [20, 30, 40])
+        self.assertEqual(client.get('/checkpoints?since=abc').status_code, 400)
+        self.assertEqual(client.get('/checkpoints?limit=-1').status_code, 400)
+        self.assertEqual(client.get('/checkpoints?since=-5').status_code, 400)
+        self.assertEqual([c["k"] for c in client.get('/checkpoints?limit=0').get_json()["checkpoints"]], [10, 20, 30, 40])
+
+        self.server.checkpoint_interval = 0
+        self.assertEqual(client.get('/checkpoints').status_code, 404)
+
+if __name__ == "__main__":
+    unittest.main()
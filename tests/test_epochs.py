@@ -0,0 +1,233 @@
+import unittest
+import os
+import json
+import tempfile
+import threading
+import time
+import src.app as app_module
+from src.core import evolve_public_chain, derive_public_key_piece
+from src.epochs import EpochManager, EpochRetired, epoch_db_path
+from src.ticker import tick_loop, run_ticker
+from src.clock import VirtualClock
+from src.admission import AdmissionController
+
+class TestEpochManager(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "server_state.db")
+        self.epochs = EpochManager(self.db_path, overlap_ticks=3)
+
+    def tearDown(self):
+        self.epochs.close()
+        self.tmp.cleanup()
+
+    def test_rollover_keeps_old_epoch_for_overlap(self):
+        current = self.epochs.open_current()
+        current.advance_private_state_to(5)
+        prepared = self.epochs.prepare(current).result()
+        # Warm before cut-over: the whole encrypt horizon is already evolved
+        self.assertEqual(len(prepared.public_history), prepared.MAX_FUTURE_TICKS + 1)
+
+        new = self.epochs.rollover(current)
+        self.assertIs(new, prepared)
+        self.assertEqual((new.epoch, new.current_t, new.tick_started_at), (1, 0, current.tick_started_at))
+        self.assertNotEqual(new.public_seed, current.public_seed)
+        self.assertEqual(new.db_path, epoch_db_path(self.db_path, 1))
+        self.assertEqual(self.epochs.describe(new), [{"epoch": 1, "current_t": 0, "retire_t": None},
+                                                     {"epoch": 0, "current_t": 5, "retire_t": 8}])
+
+        # Ticked in lockstep through its last tick, then closed and deleted
+        for _ in range(4):
+            self.assertIsNotNone(self.epochs.retiring)
+            self.epochs.tick_retiring()
+        self.assertEqual(current.current_t, 9)
+        self.assertIsNone(self.epochs.retiring)
+        self.assertFalse(os.path.exists(self.db_path))
+        with self.assertRaises(RuntimeError):
+            current.advance_private_state_to(10)
+        new.close()
+
+    def test_retired_epoch_closes_after_its_last_request(self):
+        current = self.epochs.open_current()
+        new = self.epochs.rollover(current)
+        held, retire_t = self.epochs.acquire(new, 0)
+        self.assertEqual((held, retire_t), (current, 3))
+        for _ in range(4):
+            self.epochs.tick_retiring()
+        self.assertIsNone(self.epochs.retiring)
+        with self.assertRaisesRegex(ValueError, "Unknown epoch 0"):
+            self.epochs.acquire(new, 0)
+
+        # Still usable by the request that resolved it before retirement
+        self.assertTrue(os.path.exists(self.db_path))
+        current.advance_private_state_to(5)
+        self.epochs.release(held)
+        self.assertFalse(os.path.exists(self.db_path))
+        with self.assertRaises(RuntimeError):
+            current.advance_private_state_to(6)
+        new.close()
+
+    def test_restart_during_overlap(self):
+        current = self.epochs.open_current()
+        new = self.epochs.rollover(current)
+        self.epochs.tick_retiring()
+        self.epochs.close()
+        new.close()
+        with open(self.epochs.pointer_path) as f:
+            self.assertEqual(json.load(f), {"epoch": 1, "retiring": {"epoch": 0, "retire_t": 3}})
+
+        self.epochs = EpochManager(self.db_path, overlap_ticks=3)
+        reopened = self.epochs.open_current()
+        self.assertEqual((reopened.epoch, reopened.public_seed), (1, new.public_seed))
+        self.assertEqual((self.epochs.retiring.epoch, self.epochs.retiring.server.public_seed),
+                         (0, current.public_seed))
+        reopened.close()
+
+    def test_zero_overlap_retires_at_once(self):
+        current = self.epochs.open_current()
+        published = []
+        new = self.epochs.rollover(current, overlap_ticks=0, publish=lambda nxt: published.append(
+            (nxt, os.path.exists(self.db_path))))
+        # Published while the old epoch was still open
+        self.assertEqual(published, [(new, True)])
+        self.assertIsNone(self.epochs.retiring)
+        self.assertFalse(os.path.exists(self.db_path))
+        self.assertTrue(os.path.exists(new.db_path))
+        # A stale reference is never handed out, and cannot recreate the file
+        with self.assertRaises(EpochRetired):
+            self.epochs.acquire(current)
+        current.refresh_state()
+        self.assertFalse(os.path.exists(self.db_path))
+        new.close()
+
+    def test_standalone_ticker_follows_rollovers(self):
+        current = self.epochs.open_current()
+        current.close()
+        run_ticker(VirtualClock(auto_advance=True), max_ticks=2, db_path=self.db_path)
+        new = self.epochs.rollover(self.epochs.open_current(), overlap_ticks=0)
+        new.close()
+        run_ticker(VirtualClock(auto_advance=True), max_ticks=3, db_path=self.db_path)
+        self.assertFalse(os.path.exists(self.db_path))
+        reopened = EpochManager(self.db_path).open_current()
+        self.assertEqual((reopened.epoch, reopened.current_t), (1, 3))
+        reopened.close()
+
+class TestEpochEndpoints(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.saved = app_module.epochs, app_module.server_instance
+        app_module.epochs = EpochManager(os.path.join(self.tmp.name, "server_state.db"), overlap_ticks=4)
+        app_module.server_instance = app_module.epochs.open_current()
+        app_module.server_instance.advance_private_state_to(1)
+        app_module.ADMIN_TOKEN = "test-token"
+        self.client = app_module.app.test_client()
+
+    def tearDown(self):
+        app_module.ADMIN_TOKEN = None
+        app_module.epochs.close()
+        app_module.server_instance.close()
+        app_module.epochs, app_module.server_instance = self.saved
+        self.tmp.cleanup()
+
+    def encrypt(self, t_start, t_end, nonce, epoch=None):
+        return self.client.post('/encrypt', json={"plaintext": b"epoch".hex(), "t_start": t_start, "t_end": t_end,
+                                                  "request_nonce": nonce, "epoch": epoch})
+
+    def verify(self, enc, nonce):
+        history = evolve_public_chain(bytes.fromhex(enc["public_seed"]), bytes.fromhex(enc["public_salt"]), enc["t_end"])
+        return self.client.post('/verify', json={
+            "checksum": derive_public_key_piece(history, enc["t_start"], enc["t_end"]).hex(),
+            "t_start": enc["t_start"], "t_end": enc["t_end"], "request_nonce": nonce, "epoch": enc.get("epoch")})
+
+    def test_windows_of_the_old_epoch_release_during_overlap(self):
+        old = self.encrypt(2, 3, "e1").get_json()
+        self.assertEqual(old["epoch"], 0)
+
+        self.assertEqual(self.client.post('/admin/epochs/rollover').status_code, 403)
+        res = self.client.post('/admin/epochs/rollover', json={"overlap_ticks": 4},
+                               headers={"X-Admin-Token": "test-token"})
+        self.assertEqual((res.status_code, res.get_json()["epoch"]), (200, 1))
+        new = self.encrypt(1, 2, "e2").get_json()
+        self.assertEqual((new["epoch"], new["public_seed"] != old["public_seed"]), (1, True))
+        status = self.client.get('/status').get_json()
+        self.assertEqual((status["epoch"], [e["epoch"] for e in status["epochs"]]), (1, [1, 0]))
+        self.assertEqual(self.client.get('/status?epoch=0').get_json()["current_t"], 1)
+        self.assertEqual(self.client.get('/status?epoch=7').status_code, 404)
+
+        # Still encrypting into the retiring epoch, but only for windows closing by its last tick (t=5)
+        self.assertEqual(self.encrypt(2, 5, "e3", epoch=0).status_code, 200)
+        self.assertIn("retires", self.encrypt(2, 6, "e4", epoch=0).get_json()["error"])
+
+        # The ticker advances both epochs together
+        tick_loop(lambda: app_module.server_instance, VirtualClock(auto_advance=True), max_ticks=2,
+                  after_tick=app_module.epochs.tick_retiring)
+        self.assertEqual(self.verify(old, "v1").status_code, 200)
+        self.assertEqual(self.verify(new, "v2").status_code, 200)
+
+        tick_loop(lambda: app_module.server_instance, VirtualClock(auto_advance=True), max_ticks=3,
+                  after_tick=app_module.epochs.tick_retiring)
+        late = self.verify(dict(old, request_nonce="x"), "v3")
+        self.assertEqual(late.status_code, 400)
+        self.assertIn("Unknown epoch 0", late.get_json()["error"])
+
+    def test_window_at_the_edge_of_the_horizon_is_released(self):
+        horizon = app_module.server_instance.MAX_FUTURE_TICKS
+        edge = self.encrypt(1, 1 + horizon, "h1").get_json()
+        res = self.client.post('/admin/epochs/rollover', json={"overlap_ticks": horizon},
+                               headers={"X-Admin-Token": "test-token"})
+        self.assertEqual(res.status_code, 200)
+
+        # The last window the old epoch accepted closes on its last tick
+        tick_loop(lambda: app_module.server_instance, VirtualClock(auto_advance=True), max_ticks=horizon,
+                  after_tick=app_module.epochs.tick_retiring)
+        self.assertEqual(app_module.epochs.retiring.server.current_t, edge["t_end"])
+        self.assertEqual(self.verify(edge, "h2").status_code, 200)
+
+        tick_loop(lambda: app_module.server_instance, VirtualClock(auto_advance=True), max_ticks=1,
+                  after_tick=app_module.epochs.tick_retiring)
+        self.assertIsNone(app_module.epochs.retiring)
+
+    def test_reset_during_requests(self):
+        self.addCleanup(setattr, app_module, "admission", app_module.admission)
+        app_module.admission = AdmissionController(rate=0, max_in_flight=4)
+        # Linger after each retirement, so requests overlap it
+        close = app_module.epochs._close
+        app_module.epochs._close = lambda retiring: (close(retiring), time.sleep(0.05))
+        errors = []
+        stop = threading.Event()
+
+        def hammer(path, payload):
+            client = app_module.app.test_client()
+            i = 0
+            while not stop.is_set():
+                i += 1
+                res = client.post(path, json=dict(payload, request_nonce=f"{path}-{threading.get_ident()}-{i}"))
+                if res.status_code >= 500:
+                    errors.append((path, res.status_code, res.get_data(as_text=True)))
+
+        threads = [threading.Thread(target=hammer, args=("/encrypt", {"plaintext": "aa", "t_start": 1, "t_end": 2})),
+                   threading.Thread(target=hammer, args=("/verify", {"checksum": "00" * 32, "t_start": 1, "t_end": 1}))]
+        for thread in threads:
+            thread.start()
+        try:
+            for _ in range(5):
+                self.assertEqual(self.client.post('/reset').status_code, 200)
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(errors, [])
+        # Only the current epoch and the one being prepared have DB files
+        current = app_module.server_instance.epoch
+        files = sorted(f for f in os.listdir(self.tmp.name) if f.endswith(".db"))
+        self.assertTrue(set(files) <= {os.path.basename(epoch_db_path("server_state.db", e)) for e in (current, current + 1)}, files)
+
+    def test_reset_is_a_rollover_without_overlap(self):
+        before = app_module.server_instance
+        res = self.client.post('/reset')
+        self.assertEqual((res.status_code, res.get_json()["epoch"]), (200, 1))
+        self.assertIsNot(app_module.server_instance, before)
+        self.assertEqual(self.client.get('/status').get_json()["epochs"], [{"epoch": 1, "current_t": 0, "retire_t": None}])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+import unittest
+import os
+import sqlite3
+import src.app as app_module
+from src.server import Server, DB_PATH
+from src.levels import LEVELS, base_ticks, level_public_params
+from src.alice import alice_compute_window_checksum, alice_derive_final_key, alice_decrypt
+
+def decrypt(server, enc, nonce="v"):
+    checksum = alice_compute_window_checksum(enc["public_seed"], enc["public_salt"], enc["t_start"], enc["t_end"],
+                                             level=enc.get("level"))
+    keys = server.verify_checksum_and_release_private_key_piece(checksum, enc["t_start"], enc["t_end"], nonce, enc.get("level"))
+    return alice_decrypt(enc["ciphertext"], alice_derive_final_key(keys["k_public"], keys["k_private"]), enc["nonce"])
+
+class TestLevels(unittest.TestCase):
+    def setUp(self):
+        if os.path.exists(DB_PATH):
+            os.remove(DB_PATH)
+
+    def tearDown(self):
+        if os.path.exists(DB_PATH):
+            os.remove(DB_PATH)
+
+    def test_levels_follow_base_clock(self):
+        server = Server()
+        server.advance_private_state_to(125)
+        self.assertEqual(server.level("minute").current_t, 2)
+        self.assertEqual(server.level("hour").current_t, 0)
+        self.assertEqual(server.level(None).current_t, 125)
+        self.assertEqual(base_ticks("minute", 2), (120, 179))
+        with self.assertRaises(ValueError):
+            server.level("week")
+
+    def test_minute_window_releases_once_inside_its_minute(self):
+        server = Server()
+        enc = server.encrypt_for_alice(b"minute lock", 2, 3, "e1", "minute")
+        self.assertEqual(enc["level"], "minute")
+        # Only the minute chain was extended, not 180 base ticks
+        self.assertEqual(len(server.public_history), 1)
+
+        server.advance_private_state_to(179)
+        with self.assertRaisesRegex(ValueError, "Too early"):
+            decrypt(server, enc, "v1")
+        server.advance_private_state_to(185)
+        self.assertEqual(decrypt(server, enc, "v2"), b"minute lock")
+        with self.assertRaisesRegex(ValueError, "Window expired"):
+            decrypt(server, enc, "v3")
+
+        # The burn moved the minute chain to 4, but minute 4 opens on schedule
+        self.assertEqual(server.level("minute").current_t, 4)
+        enc4 = server.encrypt_for_alice(b"next", 4, 4, "e2", "minute")
+        with self.assertRaisesRegex(ValueError, "Too early"):
+            decrypt(server, enc4, "v4")
+        server.advance_private_state_to(240)
+        self.assertEqual(server.level("minute").current_t, 4)
+        self.assertEqual(decrypt(server, enc4, "v5"), b"next")
+
+    def test_day_lock_costs_like_a_short_base_lock(self):
+        server = Server()
+        enc = server.encrypt_for_alice(b"in 30 days", 30, 30, "e1", "day")
+        # 30 steps of the day chain instead of 2.6 million base ticks
+        self.assertLessEqual(len(server.level("day").public_history), 31)
+        self.assertEqual(len(server.public_history), 1)
+        self.assertNotEqual(level_public_params(enc["public_seed"], enc["public_salt"], "day")[0], enc["public_seed"])
+        with self.assertRaisesRegex(ValueError, "too far"):
+            server.encrypt_for_alice(b"x", 0, Server.MAX_FUTURE_TICKS + 1, "e2", "day")
+
+    def test_levels_need_one_second_ticks(self):
+        server = Server(tick_seconds=0.5)
+        with self.assertRaisesRegex(ValueError, "Levels need 1 s ticks"):
+            server.encrypt_for_alice(b"x", 0, 0, "n1", "minute")
+        # The base chain is unaffected
+        self.assertEqual(decrypt(server, server.encrypt_for_alice(b"x", 0, 0, "n2")), b"x")
+
+    def test_levels_persisted(self):
+        server = Server()
+        server.advance_private_state_to(LEVELS["minute"] * 3)
+        enc = server.encrypt_for_alice(b"persisted", 5, 5, "e1", "minute")
+        server.close()
+
+        reloaded = Server()
+        self.assertEqual(reloaded.level("minute").current_t, 3)
+        reloaded.advance_private_state_to(LEVELS["minute"] * 5)
+        self.assertEqual(decrypt(reloaded, enc), b"persisted")
+
+    def test_saves_write_only_changed_levels(self):
+        server = Server()
+        server.advance_private_state_to(LEVELS["minute"])
+
+        def rows():
+            with sqlite3.connect(DB_PATH) as conn:
+                return dict(conn.execute("SELECT level, current_t FROM level_state"))
+
+        with sqlite3.connect(DB_PATH) as conn:
+            conn.execute("UPDATE level_state SET current_t = -1")
+        # A base tick inside the same minute leaves every level row alone
+        server.advance_private_state_to(LEVELS["minute"] + 1)
+        self.assertEqual(rows(), {name: -1 for name in LEVELS})
+        server.advance_private_state_to(LEVELS["minute"] * 2)
+        self.assertEqual(rows(), {"minute": 2, "hour": -1, "day": -1})
+
+    def test_chain_from_before_levels_gets_them(self):
+        Server().advance_private_state_to(150)
+        with sqlite3.connect(DB_PATH) as conn:
+            conn.execute("DROP TABLE level_state")
+        server = Server()
+        self.assertEqual(server.level("minute").current_t, 2)
+        self.assertEqual(Server().level("minute").private_state, server.level("minute").private_state)
+
+class TestLevelEndpoints(unittest.TestCase):
+    def setUp(self):
+        if os.path.exists(DB_PATH):
+            os.remove(DB_PATH)
+        app_module.server_instance = Server()
+
+    def tearDown(self):
+        if os.path.exists(DB_PATH):
+            os.remove(DB_PATH)
+
+    def test_encrypt_and_client_helper_at_hour_level(self):
+        client = app_module.app.test_client()
+        resp = client.post('/encrypt', json={"plaintext": b"hourly".hex(), "t_start": 1, "t_end": 1,
+                                             "request_nonce": "n1", "level": "hour"})
+        self.assertEqual(resp.status_code, 200)
+        enc = resp.get_json()
+        self.assertEqual(enc["level"], "hour")
+
+        app_module.server_instance.advance_private_state_to(LEVELS["hour"])
+        resp = client.post('/client-helper', json=enc)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(bytes.fromhex(resp.get_json()["plaintext"]), b"hourly")
+
+        resp = client.post('/encrypt', json={"plaintext": "aa", "t_start": 1, "t_end": 1,
+                                             "request_nonce": "n2", "level": "fortnight"})
+        self.assertIn("Unknown level", resp.get_json()["error"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+import os
+import src.app as app_module
+from src.server import Server
+from src.metrics import MetricsRegistry, Histogram, METRICS
+
+class TestMetricsRegistry(unittest.TestCase):
+    def test_histogram_render(self):
+        registry = MetricsRegistry(prefix="t")
+        registry.observe("stage_seconds", 0.0002, stage="hkdf")
+        registry.observe("stage_seconds", 3.0, stage="hkdf")
+        text = registry.render()
+        self.assertIn('# TYPE t_stage_seconds histogram', text)
+        self.assertIn('t_stage_seconds_bucket{stage="hkdf",le="0.00025"} 1', text)
+        self.assertIn('t_stage_seconds_bucket{stage="hkdf",le="+Inf"} 2', text)
+        self.assertIn('t_stage_seconds_count{stage="hkdf"} 2', text)
+
+    def test_histogram_bucket_edges(self):
+        hist = Histogram(buckets=(1.0, 2.0))
+        for value in (0.5, 1.0, 1.5, 2.0, 2.5):
+            hist.observe(value)
+        # Bounds are inclusive (le); past the last one is +Inf
+        self.assertEqual(hist.snapshot(), ([2, 2, 1], 7.5, 5))
+
+    def test_counters_and_gauges(self):
+        registry = MetricsRegistry(prefix="t")
+        registry.inc("ticks_advanced_total", 3)
+        registry.inc("ticks_advanced_total")
+        registry.set_gauge("nonce_set_size", 7)
+        text = registry.render()
+        self.assertIn("# TYPE t_ticks_advanced_total counter", text)
+        self.assertIn("t_ticks_advanced_total 4", text)
+        self.assertIn("t_nonce_set_size 7", text)
+
+    def test_stage_context_manager(self):
+        registry = MetricsRegistry(prefix="t")
+        with registry.stage("db_write"):
+            pass
+        self.assertEqual(registry.histogram("stage_seconds", stage="db_write").count, 1)
+
+class TestMetricsEndpoint(unittest.TestCase):
+    def setUp(self):
+        if os.path.exists("server_state.db"):
+            os.remove("server_state.db")
+        METRICS.reset()
+        app_module.server_instance = Server()
+        app_module.server_instance.advance_private_state_to(1)
+
+    def tearDown(self):
+        if os.path.exists("server_state.db"):
+            os.remove("server_state.db")
+
+    def test_stages_after_encrypt(self):
+        client = app_module.app.test_client()
+        resp = client.post('/encrypt', json={
+            "plaintext": "aa", "t_start": 1, "t_end": 3, "request_nonce": os.urandom(8).hex()
+        })
+        self.assertEqual(resp.status_code, 200)
+
+        text = client.get('/metrics').get_data(as_text=True)
+        for stage in ("db_read", "state_decrypt", "history_extend", "private_chain_simulate", "hkdf", "aes_gcm", "db_write"):
+            self.assertIn(f'timelock_stage_seconds_count{{stage="{stage}"}}', text)
+        self.assertIn('timelock_request_seconds_count{endpoint="/encrypt",method="POST"} 1', text)
+        self.assertIn("timelock_ticks_advanced_total 1", text)
+        self.assertIn("timelock_nonce_set_size 1", text)
+        self.assertIn("timelock_public_history_length 4", text)
+        self.assertIn("timelock_tick_lag_seconds", text)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+import os
+import time
+import threading
+import tracemalloc
+import src.app as app_module
+from src.server import Server
+from src import profiling
+
+class TestProfiling(unittest.TestCase):
+    def setUp(self):
+        if os.path.exists("server_state.db"):
+            os.remove("server_state.db")
+        app_module.server_instance = Server()
+        app_module.ADMIN_TOKEN = "test-token"
+        self.client = app_module.app.test_client()
+        self.headers = {"X-Admin-Token": "test-token"}
+
+    def tearDown(self):
+        app_module.ADMIN_TOKEN = None
+        profiling.stop_tracing()
+        tracemalloc.stop()
+        if os.path.exists("server_state.db"):
+            os.remove("server_state.db")
+
+    def test_admin_gating(self):
+        self.assertEqual(self.client.get('/admin/profile?seconds=0').status_code, 403)
+        app_module.ADMIN_TOKEN = None
+        self.assertEqual(self.client.get('/admin/profile?seconds=0', headers=self.headers).status_code, 404)
+
+    def test_profile_sees_other_threads(self):
+        stop = threading.Event()
+
+        def busy_ticker():
+            while not stop.is_set():
+                time.sleep(0.001)
+
+        thread = threading.Thread(target=busy_ticker, name="ticker", daemon=True)
+        thread.start()
+        try:
+            resp = self.client.get('/admin/profile?seconds=0.1&threads=ticker', headers=self.headers)
+        finally:
+            stop.set()
+            thread.join()
+        text = resp.get_data(as_text=True)
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn("ticker;", text)
+        self.assertIn("busy_ticker", text)
+
+    def test_allocation_diff_against_baseline(self):
+        resp = self.client.post('/admin/allocations/snapshot', headers=self.headers)
+        self.assertEqual(resp.status_code, 200)
+        app_module.server_instance.advance_private_state_to(500)
+
+        data = self.client.get('/admin/allocations?top=5', headers=self.headers).get_json()
+        self.assertLessEqual(len(data["top"]), 5)
+        self.assertTrue(any(entry["size_diff"] > 0 for entry in data["top"]))
+        self.assertEqual(data["structures"]["public_history_len"], 501)
+
+    def test_tracing_stops(self):
+        # A windowed diff traces only while it captures
+        resp = self.client.get('/admin/allocations?seconds=0.01', headers=self.headers)
+        self.assertEqual(resp.status_code, 200)
+        self.assertFalse(tracemalloc.is_tracing())
+
+        self.client.post('/admin/allocations/snapshot', headers=self.headers)
+        self.assertTrue(tracemalloc.is_tracing())
+        self.client.get('/admin/allocations?top=1', headers=self.headers)
+        self.assertTrue(tracemalloc.is_tracing())
+        resp = self.client.delete('/admin/allocations/snapshot', headers=self.headers)
+        self.assertEqual(resp.get_json()["message"], "Baseline dropped")
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_leaves_outside_tracing_running(self):
+        tracemalloc.start()
+        self.client.get('/admin/allocations?seconds=0', headers=self.headers)
+        self.client.delete('/admin/allocations/snapshot', headers=self.headers)
+        self.assertTrue(tracemalloc.is_tracing())
+
+if __name__ == "__main__":
+    unittest.main()
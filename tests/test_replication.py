@@ -0,0 +1,173 @@
+import unittest
+import multiprocessing
+import os
+import socket
+import tempfile
+import time
+import src.app as app_module
+from src.server import Server
+from src.core import derive_public_key_piece
+from src.alice import alice_derive_final_key, alice_decrypt
+from src.replication import ReplicaNode, run_node, query_status, REPLICA_DB_TEMPLATE
+
+FAST = dict(heartbeat_interval=0.05, election_timeout=(0.3, 0.6), rpc_timeout=0.3)
+
+def free_peers(n):
+    peers = []
+    for _ in range(n):
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            peers.append(("127.0.0.1", s.getsockname()[1]))
+    return peers
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        result = predicate()
+        if result:
+            return result
+        time.sleep(0.02)
+    raise AssertionError("condition not reached")
+
+class TestReplicaCluster(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        peers = free_peers(3)
+        self.nodes = []
+        for i in range(3):
+            server = Server(db_path=os.path.join(self.tmp.name, REPLICA_DB_TEMPLATE.format(node_id=i)))
+            self.nodes.append(ReplicaNode(i, peers, server, **FAST).start())
+
+    def tearDown(self):
+        for node in self.nodes:
+            node.stop()
+            node.server.close()
+        self.tmp.cleanup()
+
+    def leader(self, exclude=()):
+        return wait_until(lambda: next((n for n in self.nodes if n.is_leader and n not in exclude), None))
+
+    def test_followers_track_leader(self):
+        leader = self.leader()
+        start = leader.server.current_t
+        wait_until(lambda: leader.server.current_t > start, timeout=3)
+        t = leader.server.current_t
+        for node in self.nodes:
+            wait_until(lambda: node.server.current_t >= t)
+            self.assertEqual(node.server.public_seed, leader.server.public_seed)
+        wait_until(lambda: leader.commit_t >= t)
+        # Shipping a tick costs milliseconds against a 1 s tick
+        self.assertLess(leader.last_round_seconds, 0.1)
+
+    def _verify_now(self, node):
+        t = node.server.current_t
+        checksum = derive_public_key_piece(node.server.public_history, t, t)
+        return node.verify_checksum_and_release_private_key_piece(checksum, t, t, os.urandom(8).hex())
+
+    def test_release_waits_for_majority(self):
+        leader = self.leader()
+        wait_until(lambda: all(n.server.public_seed == leader.server.public_seed for n in self.nodes))
+        self.assertIn("k_private", self._verify_now(leader))
+
+        for node in self.nodes:
+            if node is not leader:
+                node.stop()
+        with self.assertRaises(ValueError) as ctx:
+            self._verify_now(leader)
+        self.assertIn("not committed", str(ctx.exception))
+
+    def test_failover_keeps_pending_windows(self):
+        leader = self.leader()
+        wait_until(lambda: all(n.server.public_seed == leader.server.public_seed for n in self.nodes))
+        t = leader.server.current_t
+        enc = leader.encrypt_for_alice(b"survives failover", t + 3, t + 3, os.urandom(8).hex())
+        # Wait until the followers hold the state the ciphertext was made from
+        wait_until(lambda: all(n.server.current_t >= t for n in self.nodes))
+
+        old_term = leader.term
+        leader.stop()
+        new_leader = self.leader(exclude=(leader,))
+        # Elected in a later term than the one it replaced
+        self.assertGreater(new_leader.term, old_term)
+        with self.assertRaises(ValueError):
+            leader.encrypt_for_alice(b"x", t + 5, t + 5, os.urandom(8).hex())
+
+        wait_until(lambda: new_leader.server.current_t == t + 3, timeout=6)
+        keys = self._verify_now(new_leader)
+        k_public = derive_public_key_piece(new_leader.server.public_history, t + 3, t + 3)
+        key = alice_derive_final_key(k_public, keys["k_private"])
+        self.assertEqual(alice_decrypt(enc["ciphertext"], key, enc["nonce"]), b"survives failover")
+
+    def test_state_term_waits_for_majority(self):
+        leader = self.leader()
+        wait_until(lambda: leader.state_term == leader.term)
+        for node in self.nodes:
+            if node is not leader:
+                node.stop()
+        # Leading a new term alone: nothing of that term reached a majority
+        with leader._lock:
+            previous = leader.state_term
+            leader.term += 1
+            leader._become_leader_locked()
+        time.sleep(0.2)
+        self.assertEqual(leader.state_term, previous)
+        self.assertEqual(leader._load_meta()[2], previous)
+        self.assertFalse(leader.wait_for_commit(leader.commit_t + 1, timeout=0.1))
+
+        with leader._lock:
+            meta = leader._record_term_ack_locked(next(n.node_id for n in self.nodes if n is not leader))
+        leader._write_meta(meta)
+        self.assertEqual(leader.state_term, leader.term)
+        self.assertEqual(leader._load_meta()[2], leader.term)
+
+    def test_app_routes_through_node(self):
+        leader = self.leader()
+        follower = next(n for n in self.nodes if n is not leader)
+        app_module.server_instance = Server()
+        app_module.replica_node = follower
+        try:
+            client = app_module.app.test_client()
+            resp = client.post('/verify', json={"checksum": "00", "t_start": 1, "t_end": 1, "request_nonce": "n"})
+            self.assertEqual(resp.status_code, 400)
+            self.assertIn("Not the leader", resp.get_json()["error"])
+            self.assertEqual(client.get('/status').get_json()["replica"]["role"], "follower")
+        finally:
+            app_module.replica_node = None
+            if os.path.exists("server_state.db"):
+                os.remove("server_state.db")
+
+class TestReplicaProcesses(unittest.TestCase):
+    def test_leader_process_killed(self):
+        ctx = multiprocessing.get_context("spawn")
+        peers = free_peers(3)
+        with tempfile.TemporaryDirectory() as tmp:
+            stop = ctx.Event()
+            procs = []
+            for i in range(3):
+                ready = ctx.Event()
+                p = ctx.Process(target=run_node, args=(i, peers, tmp, ready, stop), kwargs=FAST, daemon=True)
+                p.start()
+                procs.append((p, ready))
+            try:
+                for _, ready in procs:
+                    self.assertTrue(ready.wait(30))
+
+                def leader():
+                    statuses = [query_status(addr) for addr in peers]
+                    return next((s for s in statuses if s and s["role"] == "leader"), None)
+
+                first = wait_until(leader, timeout=10)
+                procs[first["node_id"]][0].terminate()
+                second = wait_until(lambda: (s := leader()) and s["node_id"] != first["node_id"] and s, timeout=10)
+                self.assertGreater(second["term"], first["term"])
+                # The survivors keep ticking and committing
+                wait_until(lambda: query_status(peers[second["node_id"]])["commit_t"] > second["commit_t"], timeout=5)
+            finally:
+                stop.set()
+                for p, _ in procs:
+                    p.join(timeout=5)
+                    if p.is_alive():
+                        p.terminate()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+import unittest
+import os
+import tempfile
+import time
+import src.app as app_module
+from src.server import Server
+from src.clock import VirtualClock
+from src.request_trace import TraceWriter, read_trace, TRACE_MAGIC, NO_TICK, NO_EPOCH, ENDPOINT_CODES
+from benchmarks.replay import InProcessTarget, replay, schedule, _relative_window, _relative_epoch
+
+class TestTraceFile(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "trace.bin")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_roundtrip(self):
+        clock = VirtualClock(start=100.0)
+        writer = TraceWriter(self.path, clock)
+        writer.record("/encrypt", 200, 80, 5, 6, 8, 100.25, 100.0)
+        clock.advance(1.5)
+        writer.record("/status", 200, 0, 6, None, None, 101.5, 101.0)
+        writer.close()
+
+        records = list(read_trace(self.path))
+        self.assertEqual(len(records), 2)
+        self.assertEqual(records[0].endpoint, "/encrypt")
+        self.assertEqual((records[0].tick, records[0].t_start, records[0].t_end), (5, 6, 8))
+        self.assertAlmostEqual(records[0].tick_offset, 0.25)
+        self.assertEqual((records[1].t_start, records[1].t_end), (NO_TICK, NO_TICK))
+        self.assertAlmostEqual(records[1].elapsed, 1.5)
+        self.assertEqual((records[1].level, records[1].epoch, records[1].current_epoch), (None, NO_EPOCH, 0))
+
+    def test_level_and_epoch(self):
+        writer = TraceWriter(self.path, VirtualClock())
+        writer.record("/verify", 200, 90, 7200, 1, 2, 0.0, 0.0, level="hour", epoch=3, current_epoch=4)
+        writer.record("/verify", 400, 90, 7200, 1, 2, 0.0, 0.0, level="fortnight", epoch="x", current_epoch=4)
+        writer.close()
+        hour, unknown = read_trace(self.path)
+        self.assertEqual((hour.level, hour.epoch, hour.current_epoch), ("hour", 3, 4))
+        self.assertEqual((unknown.level, unknown.epoch), ("other", NO_EPOCH))
+
+        # Replayed at base tick 10800 in epoch 9: one hour tick later, the previous epoch
+        self.assertEqual(_relative_window(hour, 10800), (2, 3))
+        self.assertEqual(_relative_epoch(hour, 9), 8)
+        self.assertIsNone(_relative_epoch(unknown, 9))
+
+    def test_reopen_appends_without_second_header(self):
+        clock = VirtualClock()
+        TraceWriter(self.path, clock).close()
+        writer = TraceWriter(self.path, clock)
+        writer.record("/verify", 400, 10, 1, 1, 1, 0.0, 0.0)
+        writer.close()
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read().count(TRACE_MAGIC), 1)
+        self.assertEqual(len(list(read_trace(self.path))), 1)
+
+    def test_rejects_foreign_file(self):
+        with open(self.path, "wb") as f:
+            f.write(b"not a trace")
+        with self.assertRaises(ValueError):
+            list(read_trace(self.path))
+
+    def test_older_format_version(self):
+        with open(self.path, "wb") as f:
+            f.write(b"TLTRACE1" + bytes(45))
+        with self.assertRaises(ValueError) as ctx:
+            list(read_trace(self.path))
+        self.assertIn("another format version", str(ctx.exception))
+        # Never appends version 2 records to it
+        with self.assertRaises(ValueError):
+            TraceWriter(self.path, VirtualClock())
+        with open(self.path, "rb") as f:
+            self.assertEqual(len(f.read()), 53)
+
+class TestCaptureAndReplay(unittest.TestCase):
+    def setUp(self):
+        if os.path.exists("server_state.db"):
+            os.remove("server_state.db")
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "trace.bin")
+        app_module.server_instance = Server()
+        app_module.server_instance.advance_private_state_to(1)
+        app_module.trace_writer = TraceWriter(self.path, app_module.server_instance.clock)
+
+    def tearDown(self):
+        app_module.trace_writer.close()
+        app_module.trace_writer = None
+        self.tmp.cleanup()
+        if os.path.exists("server_state.db"):
+            os.remove("server_state.db")
+
+    def test_capture_is_redacted(self):
+        client = app_module.app.test_client()
+        nonce = os.urandom(8).hex()
+        resp = client.post('/encrypt', json={"plaintext": "deadbeef", "t_start": 1, "t_end": 3, "request_nonce": nonce})
+        self.assertEqual(resp.status_code, 200)
+        client.get('/status')
+        # Out of int64: recorded as NO_TICK, and the response is untouched
+        huge = client.post('/verify', json={"checksum": "00", "t_start": 1, "t_end": 2 ** 64, "request_nonce": "h"})
+        self.assertEqual(huge.status_code, 400)
+
+        records = list(read_trace(self.path))
+        self.assertEqual([r.endpoint for r in records], ["/encrypt", "/status", "/verify"])
+        self.assertEqual((records[2].status, records[2].t_start, records[2].t_end), (400, 1, NO_TICK))
+        self.assertEqual((records[0].tick, records[0].t_start, records[0].t_end), (1, 1, 3))
+        self.assertGreater(records[0].payload_size, 0)
+        with open(self.path, "rb") as f:
+            raw = f.read()
+        self.assertNotIn(nonce.encode(), raw)
+        self.assertNotIn(b"deadbeef", raw)
+
+    def test_every_route_has_a_code(self):
+        rules = {rule.rule for rule in app_module.app.url_map.iter_rules() if rule.endpoint != "static"}
+        self.assertEqual(rules - set(ENDPOINT_CODES), set())
+
+    def test_capture_level_epoch_and_routes(self):
+        client = app_module.app.test_client()
+        client.post('/verify', json={"checksum": "00", "t_start": 1, "t_end": 1, "request_nonce": "a",
+                                     "level": "minute", "epoch": 0})
+        client.post('/verify/batch', json={"items": [{"t_start": 3, "checksum": "00"}, {"t_start": 2, "checksum": "00"}],
+                                           "t_end": 4, "request_nonce": "b"})
+        client.post('/encrypt/stream?t_start=2&t_end=3&request_nonce=c&level=minute', data=b"x" * 10)
+        client.get('/tenants/acme-secret/status')
+
+        records = list(read_trace(self.path))
+        self.assertEqual([r.endpoint for r in records],
+                         ["/verify", "/verify/batch", "/encrypt/stream", "/tenants/<tenant>/status"])
+        self.assertEqual((records[0].level, records[0].epoch, records[0].current_epoch), ("minute", 0, 0))
+        self.assertEqual((records[1].t_start, records[1].t_end, records[1].epoch), (2, 4, NO_EPOCH))
+        self.assertEqual((records[2].t_start, records[2].t_end, records[2].level), (2, 3, "minute"))
+        with open(self.path, "rb") as f:
+            self.assertNotIn(b"acme-secret", f.read())
+
+    def test_virtual_replay_reproduces_outcomes(self):
+        # Captured: an encrypt, a premature verify and a valid release
+        clock = VirtualClock()
+        writer = TraceWriter(self.path, clock)
+        writer.record("/encrypt", 200, 80, 10, 11, 12, 0.1, 0.0)
+        writer.record("/verify", 400, 90, 10, 11, 12, 0.2, 0.0)
+        writer.record("/verify", 200, 90, 12, 12, 12, 0.5, 2.0)
+        writer.close()
+
+        records = list(read_trace(self.path))
+        self.assertEqual([e[1] for e in schedule(records)], [0, 0, 2])
+
+        cwd = os.getcwd()
+        os.chdir(self.tmp.name)
+        try:
+            clock = VirtualClock(start=time.time(), auto_advance=True)
+            report = replay(records, InProcessTarget(clock), clock)
+        finally:
+            os.chdir(cwd)
+        self.assertEqual(report["requests"], 3)
+        self.assertEqual(report["outcomes"], {
+            "/encrypt ok": 1, "/verify released": 1, "/verify too_early": 1,
+        })
+
+if __name__ == '__main__':
+    unittest.main()
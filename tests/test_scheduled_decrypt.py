@@ -0,0 +1,138 @@
+import unittest
+import os
+import json
+import tempfile
+import threading
+from werkzeug.serving import make_server
+
+import src.app as app_module
+from src.server import Server
+from src.time_keeper import TimeKeeper
+from src.scheduled_decrypt import ScheduledDecrypt, ScheduledDecryptor
+
+TICK = 0.3
+
+class TestScheduledDecrypt(unittest.TestCase):
+    def setUp(self):
+        if os.path.exists("server_state.db"):
+            os.remove("server_state.db")
+        # Clients take the tick duration from /status
+        app_module.server_instance = Server(tick_seconds=TICK)
+        app_module.server_instance.advance_private_state_to(1)
+
+        self.httpd = make_server("127.0.0.1", 0, app_module.app, threaded=True)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_port}"
+
+        self.ticking = threading.Event()
+        self.ticker = threading.Thread(target=self._tick, daemon=True)
+        self.tk = TimeKeeper(base_url=self.base_url, tick_seconds=TICK, samples=3)
+
+    def _start_ticker(self):
+        # Fast ticker so the test runs in about a second.
+        self.ticker.start()
+        self.tk.sync()
+
+    def _tick(self):
+        while not self.ticking.wait(TICK):
+            server = app_module.server_instance
+            server.refresh_state()
+            server.advance_private_state_to(server.current_t + 1)
+
+    def tearDown(self):
+        self.ticking.set()
+        if self.ticker.is_alive():
+            self.ticker.join()
+        self.httpd.shutdown()
+        self.thread.join()
+        if os.path.exists("server_state.db"):
+            os.remove("server_state.db")
+
+    def _encrypt(self, plaintext, lookahead):
+        server = app_module.server_instance
+        t = server.current_t
+        result = server.encrypt_for_alice(plaintext, t, t + lookahead, os.urandom(8).hex())
+        return {k: (v.hex() if isinstance(v, bytes) else v) for k, v in result.items()}
+
+    def test_precomputes_then_releases_at_tick(self):
+        enc_data = self._encrypt(b"scheduled", 3)
+        self._start_ticker()
+        job = ScheduledDecrypt(enc_data, self.tk, base_url=self.base_url)
+        # Checksum is ready long before the window opens
+        job.checksum()
+        self.assertTrue(job.ready())
+        self.assertEqual(job.run(), b"scheduled")
+
+    def test_decryptor_files(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = []
+            for i in range(2):
+                path = os.path.join(tmp, f"file{i}.enc")
+                with open(path, "w") as f:
+                    json.dump(self._encrypt(f"file {i}".encode(), 2 + i), f)
+                paths.append(path)
+            self._start_ticker()
+
+            decryptor = ScheduledDecryptor(self.tk, base_url=self.base_url, workers=2)
+            for path in paths:
+                decryptor.submit(path)
+            decryptor.shutdown()
+
+            self.assertEqual(decryptor.results[paths[0]], b"file 0")
+            self.assertEqual(decryptor.results[paths[1]], b"file 1")
+
+    def test_too_early_resyncs_and_retries(self):
+        enc_data = self._encrypt(b"drifted", 3)
+        self._start_ticker()
+        # The clock model runs two ticks ahead: the first /verify lands too early
+        with self.tk._lock:
+            self.tk.anchor_t += 2
+        syncs = []
+
+        def resync():
+            syncs.append(app_module.server_instance.current_t)
+            self.tk.sync()
+
+        job = ScheduledDecrypt(enc_data, self.tk, base_url=self.base_url)
+        self.assertEqual(job.run(resync), b"drifted")
+        self.assertEqual(len(syncs), 1)
+
+    def test_resyncs_are_coalesced(self):
+        class SlowTimeKeeper:
+            def __init__(self):
+                self.started = threading.Semaphore(0)
+                self.proceed = threading.Event()
+                self.syncs = 0
+
+            def sync(self):
+                self.syncs += 1
+                self.started.release()
+                self.proceed.wait()
+
+        tk = SlowTimeKeeper()
+        decryptor = ScheduledDecryptor(tk, base_url=self.base_url, workers=1)
+        returned = []
+
+        def call():
+            decryptor.resync()
+            returned.append(tk.syncs)
+
+        first = threading.Thread(target=call)
+        first.start()
+        tk.started.acquire()  # the first sync is running
+        waiters = [threading.Thread(target=call) for _ in range(5)]
+        for th in waiters:
+            th.start()
+        while decryptor._sync_requested < 6:
+            threading.Event().wait(0.001)
+        tk.proceed.set()
+        for th in [first] + waiters:
+            th.join()
+        decryptor.shutdown()
+        # The five that arrived during the first sync share one more
+        self.assertEqual(tk.syncs, 2)
+        self.assertEqual(sorted(returned), [1, 2, 2, 2, 2, 2])
+
+if __name__ == "__main__":
+    unittest.main()
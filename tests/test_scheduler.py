@@ -0,0 +1,111 @@
+import unittest
+import os
+import threading
+import time
+import src.app as app_module
+from src.server import Server
+from src.metrics import METRICS
+from src.admission import AdmissionController
+from src.scheduler import DeadlineScheduler, RELEASE_DUE, NORMAL, BACKGROUND, QUEUE_FULL, QUEUE_TIMEOUT
+
+class TestDeadlineScheduler(unittest.TestCase):
+    def _queue(self, scheduler, rank, deadline, order, results, timeout=2.0):
+        def run():
+            result = scheduler.acquire(rank, deadline, timeout)
+            results[(rank, deadline)] = result
+            if result is None:
+                order.append((rank, deadline))
+                scheduler.release()
+        th = threading.Thread(target=run)
+        before = scheduler.queued
+        th.start()
+        while scheduler.queued == before and th.is_alive():
+            time.sleep(0.001)
+        return th
+
+    def test_most_urgent_waiter_gets_the_slot(self):
+        scheduler = DeadlineScheduler(slots=1, max_queue=10)
+        self.assertIsNone(scheduler.acquire(NORMAL, 0, 1))
+        order, results = [], {}
+        threads = [
+            self._queue(scheduler, BACKGROUND, 1.0, order, results),
+            self._queue(scheduler, NORMAL, 5.0, order, results),
+            self._queue(scheduler, NORMAL, 2.0, order, results),
+            self._queue(scheduler, RELEASE_DUE, 9.0, order, results),
+        ]
+        scheduler.release()
+        for th in threads:
+            th.join()
+        self.assertEqual(order, [(RELEASE_DUE, 9.0), (NORMAL, 2.0), (NORMAL, 5.0), (BACKGROUND, 1.0)])
+        self.assertEqual((scheduler.in_flight, scheduler.queued), (0, 0))
+
+    def test_full_queue_evicts_least_urgent(self):
+        scheduler = DeadlineScheduler(slots=1, max_queue=1)
+        self.assertIsNone(scheduler.acquire(NORMAL, 0, 1))
+        order, results = [], {}
+        status = self._queue(scheduler, BACKGROUND, 1.0, order, results)
+        # Another status poll is turned away, a due release takes its place
+        self.assertEqual(scheduler.acquire(BACKGROUND, 2.0, 1), QUEUE_FULL)
+        release = threading.Thread(target=lambda: results.setdefault("release", scheduler.acquire(RELEASE_DUE, 3.0, 2)))
+        release.start()
+        status.join()
+        self.assertEqual(results[(BACKGROUND, 1.0)], QUEUE_FULL)
+        scheduler.release()
+        release.join()
+        self.assertIsNone(results["release"])
+        scheduler.release()
+        self.assertEqual(scheduler.in_flight, 0)
+
+    def test_waiter_times_out(self):
+        scheduler = DeadlineScheduler(slots=1, max_queue=1)
+        self.assertIsNone(scheduler.acquire(NORMAL, 0, 1))
+        self.assertEqual(scheduler.acquire(NORMAL, 1.0, 0.05), QUEUE_TIMEOUT)
+        self.assertEqual(scheduler.queued, 0)
+        scheduler.release()
+        self.assertEqual(scheduler.in_flight, 0)
+
+class TestRequestPriorities(unittest.TestCase):
+    def setUp(self):
+        if os.path.exists("server_state.db"):
+            os.remove("server_state.db")
+        METRICS.reset()
+        app_module.server_instance = Server()
+        app_module.server_instance.advance_private_state_to(5)
+        self.saved = app_module.admission
+        app_module.admission = AdmissionController(rate=0)
+
+    def tearDown(self):
+        app_module.admission = self.saved
+        if os.path.exists("server_state.db"):
+            os.remove("server_state.db")
+
+    def test_priorities(self):
+        tick_end = app_module.server_instance.tick_started_at + 1
+        with app_module.app.test_request_context('/verify', method='POST', json={"t_start": 5, "t_end": 5}):
+            self.assertEqual(app_module.release_priority(), (RELEASE_DUE, tick_end))
+        with app_module.app.test_request_context('/verify', method='POST', json={"t_start": 7, "t_end": 7}):
+            self.assertEqual(app_module.release_priority(), (NORMAL, tick_end + 2))
+        with app_module.app.test_request_context('/encrypt', method='POST', json={"t_start": 8, "t_end": 9}):
+            # Slack until tick 8 starts (= tick 7 ends)
+            self.assertEqual(app_module.encrypt_priority(), (NORMAL, tick_end + 2))
+        with app_module.app.test_request_context('/encrypt', method='POST', json={"t_start": 2, "t_end": 9}):
+            self.assertEqual(app_module.encrypt_priority(), (NORMAL, tick_end))
+
+    def test_deadline_counters(self):
+        client = app_module.app.test_client()
+        body = {"checksum": "00" * 32, "t_start": 5, "t_end": 5, "request_nonce": "n1"}
+        client.post('/verify', json=body)
+        text = client.get('/metrics').get_data(as_text=True)
+        self.assertIn('timelock_deadline_scheduled_total{endpoint="/verify",priority="release_due"} 1', text)
+        self.assertNotIn('timelock_deadline_missed_total{endpoint="/verify"', text)
+
+        # A release served after its tick ended counts as missed
+        app_module.server_instance.advance_private_state_to(6)
+        server = app_module.server_instance
+        server._snapshot = server._snapshot._replace(tick_started_at=server.clock.time() - 5)
+        client.post('/verify', json=dict(body, t_start=6, t_end=6, request_nonce="n2"))
+        text = client.get('/metrics').get_data(as_text=True)
+        self.assertIn('timelock_deadline_missed_total{endpoint="/verify",priority="release_due"} 1', text)
+
+if __name__ == '__main__':
+    unittest.main()
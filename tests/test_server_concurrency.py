@@ -0,0 +1,112 @@
+import unittest
+import os
+import threading
+from src.server import Server
+from src.core import derive_public_key_piece
+from src.alice import alice_derive_final_key, alice_decrypt
+
+class TestServerConcurrency(unittest.TestCase):
+    def setUp(self):
+        if os.path.exists("server_state.db"):
+            os.remove("server_state.db")
+        self.server = Server()
+        self.server.advance_private_state_to(1)
+
+    def tearDown(self):
+        self.server.close()
+        if os.path.exists("server_state.db"):
+            os.remove("server_state.db")
+
+    def test_state_changes_run_on_writer_thread(self):
+        seen = []
+        self.server._submit(lambda: seen.append(threading.current_thread().name))
+        self.assertEqual(seen, ["server-writer"])
+
+    def test_snapshots_are_immutable(self):
+        snap = self.server.snapshot()
+        self.server.advance_private_state_to(3)
+        self.assertEqual(snap.current_t, 1)
+        self.assertEqual(self.server.current_t, 3)
+        self.assertNotEqual(snap.private_state, self.server.private_state)
+
+    def test_parallel_encrypts_during_ticks(self):
+        server = self.server
+        results = []
+        errors = []
+        lock = threading.Lock()
+        stop = threading.Event()
+
+        def tick():
+            for _ in range(40):
+                server.advance_private_state_to(server.current_t + 1)
+            stop.set()
+
+        def encrypt(worker):
+            i = 0
+            while not stop.is_set():
+                t = server.current_t
+                plaintext = f"{worker}-{i}".encode()
+                try:
+                    result = server.encrypt_for_alice(plaintext, t, t + 60, f"w{worker}-{i}")
+                except ValueError as e:
+                    errors.append(e)
+                    return
+                with lock:
+                    results.append((plaintext, result))
+                i += 1
+
+        threads = [threading.Thread(target=encrypt, args=(w,)) for w in range(4)]
+        threads.append(threading.Thread(target=tick))
+        for th in threads:
+            th.start()
+        for th in threads:
+            th.join()
+        self.assertEqual(errors, [])
+        self.assertGreater(len(results), 0)
+
+        # Every ciphertext must decrypt: each encrypt used one consistent snapshot
+        by_t_end = {}
+        for plaintext, result in results:
+            by_t_end.setdefault(result["t_end"], []).append((plaintext, result))
+        for t_end in sorted(by_t_end):
+            server.advance_private_state_to(t_end)
+            first = by_t_end[t_end][0][1]
+            checksum = derive_public_key_piece(server.public_history, first["t_start"], t_end)
+            k_private = server.verify_checksum_and_release_private_key_piece(checksum, first["t_start"], t_end, f"v{t_end}")["k_private"]
+            for plaintext, result in by_t_end[t_end]:
+                k_public = derive_public_key_piece(server.public_history, result["t_start"], t_end)
+                key = alice_derive_final_key(k_public, k_private)
+                self.assertEqual(alice_decrypt(result["ciphertext"], key, result["nonce"]), plaintext)
+
+    def test_concurrent_verifies_release_once(self):
+        server = self.server
+        server.advance_private_state_to(5)
+        checksum = derive_public_key_piece(server.public_history, 5, 5)
+        barrier = threading.Barrier(8)
+        outcomes = []
+
+        def verify(i):
+            barrier.wait()
+            try:
+                server.verify_checksum_and_release_private_key_piece(checksum, 5, 5, f"n{i}")
+                outcomes.append("released")
+            except ValueError as e:
+                outcomes.append(str(e).split("!")[0])
+
+        threads = [threading.Thread(target=verify, args=(i,)) for i in range(8)]
+        for th in threads:
+            th.start()
+        for th in threads:
+            th.join()
+        self.assertEqual(outcomes.count("released"), 1)
+        self.assertEqual(outcomes.count("Window expired"), 7)
+        self.assertEqual(server.current_t, 6)
+
+    def test_closed_server_rejects_state_changes(self):
+        self.server.close()
+        self.assertFalse(self.server._writer.is_alive())
+        with self.assertRaises(RuntimeError):
+            self.server.advance_private_state_to(2)
+
+if __name__ == '__main__':
+    unittest.main()
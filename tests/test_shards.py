@@ -0,0 +1,106 @@
+import unittest
+import os
+import tempfile
+import time
+import src.app as app_module
+from src.shards import ShardPool, shard_for
+from src.alice import alice_compute_window_checksum, alice_derive_final_key, alice_decrypt
+
+class TestShardRouting(unittest.TestCase):
+    def test_routing_is_stable_and_spread(self):
+        tenants = [f"tenant-{i}" for i in range(400)]
+        first = [shard_for(t, 4) for t in tenants]
+        self.assertEqual(first, [shard_for(t, 4) for t in tenants])
+        counts = [first.count(i) for i in range(4)]
+        self.assertTrue(all(c > 60 for c in counts), counts)
+
+    def test_adding_a_shard_moves_few_tenants(self):
+        tenants = [f"tenant-{i}" for i in range(400)]
+        moved = [t for t in tenants if shard_for(t, 4) != shard_for(t, 5)]
+        # Only tenants won by the new shard move (about 1/5 of them)
+        self.assertTrue(all(shard_for(t, 5) == 4 for t in moved))
+        self.assertLess(len(moved), 140)
+
+class TestShardPool(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.pool = ShardPool(2, db_dir=cls.tmp.name, connections=2).start()
+        # One tenant per shard
+        cls.tenants = {}
+        i = 0
+        while len(cls.tenants) < 2:
+            cls.tenants.setdefault(cls.pool.shard_of(f"t{i}"), f"t{i}")
+            i += 1
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.close()
+        cls.tmp.cleanup()
+        if os.path.exists("server_state.db"):
+            os.remove("server_state.db")
+
+    def tearDown(self):
+        app_module.shard_pool = None
+
+    def test_shards_are_independent_chains(self):
+        results = []
+        for shard, tenant in sorted(self.tenants.items()):
+            t = self.pool.call(tenant, "status")["current_t"]
+            results.append(self.pool.call(tenant, "encrypt_for_alice", b"x", t, t + 5, "same-nonce"))
+            self.assertTrue(os.path.exists(self.pool.db_path(shard)))
+        # Different seeds, and nonces are tracked per shard
+        self.assertNotEqual(results[0]["public_seed"], results[1]["public_seed"])
+
+    def test_errors_cross_the_process_boundary(self):
+        tenant = self.tenants[0]
+        with self.assertRaises(ValueError) as ctx:
+            self.pool.call(tenant, "encrypt_for_alice", b"x", 0, 10 ** 6, os.urandom(8).hex())
+        self.assertIn("too far in the future", str(ctx.exception))
+        # Only SHARD_METHODS are exposed
+        with self.assertRaises(RuntimeError):
+            self.pool.call(tenant, "advance_private_state_to", 10)
+
+    def test_dead_shard_connections_are_dropped(self):
+        with tempfile.TemporaryDirectory() as tmp, ShardPool(1, db_dir=tmp, connections=2) as pool:
+            pool.call("t", "status")
+            pool._processes[0].terminate()
+            pool._processes[0].join()
+            # Each lost connection fails its call and leaves the pool; then calls fail fast instead of hanging
+            for _ in range(4):
+                with self.assertRaises(RuntimeError):
+                    pool.call("t", "status")
+            self.assertEqual(pool._live, [0])
+
+    def test_tenant_endpoints_roundtrip(self):
+        app_module.shard_pool = self.pool
+        client = app_module.app.test_client()
+        tenant = self.tenants[1]
+
+        status = client.get(f'/tenants/{tenant}/status').get_json()
+        self.assertEqual(status["shard"], 1)
+        t_end = status["current_t"] + 1
+        enc = client.post(f'/tenants/{tenant}/encrypt', json={
+            "plaintext": b"tenant secret".hex(), "t_start": t_end, "t_end": t_end,
+            "request_nonce": os.urandom(8).hex(),
+        }).get_json()
+        checksum = alice_compute_window_checksum(bytes.fromhex(enc["public_seed"]), bytes.fromhex(enc["public_salt"]), t_end, t_end)
+
+        deadline = time.time() + 5
+        while client.get(f'/tenants/{tenant}/status').get_json()["current_t"] < t_end:
+            self.assertLess(time.time(), deadline)
+            time.sleep(0.02)
+        resp = client.post(f'/tenants/{tenant}/verify', json={
+            "checksum": checksum.hex(), "t_start": t_end, "t_end": t_end, "request_nonce": os.urandom(8).hex(),
+        })
+        self.assertEqual(resp.status_code, 200, resp.get_json())
+        keys = resp.get_json()
+        key = alice_derive_final_key(bytes.fromhex(keys["k_public"]), bytes.fromhex(keys["k_private"]))
+        self.assertEqual(alice_decrypt(bytes.fromhex(enc["ciphertext"]), key, bytes.fromhex(enc["nonce"])), b"tenant secret")
+
+    def test_tenant_endpoints_disabled_without_shards(self):
+        resp = app_module.app.test_client().get('/tenants/anyone/status')
+        self.assertEqual(resp.status_code, 404)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,183 @@
+import unittest
+import io
+import os
+import socket
+import asyncio
+import threading
+import tracemalloc
+from cryptography.exceptions import InvalidTag
+import src.app as app_module
+from src import stream_aead
+from src.server import Server, DB_PATH
+from src.async_server import AsyncFrontEnd
+from src.admission import AdmissionController
+from src.alice import alice_compute_window_checksum, alice_derive_final_key
+
+def seal(key, plaintext, chunk_size=16):
+    header = stream_aead.new_header({"t_end": 5}, chunk_size)
+    return b"".join(stream_aead.encrypt_stream(key, io.BytesIO(plaintext).read, header)), header
+
+def open_sealed(key, sealed):
+    stream = io.BytesIO(sealed)
+    header = stream_aead.read_header(stream.read)
+    return b"".join(stream_aead.decrypt_stream(key, stream.read, header))
+
+class _Zeros(io.RawIOBase):
+    """A body of `size` bytes that is never held in memory."""
+    def __init__(self, size):
+        self.size = size
+        self.pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        self.pos = offset if whence == io.SEEK_SET else self.size + offset if whence == io.SEEK_END else self.pos + offset
+        return self.pos
+
+    def tell(self):
+        return self.pos
+
+    def readinto(self, b):
+        n = max(0, min(len(b), self.size - self.pos))
+        b[:n] = bytes(n)
+        self.pos += n
+        return n
+
+class TestStreamAead(unittest.TestCase):
+    def setUp(self):
+        self.key = os.urandom(32)
+
+    def test_round_trip_and_length(self):
+        for size in (0, 1, 15, 16, 17, 48, 100):
+            plaintext = os.urandom(size)
+            sealed, header = seal(self.key, plaintext)
+            self.assertEqual(len(sealed), stream_aead.sealed_length(size, header))
+            self.assertEqual(open_sealed(self.key, sealed), plaintext)
+        # Same key, new stream salt: different ciphertext
+        self.assertNotEqual(seal(self.key, b"x" * 40)[0][-40:], seal(self.key, b"x" * 40)[0][-40:])
+
+    def test_tampering_is_detected(self):
+        sealed, header = seal(self.key, os.urandom(64))
+        body = len(sealed) - 4 * (16 + stream_aead.TAG_SIZE)
+        chunk = 16 + stream_aead.TAG_SIZE
+        flipped = bytearray(sealed)
+        flipped[-1] ^= 1
+        cases = {
+            "flipped bit": bytes(flipped),
+            "dropped final chunk": sealed[:-chunk],
+            "swapped chunks": sealed[:body] + sealed[body + chunk:body + 2 * chunk] + sealed[body:body + chunk] + sealed[body + 2 * chunk:],
+            "edited header": sealed.replace(b'"t_end": 5', b'"t_end": 6'),
+            "trailing data": sealed + b"x",
+            "truncated mid-chunk": sealed[:-5],
+        }
+        for name, bad in cases.items():
+            with self.subTest(name), self.assertRaises((InvalidTag, ValueError)):
+                open_sealed(self.key, bad)
+        with self.assertRaises(InvalidTag):
+            open_sealed(os.urandom(32), sealed)
+        with self.assertRaisesRegex(ValueError, "Not an encrypted stream"):
+            open_sealed(self.key, b'{"ciphertext": "00"}')
+
+class TestStreamEndpoint(unittest.TestCase):
+    def setUp(self):
+        if os.path.exists(DB_PATH):
+            os.remove(DB_PATH)
+        app_module.server_instance = Server()
+        app_module.server_instance.advance_private_state_to(1)
+        # A large stream spends many tokens; keep the shared bucket out of other tests
+        self.saved_admission = app_module.admission
+        app_module.admission = AdmissionController()
+        self.client = app_module.app.test_client()
+
+    def tearDown(self):
+        app_module.admission = self.saved_admission
+        if os.path.exists(DB_PATH):
+            os.remove(DB_PATH)
+
+    def release(self, header):
+        fields = header.fields
+        checksum = alice_compute_window_checksum(bytes.fromhex(fields["public_seed"]), bytes.fromhex(fields["public_salt"]),
+                                                 fields["t_start"], fields["t_end"])
+        app_module.server_instance.advance_private_state_to(fields["t_end"])
+        keys = app_module.server_instance.verify_checksum_and_release_private_key_piece(
+            checksum, fields["t_start"], fields["t_end"], os.urandom(8).hex())
+        return alice_derive_final_key(keys["k_public"], keys["k_private"])
+
+    def test_round_trip(self):
+        plaintext = os.urandom(300_000)
+        res = self.client.post('/encrypt/stream?t_start=1&t_end=2&request_nonce=s1', data=plaintext,
+                               content_type="application/octet-stream")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(int(res.headers["Content-Length"]), len(res.data))
+        stream = io.BytesIO(res.data)
+        header = stream_aead.read_header(stream.read)
+        self.assertEqual((header.fields["t_end"], header.fields["epoch"], header.fields["request_nonce"]), (2, 0, "s1"))
+        self.assertEqual(b"".join(stream_aead.decrypt_stream(self.release(header), stream.read, header)), plaintext)
+
+        replay = self.client.post('/encrypt/stream?t_start=1&t_end=2&request_nonce=s1', data=b"x")
+        self.assertEqual(replay.status_code, 400)
+        self.assertEqual(self.client.post('/encrypt/stream?t_start=1&request_nonce=s2', data=b"x").status_code, 400)
+
+    def test_memory_does_not_grow_with_payload(self):
+        size = 64 * 1024 * 1024
+        tracemalloc.start()
+        try:
+            res = self.client.post('/encrypt/stream?t_start=1&t_end=2&request_nonce=big',
+                                   input_stream=_Zeros(size), content_length=size,
+                                   content_type="application/octet-stream", buffered=False)
+            received = sum(len(chunk) for chunk in res.response)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(received, int(res.headers["Content-Length"]))
+        self.assertLess(peak, 4 * 1024 * 1024)
+
+    def test_slot_is_held_until_the_stream_closes(self):
+        app_module.admission = AdmissionController(rate=0.001, burst=3)
+        size = 2 * app_module.STREAM_COST_BYTES
+        res = self.client.post('/encrypt/stream?t_start=1&t_end=2&request_nonce=slot',
+                               input_stream=_Zeros(size), content_length=size, buffered=False)
+        next(iter(res.response))
+        self.assertEqual(app_module.admission.in_flight, 1)
+        res.close()
+        self.assertEqual(app_module.admission.in_flight, 0)
+
+        # Three tokens for two MiB (one per started MiB): the bucket is empty now
+        again = self.client.post('/encrypt/stream?t_start=1&t_end=2&request_nonce=slot2', data=b"x")
+        self.assertEqual(again.status_code, 429)
+
+    def test_async_front_end_streams_past_max_body(self):
+        loop = asyncio.new_event_loop()
+        front_end = AsyncFrontEnd(app_module.app, lambda: app_module.server_instance, port=0, max_body=1024)
+        loop.run_until_complete(front_end.start())
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+        try:
+            plaintext = os.urandom(200_000)
+            sock = socket.create_connection(("127.0.0.1", front_end.port), timeout=5)
+            self.addCleanup(sock.close)
+            stream = sock.makefile("rb")
+            for nonce in ("a1", "a2"):  # Twice on one keep-alive connection
+                sock.sendall(f"POST /encrypt/stream?t_start=1&t_end=2&request_nonce={nonce} HTTP/1.1\r\nHost: x\r\n"
+                             f"Content-Type: application/octet-stream\r\nContent-Length: {len(plaintext)}\r\n\r\n".encode())
+                sock.sendall(plaintext)
+                self.assertEqual(stream.readline().split()[1], b"200")
+                headers = dict(line.decode().strip().lower().split(": ", 1) for line in iter(stream.readline, b"\r\n"))
+                self.assertEqual(headers["connection"], "keep-alive")
+                sealed = stream.read(int(headers["content-length"]))
+            body = io.BytesIO(sealed)
+            header = stream_aead.read_header(body.read)
+            self.assertEqual(b"".join(stream_aead.decrypt_stream(self.release(header), body.read, header)), plaintext)
+            stream.close()
+        finally:
+            asyncio.run_coroutine_threadsafe(front_end.close(), loop).result(5)
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+
+if __name__ == '__main__':
+    unittest.main()
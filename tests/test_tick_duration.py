@@ -0,0 +1,57 @@
+import unittest
+import os
+import src.app as app_module
+from src.clock import VirtualClock
+from src.server import Server
+from src.ticker import tick_loop
+from src.core import evolve_public_chain, derive_public_key_piece
+
+class TestTickDuration(unittest.TestCase):
+    def setUp(self):
+        if os.path.exists("server_state.db"):
+            os.remove("server_state.db")
+
+    def tearDown(self):
+        if os.path.exists("server_state.db"):
+            os.remove("server_state.db")
+
+    def test_persisted_and_changeable(self):
+        Server(tick_seconds=0.05).close()
+        self.assertEqual(Server().tick_seconds, 0.05)
+        Server(tick_seconds=0.02).close()
+        self.assertEqual(Server().tick_seconds, 0.02)
+        with self.assertRaises(ValueError):
+            Server(tick_seconds=0.001)
+
+    def test_ticker_follows_tick_seconds(self):
+        clock = VirtualClock(start=0.0, auto_advance=True)
+        server = Server(clock=clock, tick_seconds=0.01)
+        tick_loop(lambda: server, clock, max_ticks=1000)
+        self.assertEqual(server.current_t, 1000)
+        self.assertAlmostEqual(clock.time(), 10.0)
+
+    def test_batched_persistence(self):
+        clock = VirtualClock(start=0.0, auto_advance=True)
+        server = Server(clock=clock, tick_seconds=0.01, persist_interval=0.1)
+        tick_loop(lambda: server, clock, max_ticks=25)
+        persisted = server._load_state()['current_t']
+        # One DB write per 0.1 s of ticks, not one per tick
+        self.assertLess(persisted, 25)
+        self.assertGreaterEqual(persisted, 15)
+
+        # A burn is written before the key is returned
+        history = evolve_public_chain(server.public_seed, server.public_salt, 25)
+        server.verify_checksum_and_release_private_key_piece(derive_public_key_piece(history, 25, 25), 25, 25, "n")
+        self.assertEqual(server._load_state()['current_t'], 26)
+
+        tick_loop(lambda: server, clock, max_ticks=3)
+        server.close()
+        self.assertEqual(Server().current_t, 29)
+
+    def test_status_reports_tick_seconds(self):
+        app_module.server_instance = Server(tick_seconds=0.1)
+        client = app_module.app.test_client()
+        self.assertEqual(client.get('/status').get_json()["tick_seconds"], 0.1)
+
+if __name__ == '__main__':
+    unittest.main()
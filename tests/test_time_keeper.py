@@ -0,0 +1,112 @@
+import unittest
+import contextlib
+import io
+import os
+import time
+import sqlite3
+import threading
+from werkzeug.serving import make_server
+
+import src.app as app_module
+from src.server import Server, DB_PATH
+from src.time_keeper import TimeKeeper
+
+class TestTimeKeeperSync(unittest.TestCase):
+    def setUp(self):
+        if os.path.exists("server_state.db"):
+            os.remove("server_state.db")
+        app_module.server_instance = Server()
+        app_module.server_instance.advance_private_state_to(7)
+
+        self.httpd = make_server("127.0.0.1", 0, app_module.app, threaded=True)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_port}"
+
+    def tearDown(self):
+        self.httpd.shutdown()
+        self.thread.join()
+        if os.path.exists("server_state.db"):
+            os.remove("server_state.db")
+
+    def test_sync_predicts_server_tick(self):
+        tk = TimeKeeper(base_url=self.base_url, samples=3)
+        tk.sync()
+        self.assertEqual(tk.get_time(), 7)
+        self.assertIsNotNone(tk.rtt)
+        # Same host, so the estimated offset is bounded by the round trip
+        self.assertLess(abs(tk.clock_offset), tk.rtt + 0.01)
+
+    def test_middle_of_tick(self):
+        tk = TimeKeeper(base_url=self.base_url, samples=3)
+        tk.sync()
+        started = app_module.server_instance.tick_started_at
+        local = tk.local_time_of_tick(9)
+        server_time = local + tk.clock_offset
+        self.assertAlmostEqual(server_time, started + 2.5, delta=0.05)
+        self.assertAlmostEqual(tk.predict_tick(local), 9.5, delta=0.05)
+
+    def test_readers_wait_for_a_sync_in_progress(self):
+        """Job threads sync() while others predict; a prediction never sees half a sync."""
+        tk = TimeKeeper(base_url=self.base_url, samples=1)
+        tk._sample = lambda: (0.001, 0.0, 1000.0, {"current_t": 100, "tick_started_at": 1000.0, "server_time": 1000.0})
+        seen, blocked, readers = [], [], []
+
+        def estimate_skew():
+            # Called by sync() half way through updating the model
+            reader = threading.Thread(target=lambda: seen.append(tk.predict_tick(1050.0)))
+            reader.start()
+            reader.join(0.1)
+            blocked.append(reader.is_alive())
+            readers.append(reader)
+            return 0.0
+
+        tk._estimate_skew = estimate_skew
+        with contextlib.redirect_stdout(io.StringIO()):
+            tk.sync()
+        self.assertEqual(blocked, [True])
+        readers[0].join(2)
+        self.assertEqual(seen, [150.0])
+
+    def test_skew_estimate(self):
+        tk = TimeKeeper(base_url=self.base_url)
+        # Client clock losing 1ms per second against the server
+        tk._offset_history = [(1000.0 + i * 10, 0.5 + i * 0.01) for i in range(5)]
+        self.assertAlmostEqual(tk._estimate_skew(), 0.001)
+
+class TestTickStartPersistence(unittest.TestCase):
+    def setUp(self):
+        if os.path.exists("server_state.db"):
+            os.remove("server_state.db")
+
+    def tearDown(self):
+        if os.path.exists("server_state.db"):
+            os.remove("server_state.db")
+
+    def test_tick_started_at_persisted(self):
+        server = Server()
+        before = time.time()
+        server.advance_private_state_to(3)
+        reloaded = Server()
+        self.assertEqual(reloaded.current_t, 3)
+        self.assertGreaterEqual(reloaded.tick_started_at, before)
+
+    def test_migrates_old_schema(self):
+        with sqlite3.connect(DB_PATH) as conn:
+            conn.execute("""
+                CREATE TABLE server_state (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    public_seed BLOB NOT NULL,
+                    public_salt BLOB NOT NULL,
+                    server_secret BLOB NOT NULL,
+                    private_state BLOB NOT NULL,
+                    current_t INTEGER NOT NULL
+                )
+            """)
+        server = Server()
+        self.assertIsNotNone(server.tick_started_at)
+        self.assertEqual(server.tick_seconds, 1.0)
+        self.assertEqual(Server().public_seed, server.public_seed)
+
+if __name__ == "__main__":
+    unittest.main()
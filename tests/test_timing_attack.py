@@ -8,20 +8,21 @@ import binascii
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from src.time_keeper import TimeKeeper
-from src.alice import alice_compute_public_history, alice_compute_checksum, alice_derive_final_key, alice_decrypt
+from src.alice import alice_compute_public_history, alice_compute_checksum, alice_compute_window_checksum, alice_derive_final_key, alice_decrypt
 
 BASE_URL = "http://127.0.0.1:5001"
 
-def attempt_decrypt(ciphertext_hex, nonce_hex, pub_seed_hex, pub_salt_hex, t_start, t_end):
+def attempt_decrypt(ciphertext_hex, nonce_hex, pub_seed_hex, pub_salt_hex, t_start, t_end, checksum=None):
     # 1. Reconstruct bytes
     ciphertext = binascii.unhexlify(ciphertext_hex)
     nonce = binascii.unhexlify(nonce_hex)
     pub_seed = binascii.unhexlify(pub_seed_hex)
     pub_salt = binascii.unhexlify(pub_salt_hex)
 
-    # 2. Compute Checksum
-    history = alice_compute_public_history(pub_seed, pub_salt, t_end)
-    checksum = alice_compute_checksum(history, t_start, t_end)
+    # 2. Compute Checksum (unless precomputed ahead of time)
+    if checksum is None:
+        history = alice_compute_public_history(pub_seed, pub_salt, t_end)
+        checksum = alice_compute_checksum(history, t_start, t_end)
 
     # 3. Request Keys
     # Generate a unique nonce for the verify request
@@ -80,6 +81,12 @@ def run_test():
         print(f"Connection error: {e}")
         return
     
+    # Precompute the checksum now so the release at T=target_t is one round trip
+    checksum = alice_compute_window_checksum(
+        binascii.unhexlify(data['public_seed']), binascii.unhexlify(data['public_salt']),
+        data['t_start'], data['t_end']
+    )
+
     print("Waiting 2 seconds...")
     time.sleep(2)
     
@@ -96,18 +103,14 @@ def run_test():
 
     print("\n--- TEST 2: The Patient User (Just Right) ---")
     
-    # Wait loop to catch the exact moment
-    while True:
-        now = tk.get_time()
-        if now >= target_t:
-            break
-        print(f"Waiting... Local T={now} Target T={target_t}")
-        time.sleep(0.5)
+    # Aim at the middle of the target tick using the RTT-compensated sync
+    print(f"Waiting for the middle of T={target_t} (Local T={tk.get_time()})")
+    tk.wait_for_tick(target_t)
     
     print(f"Attempting decrypt at Local T={tk.get_time()} (Target T={target_t})")
     success, result = attempt_decrypt(
         data['ciphertext'], data['nonce'], data['public_seed'], data['public_salt'], 
-        data['t_start'], data['t_end']
+        data['t_start'], data['t_end'], checksum=checksum
     )
     
     if success:
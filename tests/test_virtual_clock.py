@@ -0,0 +1,127 @@
+import unittest
+import os
+import threading
+from src.clock import VirtualClock
+from src.server import Server
+from src.ticker import tick_loop
+from src.time_keeper import TimeKeeper
+from src.alice import alice_compute_window_checksum, alice_derive_final_key, alice_decrypt
+
+class TestVirtualClock(unittest.TestCase):
+    def test_sleep_blocks_until_advanced(self):
+        clock = VirtualClock(start=100.0)
+        woke = threading.Event()
+
+        def sleeper():
+            clock.sleep(5)
+            woke.set()
+
+        thread = threading.Thread(target=sleeper, daemon=True)
+        thread.start()
+        self.assertTrue(clock.wait_for_sleepers(1))
+        clock.advance(4.9)
+        self.assertFalse(woke.wait(0.05))
+        clock.advance(0.1)
+        self.assertTrue(woke.wait(1))
+        self.assertEqual(clock.time(), 105.0)
+
+    def test_auto_advance(self):
+        clock = VirtualClock(auto_advance=True)
+        clock.sleep(86400)
+        self.assertEqual(clock.time(), 86400)
+
+class TestTickMatrixVirtualTime(unittest.TestCase):
+    """The tick/expiry/replay scenarios of test_timing_attack.py, in virtual time."""
+
+    def setUp(self):
+        if os.path.exists("server_state.db"):
+            os.remove("server_state.db")
+        self.clock = VirtualClock(start=1_000_000.0)
+        self.server = Server(clock=self.clock)
+        self.stop = threading.Event()
+        self.ticker = threading.Thread(
+            target=tick_loop, args=(lambda: self.server, self.clock),
+            kwargs={"stop_event": self.stop}, daemon=True,
+        )
+        self.ticker.start()
+        self.assertTrue(self.clock.wait_for_sleepers(1))
+
+    def tearDown(self):
+        self.stop.set()
+        self.clock.advance(1)
+        self.ticker.join()
+        if os.path.exists("server_state.db"):
+            os.remove("server_state.db")
+
+    def tick(self, n=1):
+        for _ in range(n):
+            self.assertTrue(self.clock.advance_and_settle(1))
+
+    def _encrypt(self, t_start, t_end):
+        enc = self.server.encrypt_for_alice(b"Secret Message", t_start, t_end, os.urandom(8).hex())
+        checksum = alice_compute_window_checksum(enc["public_seed"], enc["public_salt"], t_start, t_end)
+        return enc, checksum
+
+    def _release(self, checksum, t_start, t_end, nonce=None):
+        return self.server.verify_checksum_and_release_private_key_piece(checksum, t_start, t_end, nonce or os.urandom(8).hex())
+
+    def test_ticker_follows_virtual_time(self):
+        self.tick(5)
+        self.assertEqual(self.server.current_t, 5)
+        self.assertEqual(self.server.tick_started_at, self.clock.time())
+
+    def test_too_early_then_just_right(self):
+        enc, checksum = self._encrypt(0, 5)
+        self.tick(2)
+        with self.assertRaisesRegex(ValueError, "Too early"):
+            self._release(checksum, 0, 5)
+        self.tick(3)
+        keys = self._release(checksum, 0, 5)
+        k_final = alice_derive_final_key(keys["k_public"], keys["k_private"])
+        self.assertEqual(alice_decrypt(enc["ciphertext"], k_final, enc["nonce"]), b"Secret Message")
+
+    def test_window_expired(self):
+        _, checksum = self._encrypt(0, 3)
+        self.tick(4)
+        with self.assertRaisesRegex(ValueError, "Window expired"):
+            self._release(checksum, 0, 3)
+
+    def test_replay_rejected_until_nonce_ttl(self):
+        self.server.encrypt_for_alice(b"m", 0, 10, "nonce-1")
+        with self.assertRaisesRegex(ValueError, "Replay"):
+            self.server.encrypt_for_alice(b"m", 0, 10, "nonce-1")
+        # After NONCE_TTL the nonce is forgotten (in virtual seconds)
+        self.clock.advance(self.server.NONCE_TTL + 1)
+        self.assertTrue(self.clock.wait_for_sleepers(1))
+        self.server.encrypt_for_alice(b"m", self.server.current_t, self.server.current_t + 1, "nonce-1")
+
+class TestSimulatedUptime(unittest.TestCase):
+    def setUp(self):
+        if os.path.exists("server_state.db"):
+            os.remove("server_state.db")
+
+    def tearDown(self):
+        if os.path.exists("server_state.db"):
+            os.remove("server_state.db")
+
+    def test_auto_advance_ticker(self):
+        clock = VirtualClock(start=0.0, auto_advance=True)
+        server = Server(clock=clock)
+        tick_loop(lambda: server, clock, max_ticks=1000)
+        self.assertEqual(server.current_t, 1000)
+        self.assertEqual(clock.time(), 1000.0)
+
+    def test_time_keeper_local_ticks(self):
+        clock = VirtualClock()
+        tk = TimeKeeper(resync_interval=0, clock=clock)
+        tk.start()
+        self.assertTrue(clock.wait_for_sleepers(1))
+        for _ in range(3):
+            self.assertTrue(clock.advance_and_settle(1))
+        self.assertEqual(tk.get_time(), 3)
+        tk.running = False
+        clock.advance(1)
+        tk.stop()
+
+if __name__ == "__main__":
+    unittest.main()